@@ -11,6 +11,10 @@ from dotenv import load_dotenv
 from routes.healthy import health_bp
 from routes.gary_wealth import wealth_bp
 from config.settings import config
+from services.database_service import db_service
+from services.traffic_capture import init_capture
+from services.rate_limiter import init_rate_limiter
+from services.request_profiler import init_profiler
 
 # Configure logging
 logging.basicConfig(
@@ -31,10 +35,23 @@ def create_app() -> Flask:
     """
     app = Flask(__name__)
     
+    # Eager mode imports the database client library now instead of on first use
+    if not config.fast_startup:
+        db_service.preload()
+    
     # Configure app
     app.config['DEBUG'] = config.debug
     app.config['ENV'] = config.environment
     
+    # Opt-in request profiling (PROFILE_ENABLED); installed first so it covers the other hooks
+    init_profiler(app)
+    
+    # Opt-in request capture (CAPTURE_ENABLED) for replaying real traffic locally
+    init_capture(app)
+    
+    # Opt-in per-client rate limits (RATE_LIMIT_ENABLED); after capture so 429s are recorded too
+    init_rate_limiter(app)
+    
     # Register blueprints
     app.register_blueprint(health_bp)
     app.register_blueprint(wealth_bp)
@@ -50,7 +67,9 @@ def create_app() -> Flask:
                 ],
                 'wealth_data': [
                     '/utgl-gary-wealth-data (POST)',
-                    '/utgl-gary-wealth-data (GET) - endpoint info'
+                    '/utgl-gary-wealth-data (GET) - endpoint info',
+                    '/utgl-gary-wealth-data/totals (GET) - per-symbol totals, ?account_id= for one account (X-API-Key)',
+                    '/utgl-gary-wealth-data/export (GET) - stream snapshots as ndjson, csv or parquet (X-API-Key)'
                 ]
             },
             'api_version': '1.0.0'
@@ -0,0 +1,168 @@
+"""
+HTTP record/replay for offline collector benchmarks
+Patches requests.Session.request, which carries every outbound call the
+collector makes through requests (Zerion, Solana RPC, Blockstream and the
+ccxt exchanges), so a live run can be recorded once and replayed without
+network access, with injectable latency
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+def request_key(method: str, url: str, body=None) -> str:
+    """Stable key for a request: method, full URL and a hash of the (JSON-normalized) body"""
+    if body is None:
+        digest = ''
+    else:
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, sort_keys=True, separators=(',', ':'))
+        if isinstance(body, str):
+            body = body.encode()
+        digest = hashlib.sha256(body).hexdigest()[:16]
+    return f"{method.upper()} {url} {digest}".rstrip()
+
+
+class Cassette:
+    """
+    Recorded HTTP interactions keyed by request
+
+    Modes:
+        record: perform real requests and store every response
+        replay: serve stored responses only; unknown requests raise CassetteMiss
+    """
+
+    def __init__(self, path: str = None, mode: str = 'replay', latency_ms: float = 0, jitter_ms: float = 0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.interactions = {}
+        self.calls = Counter()
+        self.misses = Counter()
+        self._served = Counter()
+        self._lock = threading.Lock()
+        self._original_request = None
+
+        if path and mode == 'replay':
+            self.load(path)
+
+    def load(self, path: str) -> None:
+        with open(path, 'r', encoding='utf-8') as f:
+            for interaction in json.load(f)['interactions']:
+                self.interactions.setdefault(interaction['key'], []).append(interaction)
+
+    def save(self, path: str = None) -> None:
+        path = path or self.path
+        interactions = [interaction for group in self.interactions.values() for interaction in group]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'interactions': interactions}, f, indent=1)
+
+    def add(self, method: str, url: str, status: int = 200, body=None, request_body=None, headers=None) -> None:
+        """Add a synthetic interaction; `body` may be a JSON-serializable object or text"""
+        text = body if isinstance(body, str) else json.dumps(body)
+        key = request_key(method, url, request_body)
+        self.interactions.setdefault(key, []).append({
+            'key': key,
+            'method': method.upper(),
+            'url': url,
+            'status': status,
+            'headers': headers or {'Content-Type': 'application/json'},
+            'body': text
+        })
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def _sleep(self) -> None:
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _next_interaction(self, key: str):
+        """Recorded responses for a key are served in order; the last one repeats"""
+        with self._lock:
+            group = self.interactions.get(key)
+            if not group:
+                return None
+            index = min(self._served[key], len(group) - 1)
+            self._served[key] += 1
+            return group[index]
+
+    def handle(self, session, method, url, **kwargs):
+        body = kwargs.get('json')
+        if body is None:
+            body = kwargs.get('data')
+        key = request_key(method, url, body)
+        host = urlparse(url).netloc
+        with self._lock:
+            self.calls[host] += 1
+
+        if self.mode == 'record':
+            response = self._original_request(session, method, url, **kwargs)
+            with self._lock:
+                self.interactions.setdefault(key, []).append({
+                    'key': key,
+                    'method': method.upper(),
+                    'url': url,
+                    'status': response.status_code,
+                    'headers': {'Content-Type': response.headers.get('Content-Type', 'application/json')},
+                    'body': response.text
+                })
+            return response
+
+        interaction = self._next_interaction(key)
+        self._sleep()
+        if interaction is None:
+            with self._lock:
+                self.misses[host] += 1
+            raise CassetteMiss(f"No recorded response for {key}")
+
+        response = requests.models.Response()
+        response.status_code = interaction['status']
+        response.reason = requests.status_codes._codes.get(interaction['status'], [''])[0].upper()
+        response.headers = CaseInsensitiveDict(interaction.get('headers') or {})
+        response._content = interaction['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+    def install(self) -> 'Cassette':
+        """Route every requests.Session through this cassette"""
+        if self._original_request is None:
+            self._original_request = requests.Session.request
+            cassette = self
+
+            def request(session, method, url, **kwargs):
+                return cassette.handle(session, method, url, **kwargs)
+
+            requests.Session.request = request
+        return self
+
+    def uninstall(self) -> None:
+        if self._original_request is not None:
+            requests.Session.request = self._original_request
+            self._original_request = None
+
+    def __enter__(self) -> 'Cassette':
+        return self.install()
+
+    def __exit__(self, *exc) -> None:
+        self.uninstall()
+        if self.mode == 'record' and self.path:
+            self.save()
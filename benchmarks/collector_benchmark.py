@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark for the collector pipeline
+Runs services.collector.run.main() with every outbound dependency replaced:
+wallet and exchange HTTP calls come from a cassette (recorded or synthetic),
+Google Sheets from an in-memory sheet and Supabase from the fake PostgREST
+server. Reports time per stage and outbound calls per stage, and can fail
+when a run regresses against a saved baseline (for CI). Stages run
+concurrently as services.collector.run schedules them; --workers 1 runs them
+one at a time, which gives exact calls per stage and the sequential wall clock
+to compare against
+
+Examples:
+    python benchmarks/collector_benchmark.py                      # synthetic fixture, 2 runs (cold + warm)
+    python benchmarks/collector_benchmark.py --latency-ms 150 --positions 200
+    python benchmarks/collector_benchmark.py --workers 1                          # stages one at a time
+    python benchmarks/collector_benchmark.py --record benchmarks/cassettes/live.json   # needs live credentials
+    python benchmarks/collector_benchmark.py --cassette benchmarks/cassettes/live.json
+    python benchmarks/collector_benchmark.py --json new.json --baseline old.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from cassette import Cassette  # noqa: E402
+from fake_postgrest import start_fake_postgrest, FAKE_SUPABASE_KEY  # noqa: E402
+from fake_sheets import FakeSheetsFactory, collector_sheet  # noqa: E402
+
+# Stage functions as referenced by services.collector.run, in pipeline order
+STAGES = [
+    ('sheets_setup', 'setup_google_sheets'),
+    ('holdings', 'fetch_all_zerion_wallets'),
+    ('sheet_write', 'extract_and_write_crypto_data'),
+    ('prices', 'get_crypto_prices'),
+    ('price_write', 'update_crypto_prices'),
+    ('db_report', 'fetch_latest_database_record'),
+]
+
+SYNTHETIC_SYMBOLS = ['ETH', 'USDC', 'WBTC', 'LINK', 'UNI', 'AAVE', 'ARB', 'OP', 'MATIC', 'LDO',
+                     'MKR', 'CRV', 'SNX', 'COMP', 'DAI', 'PEPE', 'SHIB', 'APE', 'GRT', 'ENS']
+SYNTHETIC_PRICES = {'USDT/USD': 1.0002, 'BTC/USDT': 117000.0, 'ETH/USDT': 3500.0, 'SOL/USDT': 175.0}
+
+
+class SyntheticExchange:
+    """Minimal ccxt exchange stand-in: a fixed market list and tickers with injected latency"""
+
+    def __init__(self, ex_id: str, prices, latency_ms: float = 0, jitter_ms: float = 0, calls: Counter = None):
+        self.id = ex_id
+        self.markets = {symbol: {'symbol': symbol} for symbol in prices}
+        self.prices = prices
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = calls if calls is not None else Counter()
+        self._lock = threading.Lock()
+
+    def load_markets(self):
+        return self.markets
+
+    def fetch_ticker(self, symbol: str):
+        with self._lock:
+            self.calls[self.id] += 1
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        # Small per-venue spread so median and first modes give different answers
+        spread = 1 + (hash(self.id) % 7 - 3) / 10000
+        return {'symbol': symbol, 'last': self.prices[symbol] * spread}
+
+
+def synthetic_cassette(wallets, positions: int, latency_ms: float, jitter_ms: float) -> Cassette:
+    """
+    Responses for every wallet in the registry, shaped like the real Zerion,
+    Solana RPC and Blockstream payloads the holdings stage parses
+    """
+    cassette = Cassette(mode='replay', latency_ms=latency_ms, jitter_ms=jitter_ms)
+    for wallet in wallets:
+        address = wallet['address']
+        if wallet['api'] == 'zerion':
+            data = []
+            total = 0.0
+            for i in range(positions):
+                symbol = SYNTHETIC_SYMBOLS[i] if i < len(SYNTHETIC_SYMBOLS) else f"TKN{i}"
+                quantity = round(1000 / (i + 1), 6)
+                value = round(quantity * (3500 / (i + 1)), 2)
+                is_loan = i % 17 == 16
+                total += -value if is_loan else value
+                data.append({
+                    'type': 'positions',
+                    'id': f"position-{i}",
+                    'attributes': {
+                        'name': f"{symbol} Position",
+                        'position_type': 'loan' if is_loan else 'wallet',
+                        'quantity': {'float': quantity},
+                        'value': value,
+                        'price': value / quantity,
+                        'flags': {'displayable': True},
+                        'fungible_info': {'symbol': symbol, 'name': symbol}
+                    }
+                })
+            cassette.add('GET', f"https://api.zerion.io/v1/wallets/{address}/positions?filter[positions]=no_filter",
+                         body={'data': data})
+            cassette.add('GET', f"https://api.zerion.io/v1/wallets/{address}/portfolio?currency=usd&filter[positions]=no_filter",
+                         body={'data': {'attributes': {'total': {'positions': total}}}})
+        elif wallet['api'] == 'solana_rpc':
+            url = 'https://api.mainnet-beta.solana.com'
+            cassette.add('POST', url, request_body={
+                'jsonrpc': '2.0', 'id': 1, 'method': 'getSignaturesForAddress', 'params': [address, {'limit': 1}]
+            }, body={'jsonrpc': '2.0', 'id': 1, 'result': [{'signature': 'benchmark-signature'}]})
+            cassette.add('POST', url, request_body={
+                'jsonrpc': '2.0', 'id': 1, 'method': 'getAccountInfo', 'params': [address, {'encoding': 'base64'}]
+            }, body={'jsonrpc': '2.0', 'id': 1, 'result': {'value': {'lamports': 10_000_000_000}}})
+            cassette.add('POST', url, request_body={
+                'jsonrpc': '2.0', 'id': 1, 'method': 'getTokenAccountsByOwner',
+                'params': [address, {'programId': 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'}, {'encoding': 'jsonParsed'}]
+            }, body={'jsonrpc': '2.0', 'id': 1, 'result': {'value': []}})
+        elif wallet['api'] == 'blockstream':
+            cassette.add('GET', f"https://blockstream.info/api/address/{address}", body={
+                'address': address,
+                'chain_stats': {'funded_txo_sum': 359_610_000, 'spent_txo_sum': 0, 'tx_count': 12},
+                'mempool_stats': {'funded_txo_sum': 0, 'spent_txo_sum': 0, 'tx_count': 0}
+            })
+    return cassette
+
+
+def synthetic_prices(positions: int):
+    prices = dict(SYNTHETIC_PRICES)
+    for i in range(positions):
+        symbol = SYNTHETIC_SYMBOLS[i] if i < len(SYNTHETIC_SYMBOLS) else f"TKN{i}"
+        prices.setdefault(f"{symbol}/USDT", round(3500 / (i + 1), 6))
+    return prices
+
+
+def install_synthetic_exchanges(positions: int, latency_ms: float, jitter_ms: float, calls: Counter) -> None:
+    """Pre-populate the price engine with synthetic exchanges (imports ccxt once, outside the timed run)"""
+    from services.collector.prices import get_price_engine
+
+    prices = synthetic_prices(positions)
+    engine = get_price_engine()
+    for index, ex_id in enumerate(engine.exchange_ids):
+        # Only the first venue lists USD pairs, like Kraken among the defaults
+        listed = {symbol: price for symbol, price in prices.items() if index == 0 or not symbol.endswith('/USD')}
+        engine._exchanges[ex_id] = SyntheticExchange(ex_id, listed, latency_ms, jitter_ms, calls)
+
+
+class StageTimer:
+    """Wraps the stage functions used by services.collector.run to time them and count calls"""
+
+    def __init__(self, counters):
+        self.counters = counters
+        self.stages = {}
+
+    def snapshot(self) -> Counter:
+        total = Counter()
+        for name, counter in self.counters().items():
+            total[name] = counter
+        return total
+
+    def wrap(self, stage: str, func):
+        def timed(*args, **kwargs):
+            before = self.snapshot()
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                calls = self.snapshot() - before
+                entry = self.stages.setdefault(stage, {'seconds': 0.0, 'calls': Counter()})
+                entry['seconds'] += elapsed
+                entry['calls'].update(calls)
+        return timed
+
+    def install(self, run_module) -> None:
+        for stage, name in STAGES:
+            setattr(run_module, name, self.wrap(stage, getattr(run_module, name)))
+
+    def reset(self) -> None:
+        self.stages = {}
+
+
+def print_run(label: str, total: float, stages, exact_calls: bool = True) -> None:
+    print(f"\n⏱️  {label}: {total * 1000:.0f} ms")
+    for stage, _ in STAGES:
+        entry = stages.get(stage)
+        if not entry:
+            print(f"   {stage:<14} {'skipped':>10}")
+            continue
+        if exact_calls:
+            calls = ', '.join(f"{name} {count}" for name, count in sorted(entry['calls'].items())) or 'no calls'
+        else:
+            calls = ''  # Concurrent stages' calls land in each other's counts
+        print(f"   {stage:<14} {entry['seconds'] * 1000:8.1f} ms   {calls}")
+
+
+def check_baseline(result, baseline_path: str, tolerance: float) -> bool:
+    """Compare each run with the same run in a saved result; True if nothing regressed"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    ok = True
+    print(f"\n📏 Baseline {baseline_path} (tolerance {tolerance:.0%})")
+    for current, previous in zip(result['runs'], baseline['runs']):
+        limit = previous['total_seconds'] * (1 + tolerance)
+        slower = current['total_seconds'] > limit
+        more_calls = current['outbound_calls'] > previous['outbound_calls']
+        status = '❌' if slower or more_calls else '✅'
+        print(f"   {status} {current['label']}: {current['total_seconds'] * 1000:.0f} ms "
+              f"(baseline {previous['total_seconds'] * 1000:.0f} ms), "
+              f"{current['outbound_calls']} calls (baseline {previous['outbound_calls']})")
+        ok = ok and not (slower or more_calls)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the collector pipeline offline and time each stage')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--cassette', help='Replay wallet and exchange HTTP calls from this recording')
+    source.add_argument('--record', metavar='CASSETTE', help='Run against the live APIs and record them here')
+    parser.add_argument('--positions', type=int, default=40, help='Zerion positions in the synthetic fixture')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Injected latency per outbound call')
+    parser.add_argument('--jitter-ms', type=float, default=20, help='Random extra latency per outbound call')
+    parser.add_argument('--runs', type=int, default=2, help='Consecutive runs sharing one state dir (first is cold)')
+    parser.add_argument('--force', action='store_true', help='Rewrite the sheet on every run')
+    parser.add_argument('--workers', type=int, help='Pipeline stages run at once (default: PIPELINE_WORKERS)')
+    parser.add_argument('--verbose', action='store_true', help='Show the collector output')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='Fail if slower or making more calls than this saved result')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    state_dir = tempfile.mkdtemp(prefix='collector-bench-')
+    db_server, db_state = start_fake_postgrest(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, keep_rows=True)
+    with open(os.path.join(REPO_DIR, 'data.json'), 'r', encoding='utf-8') as f:
+        db_state.insert('utgl_gary_wealth_records', [{'data': json.load(f)}])
+
+    # The collector reads its settings at import time, so configure it before importing
+    os.environ.update({
+        'COLLECTOR_STATE_DIR': state_dir,
+        'SUPABASE_URL': f"http://127.0.0.1:{db_server.server_port}",
+        'SUPABASE_KEY': FAKE_SUPABASE_KEY,
+        'SHEETS_VERIFY': 'false',
+    })
+    if args.workers:
+        os.environ['PIPELINE_WORKERS'] = str(args.workers)
+    if not args.record:
+        os.environ['ZERION_API_KEY'] = 'benchmark'
+
+    import services.collector.run as run_module
+    from services.collector import sheets
+    from services.collector.settings import WALLET_REGISTRY_FILE, PIPELINE_WORKERS
+    from services.wallet_registry import load_wallet_registry
+
+    exchange_calls = Counter()
+    if args.record:
+        cassette = Cassette(args.record, mode='record')
+        source = f"recording to {args.record}"
+    elif args.cassette:
+        cassette = Cassette(args.cassette, mode='replay', latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+        source = f"cassette {args.cassette}"
+    else:
+        wallets = load_wallet_registry(WALLET_REGISTRY_FILE)['wallets']
+        cassette = synthetic_cassette(wallets, args.positions, args.latency_ms, args.jitter_ms)
+        install_synthetic_exchanges(args.positions, args.latency_ms, args.jitter_ms, exchange_calls)
+        source = f"synthetic fixture ({len(wallets)} wallets, {args.positions} Zerion positions)"
+
+    sheet = collector_sheet(args.latency_ms, args.jitter_ms)
+    sheets.sheets_factory = FakeSheetsFactory(sheet)
+
+    def counters():
+        calls = Counter(cassette.calls)
+        calls.update(exchange_calls)
+        calls['sheets'] = sheet.total_calls()
+        calls['supabase'] = db_state.requests
+        return calls
+
+    timer = StageTimer(counters)
+    timer.install(run_module)
+
+    print("🚀 Collector Pipeline Benchmark")
+    print(f"⚙️  {source}; injected latency {args.latency_ms:g}+{args.jitter_ms:g} ms; "
+          f"{PIPELINE_WORKERS} pipeline worker{'s' if PIPELINE_WORKERS > 1 else ''}; state dir {state_dir}")
+    if PIPELINE_WORKERS > 1:
+        print("   Calls per stage are shown with --workers 1 only; concurrent stages share the counters")
+    print("=" * 80)
+
+    runs = []
+    cwd = os.getcwd()
+    os.chdir(state_dir)  # keep debug files the collector writes (raw.json) out of the repo
+    try:
+        with cassette:
+            for index in range(args.runs):
+                label = 'cold run' if index == 0 else f"warm run {index}"
+                timer.reset()
+                before = sum(counters().values())
+                output = io.StringIO()
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                    run_module.main(force=args.force)
+                total = time.perf_counter() - started
+                outbound = sum(counters().values()) - before
+
+                print_run(label, total, timer.stages, exact_calls=PIPELINE_WORKERS == 1)
+                print(f"   {'outbound calls':<14} {outbound:>8}")
+                runs.append({
+                    'label': label,
+                    'total_seconds': round(total, 4),
+                    'outbound_calls': outbound,
+                    'stages': {
+                        stage: {'seconds': round(entry['seconds'], 4), 'calls': dict(entry['calls'])}
+                        for stage, entry in timer.stages.items()
+                    }
+                })
+    finally:
+        os.chdir(cwd)
+        db_server.shutdown()
+
+    if cassette.misses:
+        print(f"\n⚠️  Requests missing from the cassette: {dict(cassette.misses)}")
+
+    result = {
+        'source': source,
+        'workers': PIPELINE_WORKERS,
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'positions': args.positions,
+        'runs': runs,
+        'cassette_misses': dict(cassette.misses)
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+    if args.baseline and not check_baseline(result, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
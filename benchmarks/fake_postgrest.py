@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Local PostgREST stand-in for offline benchmarks
+Accepts the requests supabase-py makes against /rest/v1/<table>, keeps rows in
+memory and can inject latency and errors so the API can be load-tested
+without touching the real Supabase project
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+# supabase-py only accepts JWT-shaped keys
+FAKE_SUPABASE_KEY = 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYmVuY2htYXJrIn0.ZmFrZQ'
+
+FILTERS = ('gt.', 'gte.', 'lt.', 'lte.', 'eq.')
+
+
+def _compare(value, op: str, operand: str) -> bool:
+    if value is None:
+        return False
+    # ids compare as numbers, dates as ISO strings
+    if isinstance(value, (int, float)):
+        operand = float(operand)
+    else:
+        value = str(value)
+    return {
+        'gt': value > operand,
+        'gte': value >= operand,
+        'lt': value < operand,
+        'lte': value <= operand,
+        'eq': value == operand
+    }[op]
+
+
+class FakePostgrestState:
+    """In-memory tables plus the fault-injection settings shared by all handler threads"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0,
+                 keep_rows: bool = False):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.keep_rows = keep_rows
+        self.tables = {}
+        self.next_id = 1
+        self.requests = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def insert(self, table: str, rows):
+        inserted = []
+        with self.lock:
+            for row in rows:
+                row = dict(row)
+                row.setdefault('id', self.next_id)
+                row.setdefault('date', datetime.now(timezone.utc).isoformat())
+                self.next_id += 1
+                inserted.append(row)
+                if self.keep_rows:
+                    self.tables.setdefault(table, []).append(row)
+        return inserted
+
+
+class FakePostgrestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: FakePostgrestState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _inject_faults(self) -> bool:
+        """Sleep for the configured latency; returns True if this request should fail"""
+        state = self.state
+        with state.lock:
+            state.requests += 1
+        delay = state.latency_ms + random.uniform(0, state.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if state.error_rate and random.random() < state.error_rate:
+            with state.lock:
+                state.errors += 1
+            self._send_json(503, {'code': 'PGRST000', 'message': 'Injected failure', 'details': None, 'hint': None})
+            return True
+        return False
+
+    def _table(self) -> str:
+        path = urlparse(self.path).path
+        prefix = '/rest/v1/'
+        return path[len(prefix):] if path.startswith(prefix) else ''
+
+    def _read_body(self):
+        # postgrest-py also sends a JSON body with GET requests; it must be consumed to keep the connection usable
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_POST(self):
+        body = self._read_body()
+        if self._inject_faults():
+            return
+
+        table = self._table()
+        if table.startswith('rpc/'):
+            self._send_json(200, None)
+            return
+        rows = body if isinstance(body, list) else [body]
+        inserted = self.state.insert(table, rows)
+        if 'return=minimal' in self.headers.get('Prefer', ''):
+            self.send_response(201)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send_json(201, inserted)
+
+    def do_GET(self):
+        self._read_body()
+        if self._inject_faults():
+            return
+        rows = self.state.tables.get(self._table(), [])
+        params = parse_qsl(urlparse(self.path).query)
+        if not any(name in ('order', 'limit') or value.startswith(FILTERS) for name, value in params):
+            # Plain selects (health checks) only need to see the latest row
+            self._send_json(200, rows[-1:] if rows else [])
+            return
+        self._send_json(200, self._query(rows, params))
+
+    @staticmethod
+    def _query(rows, params):
+        """The subset of PostgREST used by paged reads: col=gt|gte|lt|lte|eq.value, order=col[.desc], limit=n"""
+        order, limit = None, None
+        for name, value in params:
+            if name == 'order':
+                order = value
+            elif name == 'limit':
+                limit = int(value)
+            elif value.startswith(FILTERS):
+                op, _, operand = value.partition('.')
+                rows = [row for row in rows if _compare(row.get(name), op, operand)]
+        if order:
+            column, _, direction = order.partition('.')
+            rows = sorted(rows, key=lambda row: row.get(column), reverse=direction.startswith('desc'))
+        return rows[:limit] if limit is not None else rows
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def start_fake_postgrest(port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                         error_rate: float = 0, keep_rows: bool = False):
+    """
+    Start the fake server on a background thread
+
+    Returns:
+        Tuple of (server, state); the base URL is http://127.0.0.1:<server.server_port>
+    """
+    state = FakePostgrestState(latency_ms, jitter_ms, error_rate, keep_rows)
+    handler = type('Handler', (FakePostgrestHandler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='fake-postgrest', daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a fake PostgREST server for local benchmarks')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--keep-rows', action='store_true', help='Keep inserted rows in memory for GET requests')
+    args = parser.parse_args()
+
+    server, _ = start_fake_postgrest(args.port, args.latency_ms, args.jitter_ms, args.error_rate, args.keep_rows)
+    print(f"🧪 Fake PostgREST listening on http://127.0.0.1:{server.server_port}")
+    print(f"   SUPABASE_KEY={FAKE_SUPABASE_KEY}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+In-memory Google Sheets stand-in for offline collector benchmarks
+Implements the slice of the Sheets v4 client the collector uses
+(spreadsheets().values().get/update/batchUpdate(...).execute()) on a grid
+of cells, with injectable latency and a per-method call count
+"""
+import random
+import re
+import threading
+import time
+from collections import Counter
+
+from services.tracing import span
+
+A1_CELL = re.compile(r'^([A-Z]*)(\d*)$')
+
+
+def column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def parse_range(a1_range: str, max_rows: int = 1000, max_cols: int = 26):
+    """
+    Parse 'Sheet!B12', 'Sheet!A1:A50' or 'Sheet!1:5' into 0-based
+    (first_row, first_col, last_row, last_col), inclusive
+    """
+    cells = a1_range.split('!', 1)[-1].split(':')
+    start = A1_CELL.match(cells[0])
+    end = A1_CELL.match(cells[-1])
+    first_col = column_index(start.group(1)) if start.group(1) else 0
+    last_col = column_index(end.group(1)) if end.group(1) else max_cols - 1
+    first_row = int(start.group(2)) - 1 if start.group(2) else 0
+    last_row = int(end.group(2)) - 1 if end.group(2) else max_rows - 1
+    return first_row, first_col, last_row, last_col
+
+
+class FakeRequest:
+    def __init__(self, sheets: 'FakeSheetsService', method: str, func):
+        self.sheets = sheets
+        self.method = method
+        self.func = func
+
+    def execute(self):
+        # Same span as the real client's traced requests (services/collector/sheets_client.py)
+        with span(f"sheets.spreadsheets.{self.method.replace('spreadsheets.', '')}", 'client'):
+            self.sheets.record_call(self.method)
+            return self.func()
+
+
+class FakeValues:
+    def __init__(self, sheets: 'FakeSheetsService'):
+        self.sheets = sheets
+
+    def get(self, spreadsheetId, range, **kwargs):
+        return FakeRequest(self.sheets, 'values.get', lambda: {'range': range, 'values': self.sheets.read(range)})
+
+    def update(self, spreadsheetId, range, valueInputOption=None, body=None, **kwargs):
+        def apply():
+            self.sheets.write(range, body.get('values', []))
+            return {'updatedRange': range}
+        return FakeRequest(self.sheets, 'values.update', apply)
+
+    def batchUpdate(self, spreadsheetId, body=None, **kwargs):
+        def apply():
+            for item in body.get('data', []):
+                self.sheets.write(item['range'], item.get('values', []))
+            return {'totalUpdatedRanges': len(body.get('data', []))}
+        return FakeRequest(self.sheets, 'values.batchUpdate', apply)
+
+
+class FakeSheetsService:
+    """A single sheet held as a {(row, col): value} grid"""
+
+    def __init__(self, title: str = 'Benchmark Sheet', latency_ms: float = 0, jitter_ms: float = 0):
+        self.title = title
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.cells = {}
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def record_call(self, method: str) -> None:
+        with self._lock:
+            self.calls[method] += 1
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def read(self, a1_range: str):
+        """Values in the range with trailing empty cells and rows trimmed, as the API returns them"""
+        first_row, first_col, last_row, last_col = parse_range(a1_range)
+        with self._lock:
+            rows = []
+            for row in range(first_row, last_row + 1):
+                values = [self.cells.get((row, col), '') for col in range(first_col, last_col + 1)]
+                while values and values[-1] == '':
+                    values.pop()
+                rows.append(values)
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def write(self, a1_range: str, values) -> None:
+        first_row, first_col, _, _ = parse_range(a1_range)
+        with self._lock:
+            for row_offset, row in enumerate(values):
+                for col_offset, value in enumerate(row):
+                    cell = (first_row + row_offset, first_col + col_offset)
+                    if value == '':
+                        self.cells.pop(cell, None)
+                    else:
+                        self.cells[cell] = value
+
+    def spreadsheets(self) -> 'FakeSheetsService':
+        return self
+
+    def values(self) -> FakeValues:
+        return FakeValues(self)
+
+    def get(self, spreadsheetId, fields=None, **kwargs):
+        return FakeRequest(self, 'spreadsheets.get', lambda: {'properties': {'title': self.title}})
+
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeSheetsFactory:
+    """Drop-in for SheetsClientFactory (services.collector.sheets.sheets_factory)"""
+
+    def __init__(self, service: FakeSheetsService):
+        self._service = service
+
+    def service(self) -> FakeSheetsService:
+        return self._service
+
+    def verify(self, spreadsheet_id: str) -> str:
+        return self._service.get(spreadsheetId=spreadsheet_id).execute()['properties']['title']
+
+
+def collector_sheet(latency_ms: float = 0, jitter_ms: float = 0, header_row: int = 4) -> FakeSheetsService:
+    """
+    A sheet laid out like Cypto_Asset: a two-row Currency header in column A,
+    prices in column B and the UTGL.ETH quantity/value headers on the second
+    header row (totals are written on the row above them)
+    """
+    sheet = FakeSheetsService(latency_ms=latency_ms, jitter_ms=jitter_ms)
+    sheet.write(f"A{header_row}", [['Currency', 'Price']])
+    sheet.write(f"C{header_row + 1}", [['UTGL.ETH', 'UTGL.ETH (value)']])
+    return sheet
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Memory and CPU cost of the holdings model (services/collector/portfolio.py)
+Compares holdings kept as dicts and aggregated by symbol three times (the
+per-wallet summary, the sheet write and the final summary, as the collector
+used to) with slotted Holding objects aggregated once by Portfolio, at
+collector-sized and much larger position counts
+
+Examples:
+    python benchmarks/holdings_benchmark.py
+    python benchmarks/holdings_benchmark.py --sizes 10000,100000 --symbols 2000 --json holdings.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault('ENV_FILE', os.devnull)
+
+from services.collector.portfolio import Holding, Portfolio  # noqa: E402
+
+
+def build_dicts(size: int, wallets: int, symbols: int, seed: int = 7):
+    """`size` holdings shaped like the Zerion fetcher's, spread over wallets and symbols"""
+    rng = random.Random(seed)
+    holdings = []
+    for i in range(size):
+        symbol = f"TKN{rng.randrange(symbols)}"
+        quantity = rng.uniform(0.01, 1000)
+        is_debt = i % 17 == 16
+        holdings.append({
+            'wallet': f"Wallet {i % wallets}",
+            'symbol': symbol,
+            'name': f"{symbol} Token",
+            'position_name': f"{symbol} Position" + (" (DEBT)" if is_debt else ""),
+            'quantity': -quantity if is_debt else quantity,
+            'usd_value': (-quantity if is_debt else quantity) * rng.uniform(0.1, 50),
+            'is_debt': is_debt,
+            'address': f"0x{i % wallets:08x}..."
+        })
+    return holdings
+
+
+def aggregate_dicts(holdings, wallet_names):
+    """The three aggregation loops the collector ran over dict holdings"""
+    # Per-wallet summary in fetch_all_zerion_wallets
+    wallet_results = {name: [] for name in wallet_names}
+    for holding in holdings:
+        wallet_results[holding['wallet']].append(holding)
+    total_portfolio_usd = sum(holding.get('usd_value', 0) for holding in holdings)
+    wallet_summaries = {}
+    for wallet_name, wallet_holdings in wallet_results.items():
+        wallet_total_usd = sum(holding.get('usd_value', 0) for holding in wallet_holdings)
+        wallet_symbols = {}
+        for holding in wallet_holdings:
+            symbol = holding['symbol']
+            if symbol in wallet_symbols:
+                wallet_symbols[symbol]['quantity'] += holding['quantity']
+                wallet_symbols[symbol]['usd_value'] += holding.get('usd_value', 0)
+            else:
+                wallet_symbols[symbol] = {'quantity': holding['quantity'], 'usd_value': holding.get('usd_value', 0)}
+        wallet_summaries[wallet_name] = (
+            wallet_total_usd, sorted(wallet_symbols.items(), key=lambda x: x[1]['usd_value'], reverse=True)
+        )
+
+    # Sheet write in extract_and_write_crypto_data
+    symbol_data = {}
+    for holding in holdings:
+        symbol = holding['symbol']
+        if symbol in symbol_data:
+            symbol_data[symbol]['usd_value'] += holding.get('usd_value', 0)
+            symbol_data[symbol]['quantity'] += holding.get('quantity', 0)
+        else:
+            symbol_data[symbol] = {'usd_value': holding.get('usd_value', 0), 'quantity': holding.get('quantity', 0)}
+    sorted_data = sorted(symbol_data.items(), key=lambda x: abs(x[1]['usd_value']), reverse=True)
+    crypto_data = [(symbol, data) for symbol, data in sorted_data if symbol not in ['USD', 'HKD', 'JPY']]
+
+    # Final summary
+    unique_assets = len(set(h['symbol'] for h in holdings))
+    return total_portfolio_usd, wallet_summaries, crypto_data, unique_assets
+
+
+def aggregate_portfolio(holdings, wallet_names):
+    portfolio = Portfolio(holdings, wallet_names)
+    wallet_summaries = {name: (portfolio.wallet_usd(name), portfolio.by_wallet[name]) for name in wallet_names}
+    return portfolio.total_usd, wallet_summaries, portfolio.crypto, len(portfolio.symbols)
+
+
+def measure_memory(build) -> int:
+    """Bytes still allocated by what `build` returns"""
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+def time_per_call(func, repeat: int) -> float:
+    """Best of `repeat` runs in milliseconds per call; each run lasts at least 0.2 s"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the holdings model and aggregation')
+    parser.add_argument('--sizes', default='10000,50000,200000', help='Positions per run, comma separated')
+    parser.add_argument('--wallets', type=int, default=12, help='Wallets the positions are spread over')
+    parser.add_argument('--symbols', type=int, default=1000, help='Distinct symbols')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is kept)')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    wallet_names = [f"Wallet {i}" for i in range(args.wallets)]
+    print(f"🧪 Holdings Model ({args.wallets} wallets, {args.symbols} symbols)")
+    print(f"{'Positions':>10}{'dicts MB':>11}{'Holding MB':>12}{'3 loops ms':>13}"
+          f"{'Portfolio ms':>14}{'from dicts ms':>15}{'speedup':>9}")
+    print("-" * 84)
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        dicts = build_dicts(size, args.wallets, args.symbols)
+        holdings = [Holding.from_dict(holding) for holding in dicts]
+        # Copy the values so both measurements pay for their own containers only
+        dict_bytes = measure_memory(lambda: [dict(holding) for holding in dicts])
+        holding_bytes = measure_memory(lambda: [Holding.from_dict(holding) for holding in dicts])
+
+        loops_ms = time_per_call(lambda: aggregate_dicts(dicts, wallet_names), args.repeat)
+        portfolio_ms = time_per_call(lambda: aggregate_portfolio(holdings, wallet_names), args.repeat)
+        from_dicts_ms = time_per_call(lambda: aggregate_portfolio(dicts, wallet_names), args.repeat)
+        row = {
+            'positions': size,
+            'dict_bytes': dict_bytes,
+            'holding_bytes': holding_bytes,
+            'three_loops_ms': loops_ms,
+            'portfolio_ms': portfolio_ms,
+            'portfolio_from_dicts_ms': from_dicts_ms
+        }
+        results.append(row)
+        print(f"{size:>10}{dict_bytes / 1e6:>11.1f}{holding_bytes / 1e6:>12.1f}{loops_ms:>13.2f}"
+              f"{portfolio_ms:>14.2f}{from_dicts_ms:>15.2f}{loops_ms / portfolio_ms:>8.1f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
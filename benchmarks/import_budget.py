@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Import-time regression check for the collector
+Imports each collector entry point in a fresh interpreter with `-X importtime`
+and fails when it exceeds its startup budget or pulls in a heavy dependency
+that only a later stage should load
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['ccxt', 'googleapiclient', 'google.oauth2', 'docker', 'supabase']
+
+# Entry point -> (budget in ms, heavy modules it may import)
+BUDGETS = {
+    'services.gary_wealth': (50, []),
+    'services.collector.cli': (100, []),
+    'services.collector.database': (100, []),
+    'services.collector.holdings': (250, []),
+    'services.collector.prices': (100, []),
+    'services.collector.sheets': (100, []),
+    'services.collector.run': (300, []),
+}
+
+
+def measure(module: str):
+    """
+    Import `module` in a fresh interpreter
+
+    Returns:
+        Tuple of (cumulative import time in ms, heavy modules that ended up imported)
+    """
+    check = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', check],
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.split('|')[-1].strip() == module:
+            cumulative_us = int(line.split('|')[1])
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return cumulative_us / 1000, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check collector import times against their budgets')
+    parser.add_argument('--runs', type=int, default=3, help='Best of N imports per module')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply every budget (slow CI machines)')
+    args = parser.parse_args()
+
+    print("📦 Collector Import Budget Check")
+    print("=" * 70)
+    failures = []
+    for module, (budget_ms, allowed) in BUDGETS.items():
+        samples = [measure(module) for _ in range(args.runs)]
+        best_ms = min(ms for ms, _ in samples)
+        loaded = [name for name in samples[0][1] if name not in allowed]
+        limit_ms = budget_ms * args.scale
+
+        ok = best_ms <= limit_ms and not loaded
+        status = "✅" if ok else "❌"
+        print(f"{status} {module:<32} {best_ms:7.1f} ms (budget {limit_ms:.0f} ms)"
+              + (f"  heavy imports: {', '.join(loaded)}" if loaded else ""))
+        if not ok:
+            failures.append(module)
+
+    print("=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} entry point(s) over budget: {', '.join(failures)}")
+        sys.exit(1)
+    print("✅ All entry points within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the wealth ingest API
+Starts the app from create_app() under gunicorn, points it at a local fake
+PostgREST server, drives concurrent POSTs of data.json-shaped payloads and
+reports throughput, latency percentiles and RSS per worker
+
+Examples:
+    python benchmarks/load_test.py --profile gthread --concurrency 16 --requests 2000
+    python benchmarks/load_test.py --workers 4 --worker-class gthread --threads 8 --latency-ms 80
+    python benchmarks/load_test.py --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+import argparse
+import copy
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_postgrest import start_fake_postgrest, FAKE_SUPABASE_KEY  # noqa: E402
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+ENDPOINT = '/utgl-gary-wealth-data'
+
+
+def build_payloads(sizes):
+    """
+    Payloads shaped like data.json: one account object, or a list of N accounts
+    built by repeating the sample accounts with distinct account ids
+
+    Returns:
+        Dictionary of size label -> encoded JSON body
+    """
+    with open(os.path.join(REPO_DIR, 'data.json'), 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+    accounts = sample if isinstance(sample, list) else [sample]
+
+    payloads = {}
+    for size in sizes:
+        if size == 1:
+            body = accounts[0]
+        else:
+            body = []
+            for i in range(size):
+                account = copy.deepcopy(accounts[i % len(accounts)])
+                account['accountId'] = f"{account.get('accountId', 'account')}-{i}"
+                body.append(account)
+        payloads[f"{size} account{'s' if size != 1 else ''}"] = json.dumps(body).encode()
+    return payloads
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(port: int, args, supabase_url: str) -> subprocess.Popen:
+    """Start gunicorn serving create_app() and wait until it answers"""
+    env = dict(os.environ)
+    env.update({
+        'SUPABASE_URL': supabase_url,
+        'SUPABASE_KEY': FAKE_SUPABASE_KEY,
+        'ENV_FILE': os.devnull,  # never pick up the real project from env.yaml
+        'ENV': 'benchmark',
+    })
+    env.update(dict(item.split('=', 1) for item in args.env))
+
+    if args.profile:
+        env['WEB_PROFILE'] = args.profile
+
+    # Explicit flags override the runtime profile from gunicorn.conf.py
+    cmd = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+           '--bind', f'127.0.0.1:{port}', '--log-level', 'warning']
+    for flag, value in (('--workers', args.workers), ('--worker-class', args.worker_class), ('--threads', args.threads)):
+        if value is not None:
+            cmd += [flag, str(value)]
+    cmd.append('app:create_app()')
+    process = subprocess.Popen(cmd, cwd=REPO_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if args.quiet else None)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except requests.exceptions.ConnectionError:
+            pass
+        time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start within 30s")
+
+
+def worker_pids(master_pid: int):
+    """Gunicorn worker processes are the direct children of the master"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == master_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def rss_mb(pid: int):
+    """Current and peak resident set size of a process in MB (Linux only)"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    key, value = line.split(':', 1)
+                    values[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return None
+    return {'rss_mb': round(values.get('VmRSS', 0), 1), 'peak_rss_mb': round(values.get('VmHWM', 0), 1)}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_load(url: str, body: bytes, total: int, concurrency: int):
+    """
+    Send `total` POSTs with `concurrency` client threads
+
+    Returns:
+        Dictionary with throughput, latency percentiles (ms) and status counts
+    """
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    local = threading.local()
+    headers = {'Content-Type': 'application/json'}
+
+    def send(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            status = session.post(url, data=body, headers=headers, timeout=60).status_code
+        except requests.exceptions.RequestException:
+            status = 'error'
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith('2'))
+    return {
+        'requests': total,
+        'successful': ok,
+        'statuses': statuses,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(ok / wall, 1) if wall else 0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2) if latencies else 0
+        }
+    }
+
+
+def print_result(label: str, result) -> None:
+    latency = result['latency_ms']
+    print(f"📦 {label:<14} {result['throughput_rps']:8.1f} req/s  "
+          f"p50 {latency['p50']:7.1f} ms  p95 {latency['p95']:7.1f} ms  p99 {latency['p99']:7.1f} ms  "
+          f"ok {result['successful']}/{result['requests']}")
+
+
+def compare(paths) -> None:
+    """Print several saved results side by side"""
+    runs = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            runs.append((os.path.basename(path), json.load(f)))
+
+    labels = list(runs[0][1]['results'].keys())
+    for label in labels:
+        print(f"\n📦 {label}")
+        for name, run in runs:
+            result = run['results'].get(label)
+            if result:
+                latency = result['latency_ms']
+                print(f"   {name:<48} {result['throughput_rps']:8.1f} req/s  "
+                      f"p50 {latency['p50']:7.1f}  p95 {latency['p95']:7.1f}  p99 {latency['p99']:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the wealth ingest API against a fake PostgREST')
+    parser.add_argument('--profile', choices=['auto', 'sync', 'gthread', 'gevent'],
+                        help='WEB_PROFILE for gunicorn.conf.py (default: the configured profile)')
+    parser.add_argument('--workers', type=int, help='Override the profile worker count')
+    parser.add_argument('--worker-class', help='Override the profile worker class')
+    parser.add_argument('--threads', type=int, help='Override the profile threads per worker')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent client connections')
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per payload size')
+    parser.add_argument('--sizes', default='1,6,100', help='Accounts per payload, comma separated')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Injected database latency')
+    parser.add_argument('--jitter-ms', type=float, default=10, help='Random extra database latency')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of database calls that fail')
+    parser.add_argument('--env', action='append', default=[], help='Extra KEY=VALUE for the app environment')
+    parser.add_argument('--label', default=None, help='Name used in the results file')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/loadtest-<label>-<time>.json)')
+    parser.add_argument('--quiet', action='store_true', help='Hide gunicorn output')
+    parser.add_argument('--compare', nargs='+', metavar='RESULT', help='Compare saved result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+        return
+
+    label = args.label or '-'.join(
+        part for part in (args.profile or args.worker_class or 'default',
+                          f"w{args.workers}" if args.workers else '',
+                          f"t{args.threads}" if args.threads else '') if part)
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    fake_server, fake_state = start_fake_postgrest(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                                   error_rate=args.error_rate)
+    port = free_port()
+
+    print("🚀 Wealth Ingest Load Test")
+    print(f"⚙️  gunicorn {label}; "
+          f"{args.concurrency} clients; DB latency {args.latency_ms:g}+{args.jitter_ms:g} ms, "
+          f"error rate {args.error_rate:g}")
+    print("=" * 100)
+
+    process = start_app(port, args, f"http://127.0.0.1:{fake_server.server_port}")
+    try:
+        url = f"http://127.0.0.1:{port}{ENDPOINT}"
+        results = {}
+        for size_label, body in build_payloads(sizes).items():
+            # Warm every worker (client creation, imports) before measuring
+            run_load(url, body, args.concurrency * 2, args.concurrency)
+            results[size_label] = run_load(url, body, args.requests, args.concurrency)
+            results[size_label]['payload_bytes'] = len(body)
+            print_result(size_label, results[size_label])
+
+        workers = {str(pid): rss_mb(pid) for pid in worker_pids(process.pid)}
+        print("\n🧠 RSS per worker: " + ", ".join(
+            f"{pid}: {info['rss_mb']} MB (peak {info['peak_rss_mb']} MB)" for pid, info in workers.items() if info))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        fake_server.shutdown()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"loadtest-{label}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'label': label,
+            'timestamp': datetime.now().isoformat(),
+            'settings': {
+                'profile': args.profile,
+                'workers': args.workers,
+                'worker_class': args.worker_class,
+                'threads': args.threads,
+                'concurrency': args.concurrency,
+                'requests': args.requests,
+                'db_latency_ms': args.latency_ms,
+                'db_jitter_ms': args.jitter_ms,
+                'db_error_rate': args.error_rate,
+                'env': args.env
+            },
+            'results': results,
+            'workers': workers,
+            'database_calls': fake_state.requests
+        }, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Overhead of the request profiler (services/request_profiler.py)
+Serves the same requests through the Flask test client with profiling off,
+with the hooks installed but the request not selected, and with every request
+profiled by cProfile and by the stack sampler. The routes measured never reach
+the database (endpoint info, and a wealth payload rejected by schema
+validation after parsing), so the numbers are the app's own CPU time.
+
+Examples:
+    python benchmarks/profiler_overhead.py
+    python benchmarks/profiler_overhead.py --requests 2000 --repeat 7 --json profiler.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from fake_postgrest import FAKE_SUPABASE_KEY  # noqa: E402
+
+VARIANTS = {
+    'disabled': {'PROFILE_ENABLED': False},
+    'enabled, not selected': {'PROFILE_ENABLED': True, 'PROFILE_SAMPLE_RATE': 0.0},
+    'cprofile every request': {'PROFILE_ENABLED': True, 'PROFILE_SAMPLE_RATE': 1.0, 'PROFILE_MODE': 'cprofile'},
+    'sampler every request': {'PROFILE_ENABLED': True, 'PROFILE_SAMPLE_RATE': 1.0, 'PROFILE_MODE': 'sampler'},
+}
+
+
+def build_client(settings, profile_dir):
+    from config.settings import config
+    import services.request_profiler as request_profiler
+    from app import create_app
+
+    config.config_data.update(settings, PROFILE_DIR=profile_dir, PROFILE_MAX_FILES=20, WEALTH_SCHEMA_VALIDATION=True)
+    request_profiler._active = False  # an earlier variant's hooks are gone with its app
+    return create_app().test_client()
+
+
+def time_requests(client, requests_per_run: int, repeat: int, body: bytes):
+    """Median microseconds per request for each route over `repeat` runs"""
+    routes = {
+        'GET /utgl-gary-wealth-data': lambda: client.get('/utgl-gary-wealth-data'),
+        'POST /utgl-gary-wealth-data (422)': lambda: client.post('/utgl-gary-wealth-data', data=body,
+                                                                 content_type='application/json'),
+    }
+    results = {}
+    for route, send in routes.items():
+        assert send().status_code in (200, 422), f"{route} failed"
+        runs = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(requests_per_run):
+                send()
+            runs.append((time.perf_counter() - started) / requests_per_run * 1e6)
+        results[route] = statistics.median(runs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark request profiler overhead')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per timed run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per variant (median is kept)')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    # Nothing here reaches a database; the URL only satisfies the configuration
+    os.environ.update({
+        'ENV_FILE': os.devnull,
+        'SUPABASE_URL': 'http://127.0.0.1:9',
+        'SUPABASE_KEY': FAKE_SUPABASE_KEY,
+        'SPOOL_ENABLED': 'false',
+    })
+    import logging
+
+    logging.disable(logging.WARNING)
+    # data.json with its last balance made a string: parsed in full, then rejected
+    with open(os.path.join(REPO_DIR, 'data.json'), 'r', encoding='utf-8') as f:
+        accounts = json.load(f)
+    balances = accounts[-1]['balances']
+    balances[next(reversed(balances))] = 'n/a'
+    body = json.dumps(accounts).encode()
+
+    from services.request_profiler import stage
+
+    profile_dir = tempfile.mkdtemp(prefix='profiler-bench-')
+    print("🧪 Request Profiler Overhead (µs per request, median of runs)")
+    print(f"{'Variant':<26}{'GET /utgl-gary-wealth-data':>32}{'POST /utgl-gary-wealth-data (422)':>36}")
+    print("-" * 94)
+    results = {}
+    try:
+        for name, settings in VARIANTS.items():
+            results[name] = time_requests(build_client(settings, profile_dir), args.requests, args.repeat, body)
+            baseline = results['disabled']
+            print(f"{name:<26}" + ''.join(
+                f"{micros:>{width}.1f} ({(micros / baseline[route] - 1) * 100:+6.1f}%)"
+                for width, (route, micros) in zip((22, 26), results[name].items())))
+
+        # What a stage() call in a route costs when the request isn't profiled
+        import services.request_profiler as request_profiler
+
+        request_profiler._active = False
+        number, _ = timeit.Timer(lambda: stage('db')).autorange()
+        stage_ns = min(timeit.repeat(lambda: stage('db'), number=number, repeat=5)) / number * 1e9
+        print(f"\n⏱️ stage() with profiling disabled: {stage_ns:.0f} ns per call")
+        print(f"📂 Profiles kept: {len(os.listdir(profile_dir))} (PROFILE_MAX_FILES=20)")
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'microseconds_per_request': results, 'disabled_stage_ns': stage_ns}, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Replay captured production traffic against a local app
+Reads the NDJSON files written by services/traffic_capture.py (CAPTURE_ENABLED)
+and sends the requests again at their recorded arrival times, scaled by
+--speed, or as fast as --concurrency allows with --speed max. Without
+--target it starts the app under gunicorn against the fake PostgREST server.
+Reports replay latency next to the latency recorded in production.
+
+Examples:
+    python benchmarks/replay_capture.py .state/capture
+    python benchmarks/replay_capture.py capture-20250101-120000-7-1.ndjson --speed 10
+    python benchmarks/replay_capture.py .state/capture --speed max --concurrency 32 --profile gthread
+    python benchmarks/replay_capture.py .state/capture --target http://127.0.0.1:8080
+"""
+import argparse
+import base64
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_postgrest import start_fake_postgrest  # noqa: E402
+from load_test import free_port, percentile, start_app  # noqa: E402
+
+CAPTURE_PREFIX = 'capture-'
+CAPTURE_SUFFIX = '.ndjson'
+
+# Set by requests itself or meaningless for a different server
+SKIPPED_HEADERS = {'host', 'content-length', 'connection', 'transfer-encoding', 'keep-alive', 'accept-encoding'}
+
+
+def capture_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path))
+                      if name.startswith(CAPTURE_PREFIX) and name.endswith(CAPTURE_SUFFIX)]
+        else:
+            files.append(path)
+    return files
+
+
+def load_capture(paths):
+    """Captured requests from files or directories, in arrival order"""
+    records = []
+    for path in capture_files(paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # A line torn by a crash while capturing
+    records.sort(key=lambda record: record['ts'])
+    return records
+
+
+def request_body(record):
+    """
+    Body to replay
+
+    Returns:
+        Bytes, or None when the request had a body that wasn't captured (CAPTURE_BODIES off)
+    """
+    if 'body' in record:
+        return record['body'].encode('utf-8')
+    if 'body_b64' in record:
+        return base64.b64decode(record['body_b64'])
+    return b'' if not record.get('body_bytes') else None
+
+
+def replay_headers(record):
+    return {name: value for name, value in record['headers'].items()
+            if name.lower() not in SKIPPED_HEADERS and value != 'REDACTED'}
+
+
+def peak_overlap(intervals):
+    """Most intervals open at the same moment"""
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    current = peak = 0
+    for _, change in events:
+        current += change
+        peak = max(peak, current)
+    return peak
+
+
+def replay(records, target: str, speed, concurrency: int, timeout: float):
+    """
+    Send every replayable record to `target`
+
+    Args:
+        speed: Time scale for recorded arrival times (2 = twice as fast), or None for no pacing
+
+    Returns:
+        Tuple of (results, skipped count, wall time in seconds)
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    results = []
+    lock = threading.Lock()
+    skipped = 0
+
+    def send(record, body, scheduled):
+        sent = time.monotonic()
+        url = f"{target}{record['path']}{'?' + record['query'] if record.get('query') else ''}"
+        try:
+            response = session.request(record['method'], url, data=body, headers=replay_headers(record),
+                                        timeout=timeout)
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+        finished = time.monotonic()
+        with lock:
+            results.append({
+                'route': f"{record['method']} {record['path']}",
+                'status': status,
+                'recorded_status': record.get('status'),
+                'latency_ms': (finished - sent) * 1000,
+                'recorded_ms': record.get('duration_ms'),
+                'lag_ms': (sent - scheduled) * 1000 if scheduled is not None else 0.0,
+                'interval': (sent, finished)
+            })
+
+    first_ts = records[0]['ts'] if records else 0
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for record in records:
+            body = request_body(record)
+            if body is None:
+                skipped += 1
+                continue
+            scheduled = None
+            if speed:
+                scheduled = started + (record['ts'] - first_ts) / speed
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(send, record, body, scheduled)
+    elapsed = time.monotonic() - started
+    session.close()
+    return results, skipped, elapsed
+
+
+def summarize(values):
+    ordered = sorted(value for value in values if value is not None)
+    return {
+        'p50': round(percentile(ordered, 50), 1),
+        'p95': round(percentile(ordered, 95), 1),
+        'p99': round(percentile(ordered, 99), 1)
+    }
+
+
+def build_report(records, results, skipped: int, elapsed: float, speed):
+    routes = defaultdict(list)
+    for result in results:
+        routes[result['route']].append(result)
+
+    recorded_intervals = [(record['ts'], record['ts'] + record.get('duration_ms', 0) / 1000) for record in records]
+    return {
+        'speed': speed or 'max',
+        'requests': len(results),
+        'skipped_without_body': skipped,
+        'wall_time_s': round(elapsed, 2),
+        'throughput_rps': round(len(results) / elapsed, 1) if elapsed else 0,
+        'recorded_span_s': round(records[-1]['ts'] - records[0]['ts'], 2) if records else 0,
+        'recorded_peak_concurrency': peak_overlap(recorded_intervals),
+        'replay_peak_concurrency': peak_overlap([result['interval'] for result in results]),
+        'schedule_lag_ms': summarize(result['lag_ms'] for result in results),
+        'status_mismatches': sum(1 for result in results if result['status'] != result['recorded_status']),
+        'routes': {
+            route: {
+                'count': len(items),
+                'recorded_ms': summarize(item['recorded_ms'] for item in items),
+                'replay_ms': summarize(item['latency_ms'] for item in items),
+                'statuses': dict(sorted(
+                    (str(status), sum(1 for item in items if item['status'] == status))
+                    for status in {item['status'] for item in items}))
+            }
+            for route, items in sorted(routes.items())
+        }
+    }
+
+
+def print_report(report) -> None:
+    pace = 'maximum speed' if report['speed'] == 'max' else f"{report['speed']:g}x"
+    print(f"\n📊 Replayed {report['requests']} requests at {pace} in {report['wall_time_s']}s "
+          f"({report['throughput_rps']} req/s; recorded span {report['recorded_span_s']}s)")
+    if report['skipped_without_body']:
+        print(f"⏭️ Skipped {report['skipped_without_body']} requests captured without their body (CAPTURE_BODIES off)")
+    print(f"🔀 Peak concurrency: recorded {report['recorded_peak_concurrency']}, "
+          f"replay {report['replay_peak_concurrency']}; schedule lag p50 {report['schedule_lag_ms']['p50']} ms, "
+          f"p99 {report['schedule_lag_ms']['p99']} ms")
+    print(f"{'Route':<40}{'Count':>7}{'Recorded p50/p95/p99 ms':>28}{'Replay p50/p95/p99 ms':>28}  Statuses")
+    print("-" * 120)
+    for route, info in report['routes'].items():
+        recorded, replayed = info['recorded_ms'], info['replay_ms']
+        print(f"{route:<40}{info['count']:>7}"
+              f"{recorded['p50']:>12}/{recorded['p95']}/{recorded['p99']:<8}"
+              f"{replayed['p50']:>12}/{replayed['p95']}/{replayed['p99']:<8}  "
+              + ', '.join(f"{status}: {count}" for status, count in info['statuses'].items()))
+    if report['status_mismatches']:
+        print(f"⚠️ {report['status_mismatches']} responses differ from the recorded status")
+    print("Recorded latency is time spent in the production app; replay latency is the local round trip.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay captured traffic against a local app')
+    parser.add_argument('captures', nargs='+', help='Capture files or directories')
+    parser.add_argument('--speed', default='1', help="Arrival-time scale: 1 (recorded pace), N (N times faster) or 'max'")
+    parser.add_argument('--concurrency', type=int, default=64, help='Maximum requests in flight')
+    parser.add_argument('--target', help='Base URL of a running app (default: start one against a fake PostgREST)')
+    parser.add_argument('--profile', choices=['auto', 'sync', 'gthread', 'gevent'], help='WEB_PROFILE for the local app')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Injected database latency for the local app')
+    parser.add_argument('--jitter-ms', type=float, default=10, help='Random extra database latency for the local app')
+    parser.add_argument('--env', action='append', default=[], help='Extra KEY=VALUE for the local app environment')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--json', help='Write the report to this file')
+    args = parser.parse_args()
+
+    speed = None if args.speed == 'max' else float(args.speed)
+    records = load_capture(args.captures)
+    if not records:
+        print("❌ No captured requests found")
+        sys.exit(1)
+    print("🔁 Traffic Replay")
+    print(f"📂 {len(records)} captured requests from {len(capture_files(args.captures))} files")
+
+    fake_server = process = None
+    target = args.target
+    if not target:
+        fake_server, _ = start_fake_postgrest(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+        port = free_port()
+        app_args = argparse.Namespace(profile=args.profile, workers=None, worker_class=None, threads=None,
+                                      env=args.env, quiet=True)
+        process = start_app(port, app_args, f"http://127.0.0.1:{fake_server.server_port}")
+        target = f"http://127.0.0.1:{port}"
+        print(f"🚀 Local app on {target} (fake PostgREST {args.latency_ms:g}+{args.jitter_ms:g} ms)")
+
+    try:
+        results, skipped, elapsed = replay(records, target.rstrip('/'), speed, args.concurrency, args.timeout)
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if fake_server:
+            fake_server.shutdown()
+
+    report = build_report(records, results, skipped, elapsed, speed)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Automation Service API
+Reports the import-time breakdown of `app` and the time from process start to
+the first successful request under gunicorn (or the Flask dev server)
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time_breakdown(module: str = 'app', env: dict = None):
+    """
+    Run `python -X importtime -c "import <module>"` and attribute the cumulative
+    time of `module` to the packages it imports directly
+
+    Returns:
+        Tuple of (total milliseconds, list of (package, milliseconds) sorted by cost)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    # importtime prints children before their parent, indented two spaces per level
+    children = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, raw_name = line[len('import time:'):].split('|')
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        name = raw_name.strip()
+        if depth == 1:
+            children.append((name, int(cumulative_us)))
+        elif depth == 0:
+            if name == module:
+                total_us = int(cumulative_us)
+                break
+            children = []
+
+    packages = {}
+    for name, cost in children:
+        top = name.split('.')[0]
+        packages[top] = packages.get(top, 0) + cost
+
+    breakdown = sorted(((name, us / 1000) for name, us in packages.items()), key=lambda x: x[1], reverse=True)
+    return total_us / 1000, breakdown
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(server: str, path: str, env: dict, timeout: float = 60):
+    """
+    Start the app in a fresh process and poll `path` until it answers 2xx
+
+    Returns:
+        Seconds from spawning the server to the first successful response
+    """
+    port = free_port()
+    if server == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+               '--bind', f'127.0.0.1:{port}', '--workers', '1', 'app:app']
+    else:
+        cmd = [sys.executable, '-c',
+               f"from app import app; app.run(host='127.0.0.1', port={port}, debug=False)"]
+
+    started = time.monotonic()
+    process = subprocess.Popen(cmd, cwd=REPO_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        while time.monotonic() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"{server} exited with code {process.returncode}")
+            try:
+                response = requests.get(url, timeout=2)
+                if 200 <= response.status_code < 300:
+                    return time.monotonic() - started
+            except requests.exceptions.ConnectionError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"No successful response from {url} within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Automation Service cold-start latency')
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--path', default='/', help='Endpoint polled for the first successful request')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--eager', action='store_true', help='Benchmark with FAST_STARTUP=false')
+    parser.add_argument('--top', type=int, default=10, help='Number of packages shown in the breakdown')
+    parser.add_argument('--json', help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env['FAST_STARTUP'] = 'false' if args.eager else 'true'
+    env.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+    env.setdefault('SUPABASE_KEY', 'benchmark')
+
+    print("🚀 Automation Service Startup Benchmark")
+    print(f"⚙️  Mode: {'eager' if args.eager else 'fast'} startup, server: {args.server}")
+    print("=" * 50)
+
+    total_ms, breakdown = import_time_breakdown('app', env)
+    print(f"\n📦 import app: {total_ms:.1f} ms")
+    for name, ms in breakdown[:args.top]:
+        print(f"   {name:<24} {ms:8.1f} ms")
+
+    timings = [time_to_first_request(args.server, args.path, env) for _ in range(args.runs)]
+    print(f"\n⏱️  Time to first successful {args.path} ({args.runs} runs): "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'mode': 'eager' if args.eager else 'fast',
+                'server': args.server,
+                'import_ms': total_ms,
+                'import_breakdown_ms': dict(breakdown),
+                'first_request_s': timings
+            }, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cost of validating wealth payloads (services/wealth_schema.py)
+Times, per payload size, what the endpoint spends turning a request body
+into data: plain json.loads (no schema), the pure-Python validator and the
+msgspec validator when installed, for a valid payload and for one whose last
+balance is a string (rejected only after scanning everything before it)
+
+Examples:
+    python benchmarks/validation_benchmark.py
+    python benchmarks/validation_benchmark.py --sizes 1,6,100,1000 --json validation.json
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import timeit
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+os.environ.setdefault('ENV_FILE', os.devnull)
+
+from services.wealth_schema import MSGSPEC_AVAILABLE, PythonWealthValidator, SchemaError  # noqa: E402
+
+
+def build_body(size: int, invalid: bool = False) -> bytes:
+    """data.json accounts repeated to `size` accounts; `invalid` makes the last balance a string"""
+    with open(os.path.join(REPO_DIR, 'data.json'), 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+    accounts = sample if isinstance(sample, list) else [sample]
+    body = []
+    for i in range(size):
+        account = copy.deepcopy(accounts[i % len(accounts)])
+        account['accountId'] = f"{account['accountId']}-{i}"
+        body.append(account)
+    if invalid:
+        balances = body[-1]['balances']
+        balances[next(reversed(balances))] = 'n/a'
+    return json.dumps(body).encode()
+
+
+def time_per_call(func, body: bytes, repeat: int) -> float:
+    """Best of `repeat` runs in microseconds per call; each run lasts at least 0.2 s"""
+    timer = timeit.Timer(lambda: func(body))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def rejecting(validator):
+    def decode(body):
+        try:
+            validator.decode(body)
+        except SchemaError:
+            return
+        raise AssertionError('invalid payload was accepted')
+    return decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark wealth payload validation')
+    parser.add_argument('--sizes', default='1,6,100,1000', help='Accounts per payload, comma separated')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is kept)')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    candidates = {'json.loads (no schema)': json.loads, 'python validator': PythonWealthValidator().decode}
+    if MSGSPEC_AVAILABLE:
+        from services.wealth_schema import MsgspecWealthValidator
+
+        candidates['msgspec validator'] = MsgspecWealthValidator().decode
+    else:
+        print("⚠️ msgspec not installed; pip install msgspec to include it")
+
+    print("🧪 Wealth Payload Validation Cost (µs per payload)")
+    print(f"{'Accounts':>9}{'Bytes':>11}  " + ''.join(f"{name:>24}" for name in candidates)
+          + f"{'reject (python)':>18}" + (f"{'reject (msgspec)':>18}" if MSGSPEC_AVAILABLE else ''))
+    print("-" * (20 + 24 * len(candidates) + 18 * (2 if MSGSPEC_AVAILABLE else 1)))
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        body, invalid_body = build_body(size), build_body(size, invalid=True)
+        row = {'accounts': size, 'bytes': len(body)}
+        for name, func in candidates.items():
+            row[name] = time_per_call(func, body, args.repeat)
+        row['reject (python)'] = time_per_call(rejecting(PythonWealthValidator()), invalid_body, args.repeat)
+        if MSGSPEC_AVAILABLE:
+            row['reject (msgspec)'] = time_per_call(rejecting(MsgspecWealthValidator()), invalid_body, args.repeat)
+        results.append(row)
+        print(f"{size:>9}{len(body):>11}  " + ''.join(f"{row[name]:>24.1f}" for name in candidates)
+              + f"{row['reject (python)']:>18.1f}" + (f"{row['reject (msgspec)']:>18.1f}" if MSGSPEC_AVAILABLE else ''))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Runtime profile for the gunicorn server
+Derives the worker model, worker count and threads from the configured
+profile and the CPUs and memory actually available to the container
+(cgroup limits first, then the host)
+"""
+import importlib.util
+import logging
+import math
+import os
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ('auto', 'sync', 'gthread', 'gevent')
+
+# Memory kept for the gunicorn master and the preloaded app before workers are counted
+MASTER_MEMORY_MB = 64
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> float:
+    """CPU quota of this container (cgroup v2, then v1), else the CPUs this process may run on"""
+    quota = _read('/sys/fs/cgroup/cpu.max')
+    if quota:
+        limit, period = quota.split()
+        if limit != 'max':
+            return int(limit) / int(period)
+
+    limit, period = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if limit and period and int(limit) > 0:
+        return int(limit) / int(period)
+
+    try:
+        return float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return float(os.cpu_count() or 1)
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memory limit of this container (cgroup v2, then v1), else total host memory; None if unknown"""
+    limit = _read('/sys/fs/cgroup/memory.max')
+    if limit and limit != 'max':
+        return int(limit) // (1024 * 1024)
+
+    limit = _read('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    # cgroup v1 reports "unlimited" as a huge page-aligned number
+    if limit and int(limit) < 1 << 60:
+        return int(limit) // (1024 * 1024)
+
+    meminfo = _read('/proc/meminfo')
+    if meminfo:
+        for line in meminfo.splitlines():
+            if line.startswith('MemTotal:'):
+                return int(line.split()[1]) // 1024
+    return None
+
+
+def resolve_runtime_profile(config) -> Dict[str, Any]:
+    """
+    Work out the gunicorn settings for the configured profile
+
+    Profiles (the endpoints spend most of their time waiting on Supabase):
+        sync:    2 x CPUs + 1 single-threaded workers
+        gthread: CPUs + 1 workers with 4 threads per CPU each
+        gevent:  one worker per CPU with many greenlet connections (needs gevent installed)
+        auto:    gthread
+
+    Worker counts are capped so that every worker fits in the container memory
+    limit, and WEB_WORKERS / WEB_THREADS override the derived values.
+
+    Args:
+        config: Config instance (config.settings.config)
+
+    Returns:
+        Dictionary with profile, worker_class, workers, threads, worker_connections,
+        keepalive, preload_app, cpus and memory_mb
+    """
+    profile = config.web_profile
+    if profile not in PROFILES:
+        logger.warning(f"Unknown WEB_PROFILE '{profile}', using auto")
+        profile = 'auto'
+    if profile == 'auto':
+        profile = 'gthread'
+    if profile == 'gevent' and importlib.util.find_spec('gevent') is None:
+        logger.warning("WEB_PROFILE is gevent but gevent is not installed, using gthread")
+        profile = 'gthread'
+
+    cpus = available_cpus()
+    memory_mb = available_memory_mb()
+    whole_cpus = max(1, math.ceil(cpus))
+
+    if profile == 'sync':
+        workers, threads = 2 * whole_cpus + 1, 1
+    elif profile == 'gthread':
+        workers, threads = whole_cpus + 1, 4 * whole_cpus
+    else:
+        workers, threads = whole_cpus, 1
+
+    if memory_mb:
+        workers = min(workers, max(1, (memory_mb - MASTER_MEMORY_MB) // config.web_worker_memory_mb))
+    workers = config.web_workers or workers
+    if profile == 'gthread':
+        threads = config.web_threads or threads
+
+    return {
+        'profile': profile,
+        'worker_class': profile,
+        'workers': workers,
+        'threads': threads,
+        'worker_connections': config.web_worker_connections,
+        'keepalive': config.web_keepalive,
+        # gevent must patch the standard library before the app (and ssl) is imported
+        'preload_app': profile != 'gevent',
+        'cpus': cpus,
+        'memory_mb': memory_mb
+    }
@@ -2,29 +2,45 @@
 Configuration management for the Gary Wealth Data API
 """
 import os
-import yaml
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+def _as_bool(value: Any) -> bool:
+    """env.yaml values may be quoted strings ("false") rather than YAML booleans"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes')
+    return bool(value)
+
 class Config:
     """Configuration class for loading environment settings"""
     
     def __init__(self):
-        self.config_data = self._load_config()
+        # Loaded on first access. create_app() reads it, so importing app loads env.yaml once
+        # in the gunicorn master; importing config.settings on its own (collector, scripts) does not
+        self._config_data: Optional[Dict[str, Any]] = None
+    
+    @property
+    def config_data(self) -> Dict[str, Any]:
+        if self._config_data is None:
+            self._config_data = self._load_config()
+        return self._config_data
         
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration from env.yaml or environment variables"""
+        import yaml
+        
         config = {}
         
-        # Try to load from env.yaml first
+        # Try to load from env.yaml first (ENV_FILE points elsewhere, e.g. for local benchmarks)
+        env_file = os.getenv('ENV_FILE', 'env.yaml')
         try:
-            with open('env.yaml', 'r') as file:
+            with open(env_file, 'r') as file:
                 config = yaml.safe_load(file) or {}
-                logger.info("Loaded configuration from env.yaml")
+                logger.info(f"Loaded configuration from {env_file}")
         except FileNotFoundError:
-            logger.info("env.yaml not found, using environment variables")
+            logger.info(f"{env_file} not found, using environment variables")
         
         # Fallback to environment variables
         config.setdefault('SUPABASE_URL', os.getenv('SUPABASE_URL'))
@@ -32,6 +48,42 @@ class Config:
         config.setdefault('ENV', os.getenv('ENV', 'development'))
         config.setdefault('DEBUG', os.getenv('DEBUG', 'false').lower() == 'true')
         config.setdefault('PORT', int(os.getenv('PORT', 8080)))
+        config.setdefault('FAST_STARTUP', os.getenv('FAST_STARTUP', 'true').lower() == 'true')
+        config.setdefault('WARMUP_DB', os.getenv('WARMUP_DB', 'false').lower() == 'true')
+        config.setdefault('WEB_PROFILE', os.getenv('WEB_PROFILE', 'auto'))
+        config.setdefault('WEB_WORKERS', os.getenv('WEB_WORKERS'))
+        config.setdefault('WEB_THREADS', os.getenv('WEB_THREADS'))
+        config.setdefault('WEB_WORKER_CONNECTIONS', int(os.getenv('WEB_WORKER_CONNECTIONS', 200)))
+        config.setdefault('WEB_WORKER_MEMORY_MB', int(os.getenv('WEB_WORKER_MEMORY_MB', 128)))
+        config.setdefault('WEB_KEEPALIVE', int(os.getenv('WEB_KEEPALIVE', 620)))
+        config.setdefault('SPOOL_ENABLED', os.getenv('SPOOL_ENABLED', 'false').lower() == 'true')
+        config.setdefault('SPOOL_DIR', os.getenv('SPOOL_DIR'))
+        config.setdefault('INSERT_LATENCY_BUDGET', float(os.getenv('INSERT_LATENCY_BUDGET', 2.0)))
+        config.setdefault('SPOOL_FSYNC_INTERVAL_MS', int(os.getenv('SPOOL_FSYNC_INTERVAL_MS', 20)))
+        config.setdefault('SPOOL_REPLAY_BATCH', int(os.getenv('SPOOL_REPLAY_BATCH', 50)))
+        config.setdefault('SPOOL_MAX_ATTEMPTS', int(os.getenv('SPOOL_MAX_ATTEMPTS', 5)))
+        config.setdefault('BALANCE_FACTS_ENABLED', os.getenv('BALANCE_FACTS_ENABLED', 'false').lower() == 'true')
+        config.setdefault('PORTFOLIO_TOTALS_ENABLED', os.getenv('PORTFOLIO_TOTALS_ENABLED', 'false').lower() == 'true')
+        config.setdefault('CAPTURE_ENABLED', os.getenv('CAPTURE_ENABLED', 'false').lower() == 'true')
+        config.setdefault('CAPTURE_DIR', os.getenv('CAPTURE_DIR', os.path.join('.state', 'capture')))
+        config.setdefault('CAPTURE_SAMPLE_RATE', float(os.getenv('CAPTURE_SAMPLE_RATE', 1.0)))
+        config.setdefault('CAPTURE_BODIES', os.getenv('CAPTURE_BODIES', 'false').lower() == 'true')
+        config.setdefault('CAPTURE_MAX_FILE_MB', int(os.getenv('CAPTURE_MAX_FILE_MB', 16)))
+        config.setdefault('CAPTURE_MAX_FILES', int(os.getenv('CAPTURE_MAX_FILES', 20)))
+        config.setdefault('WEALTH_SCHEMA_VALIDATION', os.getenv('WEALTH_SCHEMA_VALIDATION', 'false').lower() == 'true')
+        config.setdefault('RATE_LIMIT_ENABLED', os.getenv('RATE_LIMIT_ENABLED', 'false').lower() == 'true')
+        config.setdefault('RATE_LIMITS', os.getenv('RATE_LIMITS', 'POST /utgl-gary-wealth-data=60/minute:20'))
+        config.setdefault('RATE_LIMIT_STORE', os.getenv('RATE_LIMIT_STORE', os.path.join('.state', 'ratelimit.sqlite3')))
+        config.setdefault('RATE_LIMIT_PROXY_HOPS', int(os.getenv('RATE_LIMIT_PROXY_HOPS', 1)))
+        config.setdefault('API_KEYS', os.getenv('API_KEYS'))
+        config.setdefault('PROFILE_ENABLED', os.getenv('PROFILE_ENABLED', 'false').lower() == 'true')
+        config.setdefault('PROFILE_SECRET', os.getenv('PROFILE_SECRET'))
+        config.setdefault('PROFILE_SAMPLE_RATE', float(os.getenv('PROFILE_SAMPLE_RATE', 0.0)))
+        config.setdefault('PROFILE_MODE', os.getenv('PROFILE_MODE', 'cprofile'))
+        config.setdefault('PROFILE_INTERVAL_MS', float(os.getenv('PROFILE_INTERVAL_MS', 1.0)))
+        config.setdefault('PROFILE_DIR', os.getenv('PROFILE_DIR', os.path.join('.state', 'profiles')))
+        config.setdefault('PROFILE_MAX_FILES', int(os.getenv('PROFILE_MAX_FILES', 50)))
+        config.setdefault('EXPORT_PAGE_SIZE', int(os.getenv('EXPORT_PAGE_SIZE', 500)))
         
         return config
     
@@ -46,6 +98,8 @@ class Config:
         
         if missing_keys:
             raise ValueError(f"Missing required configuration: {missing_keys}")
+        if self.spool_enabled and not self.spool_dir:
+            raise ValueError("SPOOL_ENABLED requires SPOOL_DIR on a persistent volume")
     
     @property
     def supabase_url(self) -> str:
@@ -66,6 +120,186 @@ class Config:
     @property
     def port(self) -> int:
         return self.get('PORT', 8080)
+    
+    @property
+    def fast_startup(self) -> bool:
+        """Defer heavy imports (supabase) until the first database call or warmup"""
+        return _as_bool(self.get('FAST_STARTUP', True))
+    
+    @property
+    def warmup_db(self) -> bool:
+        """Create the database client in each worker before it accepts traffic"""
+        return _as_bool(self.get('WARMUP_DB', False))
+
+    @property
+    def web_profile(self) -> str:
+        """Gunicorn worker model: auto, sync, gthread or gevent"""
+        return str(self.get('WEB_PROFILE', 'auto')).strip().lower()
+    
+    @property
+    def web_workers(self) -> Optional[int]:
+        """Fixed worker count; derived from CPUs and memory when unset"""
+        value = self.get('WEB_WORKERS')
+        return int(value) if value else None
+    
+    @property
+    def web_threads(self) -> Optional[int]:
+        """Fixed threads per gthread worker; derived from CPUs when unset"""
+        value = self.get('WEB_THREADS')
+        return int(value) if value else None
+    
+    @property
+    def web_worker_connections(self) -> int:
+        """Concurrent connections per gevent worker"""
+        return int(self.get('WEB_WORKER_CONNECTIONS', 200))
+    
+    @property
+    def web_worker_memory_mb(self) -> int:
+        """Memory budgeted per worker when capping the worker count to the container limit"""
+        return int(self.get('WEB_WORKER_MEMORY_MB', 128))
+    
+    @property
+    def web_keepalive(self) -> int:
+        """Seconds to hold idle keep-alive connections; longer than the Cloud Run front end's 600s idle timeout"""
+        return int(self.get('WEB_KEEPALIVE', 620))
+
+    @property
+    def spool_enabled(self) -> bool:
+        """Spool inserts to disk when the database fails or is slow, instead of returning an error"""
+        return _as_bool(self.get('SPOOL_ENABLED', False))
+    
+    @property
+    def spool_dir(self) -> Optional[str]:
+        """Spool root; must survive restarts (a mounted volume, not the container's in-memory filesystem)"""
+        return self.get('SPOOL_DIR')
+    
+    @property
+    def insert_latency_budget(self) -> float:
+        """Seconds an insert may take before the request is answered from the spool"""
+        return float(self.get('INSERT_LATENCY_BUDGET', 2.0))
+    
+    @property
+    def spool_fsync_interval(self) -> float:
+        """Seconds spool appends are batched before one shared fsync"""
+        return int(self.get('SPOOL_FSYNC_INTERVAL_MS', 20)) / 1000
+    
+    @property
+    def spool_replay_batch(self) -> int:
+        """Records per insert when draining the spool"""
+        return int(self.get('SPOOL_REPLAY_BATCH', 50))
+    
+    @property
+    def spool_max_attempts(self) -> int:
+        """Times the database may reject a spooled record before it is dead-lettered"""
+        return int(self.get('SPOOL_MAX_ATTEMPTS', 5))
+
+    @property
+    def balance_facts_enabled(self) -> bool:
+        """Also write each snapshot's non-zero balances to utgl_gary_balance_facts (off until migrations/001 is applied)"""
+        return _as_bool(self.get('BALANCE_FACTS_ENABLED', False))
+
+    @property
+    def portfolio_totals_enabled(self) -> bool:
+        """Apply each snapshot to the running per-symbol totals (apply_balance_snapshot RPC; off until migrations/002 is applied)"""
+        return _as_bool(self.get('PORTFOLIO_TOTALS_ENABLED', False))
+
+    @property
+    def capture_enabled(self) -> bool:
+        """Record sampled requests to NDJSON files for replay (benchmarks/replay_capture.py)"""
+        return _as_bool(self.get('CAPTURE_ENABLED', False))
+    
+    @property
+    def capture_dir(self) -> str:
+        return self.get('CAPTURE_DIR', os.path.join('.state', 'capture'))
+    
+    @property
+    def capture_sample_rate(self) -> float:
+        """Fraction of requests captured"""
+        return float(self.get('CAPTURE_SAMPLE_RATE', 1.0))
+    
+    @property
+    def capture_bodies(self) -> bool:
+        """Store request bodies, not only their hashes; needed to replay POSTs"""
+        return _as_bool(self.get('CAPTURE_BODIES', False))
+    
+    @property
+    def capture_max_file_mb(self) -> int:
+        return int(self.get('CAPTURE_MAX_FILE_MB', 16))
+    
+    @property
+    def capture_max_files(self) -> int:
+        """Capture files kept; older ones are deleted"""
+        return int(self.get('CAPTURE_MAX_FILES', 20))
+
+    @property
+    def wealth_schema_validation(self) -> bool:
+        """Validate wealth payloads against the account schema and answer 422 before touching the database"""
+        return _as_bool(self.get('WEALTH_SCHEMA_VALIDATION', False))
+
+    @property
+    def rate_limit_enabled(self) -> bool:
+        """Apply per-client token-bucket limits (RATE_LIMITS) and answer 429 when exceeded"""
+        return _as_bool(self.get('RATE_LIMIT_ENABLED', False))
+
+    @property
+    def rate_limits(self) -> Any:
+        """Route limits, e.g. 'POST /utgl-gary-wealth-data=60/minute:20;*=600/minute'"""
+        return self.get('RATE_LIMITS', 'POST /utgl-gary-wealth-data=60/minute:20')
+
+    @property
+    def rate_limit_store(self) -> str:
+        """SQLite file holding the buckets shared by all workers on the host"""
+        return self.get('RATE_LIMIT_STORE', os.path.join('.state', 'ratelimit.sqlite3'))
+
+    @property
+    def rate_limit_proxy_hops(self) -> int:
+        """Proxies appending to X-Forwarded-For; the client IP is this many entries from the right (0: the peer address)"""
+        return int(self.get('RATE_LIMIT_PROXY_HOPS', 1))
+
+    @property
+    def api_keys(self) -> Any:
+        """Accepted X-API-Key values, a YAML list or comma-separated"""
+        return self.get('API_KEYS')
+
+
+    @property
+    def profile_enabled(self) -> bool:
+        """Profile requests that carry a signed X-Profile header or are sampled"""
+        return _as_bool(self.get('PROFILE_ENABLED', False))
+
+    @property
+    def profile_secret(self) -> Optional[str]:
+        """HMAC key for X-Profile header values (python -m services.request_profiler)"""
+        return self.get('PROFILE_SECRET')
+
+    @property
+    def profile_sample_rate(self) -> float:
+        """Fraction of requests profiled without a header"""
+        return float(self.get('PROFILE_SAMPLE_RATE', 0.0))
+
+    @property
+    def profile_mode(self) -> str:
+        """cprofile (.pstats files) or sampler (speedscope files)"""
+        return self.get('PROFILE_MODE', 'cprofile')
+
+    @property
+    def profile_interval_ms(self) -> float:
+        """Stack sampling interval of the sampler"""
+        return float(self.get('PROFILE_INTERVAL_MS', 1.0))
+
+    @property
+    def profile_dir(self) -> str:
+        return self.get('PROFILE_DIR', os.path.join('.state', 'profiles'))
+
+    @property
+    def profile_max_files(self) -> int:
+        """Profiles kept; older ones are deleted"""
+        return int(self.get('PROFILE_MAX_FILES', 50))
+
+    @property
+    def export_page_size(self) -> int:
+        """Snapshots per database page (and Parquet row group) of an export"""
+        return int(self.get('EXPORT_PAGE_SIZE', 500))
 
 # Global config instance
 config = Config()
@@ -0,0 +1,56 @@
+"""
+Gunicorn configuration for the Automation Service
+Used by the Dockerfile: gunicorn --config gunicorn.conf.py app:app
+
+The worker model comes from WEB_PROFILE (auto, sync, gthread or gevent) in
+env.yaml or the environment; worker and thread counts are derived from the
+container's CPU and memory limits unless WEB_WORKERS / WEB_THREADS are set.
+"""
+import os
+
+from config.runtime import resolve_runtime_profile
+# Imported under another name: gunicorn treats a module-level `config` as its own setting
+from config.settings import config as app_config
+
+runtime_profile = resolve_runtime_profile(app_config)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+worker_class = runtime_profile['worker_class']
+workers = runtime_profile['workers']
+threads = runtime_profile['threads']
+worker_connections = runtime_profile['worker_connections']
+timeout = 120
+# Keep idle connections open longer than the Cloud Run front end does, so it never
+# reuses a connection the worker has just closed (ignored by sync workers)
+keepalive = runtime_profile['keepalive']
+max_requests = 1000
+max_requests_jitter = 100
+
+# Import the app once in the master and fork workers from it. Safe because the
+# database client is created lazily per process and reset after fork.
+preload_app = runtime_profile['preload_app']
+
+if worker_class == 'gevent':
+    # supabase pulls in trio, which needs select.epoll at import time; gevent's monkey-patching
+    # removes it, so import supabase in the master before the workers patch the standard library
+    import supabase  # noqa: F401
+
+
+def when_ready(server):
+    server.log.info(
+        f"Runtime profile {runtime_profile['profile']}: {server.cfg.worker_class_str} workers, "
+        f"{server.cfg.workers} workers x {server.cfg.threads} threads "
+        f"({runtime_profile['cpus']:g} CPUs, {runtime_profile['memory_mb']} MB memory), keepalive {server.cfg.keepalive}s"
+    )
+
+
+def post_fork(server, worker):
+    """Give each worker its own database client, optionally created before traffic arrives"""
+    from services.database_service import db_service
+
+    db_service.reset_after_fork()
+    # Claim a spool slot now so records a previous worker left behind are replayed right away
+    db_service.start_spool()
+    if app_config.warmup_db:
+        ready = db_service.warmup()
+        server.log.info(f"Worker {worker.pid} database warmup {'done' if ready else 'failed'}")
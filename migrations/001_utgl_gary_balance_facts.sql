@@ -0,0 +1,50 @@
+-- Normalized balance facts for utgl_gary_wealth_records
+-- One row per (snapshot, account, symbol) with a non-zero balance, written by the API at ingest.
+-- Facts outlive their raw snapshot: when retention compaction deletes it, snapshot_id becomes null.
+-- Run in the Supabase SQL Editor after the utgl_gary_wealth_records table exists.
+
+create table if not exists utgl_gary_balance_facts (
+    id          bigint generated by default as identity primary key,
+    snapshot_id bigint      references utgl_gary_wealth_records (id) on delete set null,
+    date        timestamptz not null,
+    account_id  text        not null,
+    user_id     text,
+    symbol      text        not null,
+    balance     numeric     not null
+);
+
+-- Per-symbol history: where symbol = 'BTC' order by date desc
+create index if not exists utgl_gary_balance_facts_symbol_date_idx
+    on utgl_gary_balance_facts (symbol, date desc)
+    include (account_id, balance);
+
+-- Per-account history: where account_id = '...' [and symbol = '...'] order by date desc
+create index if not exists utgl_gary_balance_facts_account_date_idx
+    on utgl_gary_balance_facts (account_id, date desc, symbol)
+    include (balance);
+
+-- All facts of one snapshot (and the snapshot_id updates when one is deleted)
+create index if not exists utgl_gary_balance_facts_snapshot_idx
+    on utgl_gary_balance_facts (snapshot_id);
+
+-- Snapshots are read newest first
+create index if not exists utgl_gary_wealth_records_date_idx
+    on utgl_gary_wealth_records (date desc);
+
+-- Backfill facts for snapshots stored before this table existed
+insert into utgl_gary_balance_facts (snapshot_id, date, account_id, user_id, symbol, balance)
+select r.id,
+       r.date,
+       coalesce(account ->> 'accountId', ''),
+       account ->> 'userId',
+       balance.key,
+       (balance.value #>> '{}')::numeric
+from utgl_gary_wealth_records r
+cross join lateral jsonb_array_elements(
+    case jsonb_typeof(r.data) when 'array' then r.data else jsonb_build_array(r.data) end
+) as account
+cross join lateral jsonb_each(account -> 'balances') as balance
+where jsonb_typeof(account -> 'balances') = 'object'
+  and jsonb_typeof(balance.value) = 'number'
+  and (balance.value #>> '{}')::numeric <> 0
+  and not exists (select 1 from utgl_gary_balance_facts f where f.snapshot_id = r.id);
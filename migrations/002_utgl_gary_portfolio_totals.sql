@@ -0,0 +1,117 @@
+-- Incrementally maintained portfolio totals
+-- Each ingested snapshot is applied as a delta against the previous balances of the same
+-- accounts, so per-symbol totals are read in O(symbols) instead of re-aggregating snapshots.
+-- Run after 001_utgl_gary_balance_facts.sql.
+
+-- Latest balances of every account (only non-zero balances are stored)
+create table if not exists utgl_gary_account_balances (
+    account_id  text        not null,
+    symbol      text        not null,
+    user_id     text,
+    balance     numeric     not null,
+    snapshot_id bigint      not null,
+    date        timestamptz not null,
+    primary key (account_id, symbol)
+);
+
+-- Snapshot each account's balances were last taken from
+create table if not exists utgl_gary_account_snapshots (
+    account_id  text        primary key,
+    snapshot_id bigint      not null,
+    date        timestamptz not null
+);
+
+-- Cross-account totals per symbol
+create table if not exists utgl_gary_symbol_totals (
+    symbol     text        primary key,
+    total      numeric     not null default 0,
+    accounts   integer     not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+-- Apply one snapshot: p_accounts is [{"account_id", "user_id", "balances": {symbol: balance}}]
+-- An account with empty balances ({}) was emptied: its stored balances are replaced with nothing
+-- and subtracted from the totals.
+-- Returns the number of accounts applied; accounts whose stored snapshot is newer are skipped,
+-- so a snapshot replayed late from the API's spool never rolls the totals back.
+create or replace function apply_balance_snapshot(p_snapshot_id bigint, p_date timestamptz, p_accounts jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    account      jsonb;
+    v_account_id text;
+    v_last_date  timestamptz;
+    v_applied    integer := 0;
+begin
+    for account in select value from jsonb_array_elements(p_accounts) loop
+        v_account_id := account ->> 'account_id';
+        -- Serialize concurrent snapshots of the same account
+        perform pg_advisory_xact_lock(hashtext('utgl_gary_account:' || v_account_id));
+
+        select date into v_last_date from utgl_gary_account_snapshots where account_id = v_account_id;
+        if v_last_date is not null and v_last_date > p_date then
+            continue;
+        end if;
+
+        with new_balances as (
+            select b.key as symbol, (b.value #>> '{}')::numeric as balance
+            from jsonb_each(coalesce(account -> 'balances', '{}'::jsonb)) as b
+        ),
+        old_balances as (
+            select symbol, balance from utgl_gary_account_balances where account_id = v_account_id
+        ),
+        deltas as (
+            select coalesce(n.symbol, o.symbol) as symbol,
+                   coalesce(n.balance, 0) - coalesce(o.balance, 0) as delta,
+                   (n.symbol is not null)::integer - (o.symbol is not null)::integer as account_delta
+            from new_balances n
+            full outer join old_balances o on o.symbol = n.symbol
+        )
+        insert into utgl_gary_symbol_totals as t (symbol, total, accounts, updated_at)
+        select symbol, delta, account_delta, p_date
+        from deltas
+        where delta <> 0 or account_delta <> 0
+        on conflict (symbol) do update
+            set total = t.total + excluded.total,
+                accounts = t.accounts + excluded.accounts,
+                updated_at = greatest(t.updated_at, excluded.updated_at);
+
+        delete from utgl_gary_account_balances where account_id = v_account_id;
+        insert into utgl_gary_account_balances (account_id, symbol, user_id, balance, snapshot_id, date)
+        select v_account_id, b.key, account ->> 'user_id', (b.value #>> '{}')::numeric, p_snapshot_id, p_date
+        from jsonb_each(coalesce(account -> 'balances', '{}'::jsonb)) as b;
+
+        insert into utgl_gary_account_snapshots (account_id, snapshot_id, date)
+        values (v_account_id, p_snapshot_id, p_date)
+        on conflict (account_id) do update
+            set snapshot_id = excluded.snapshot_id,
+                date = excluded.date;
+
+        v_applied := v_applied + 1;
+    end loop;
+
+    delete from utgl_gary_symbol_totals where accounts = 0;
+    return v_applied;
+end;
+$$;
+
+-- Seed from the latest facts of every account when the totals are still empty
+insert into utgl_gary_account_snapshots (account_id, snapshot_id, date)
+select distinct on (account_id) account_id, snapshot_id, date
+from utgl_gary_balance_facts
+order by account_id, date desc, snapshot_id desc
+on conflict (account_id) do nothing;
+
+insert into utgl_gary_account_balances (account_id, symbol, user_id, balance, snapshot_id, date)
+select f.account_id, f.symbol, max(f.user_id), sum(f.balance), f.snapshot_id, f.date
+from utgl_gary_balance_facts f
+join utgl_gary_account_snapshots s on s.account_id = f.account_id and s.snapshot_id = f.snapshot_id
+group by f.account_id, f.symbol, f.snapshot_id, f.date
+on conflict (account_id, symbol) do nothing;
+
+insert into utgl_gary_symbol_totals (symbol, total, accounts, updated_at)
+select symbol, sum(balance), count(*), max(date)
+from utgl_gary_account_balances
+group by symbol
+on conflict (symbol) do nothing;
@@ -0,0 +1,37 @@
+-- Daily and weekly rollups written by the retention compaction job
+-- (python -m services.collector compact). Raw hourly snapshots older than RAW_RETENTION_DAYS are
+-- folded into one 'day' row per UTC day and deleted; 'day' rows older than DAILY_RETENTION_DAYS
+-- are folded into one 'week' row per ISO week (starting Monday) and deleted.
+-- Balance facts are kept: their foreign key (001) only clears snapshot_id when a raw snapshot is deleted.
+
+create table if not exists utgl_gary_wealth_rollups (
+    period           text        not null check (period in ('day', 'week')),
+    bucket_start     timestamptz not null,
+    bucket_end       timestamptz not null,
+    first_date       timestamptz not null,
+    last_date        timestamptz not null,
+    samples          integer     not null,
+    last_snapshot_id bigint,
+    -- {symbol: {"last": n, "min": n, "max": n}} of the cross-account total per symbol
+    symbols          jsonb       not null,
+    -- Raw snapshot ids (day) or day bucket starts (week) already folded in, so reruns are idempotent
+    sources          jsonb       not null default '[]'::jsonb,
+    updated_at       timestamptz not null default now(),
+    primary key (period, bucket_start)
+);
+
+-- Table sizes for the compaction report; space freed by deletes is reused after (auto)vacuum
+create or replace function wealth_storage_report()
+returns table (relation text, total_bytes bigint, live_rows bigint, dead_rows bigint)
+language sql
+stable
+as $$
+    select s.relname::text,
+           pg_total_relation_size(s.relid),
+           s.n_live_tup,
+           s.n_dead_tup
+    from pg_stat_user_tables s
+    where s.schemaname = 'public'
+      and s.relname in ('utgl_gary_wealth_records', 'utgl_gary_balance_facts', 'utgl_gary_wealth_rollups')
+    order by s.relname;
+$$;
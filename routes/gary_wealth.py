@@ -2,9 +2,15 @@
 Gary wealth data routes (first project for Data Collector API)
 """
 import logging
-from flask import Blueprint, request, jsonify
+from itertools import chain
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from datetime import datetime
+from config.settings import config
+from services.api_keys import require_api_key
 from services.database_service import db_service
+from services.request_profiler import stage
+from services.wealth_export import EXPORT_FORMATS, MAX_PAGE_SIZE, export_chunks, iter_pages, parquet_available
+from services.wealth_schema import SchemaError, get_wealth_validator
 
 logger = logging.getLogger(__name__)
 
@@ -35,8 +41,23 @@ def submit_wealth_data():
                 'error': 'Content-Type must be application/json'
             }), 400
         
-        # Get JSON data from request
-        data = request.get_json()
+        # Schema mode: decode and validate in one step, rejecting bad payloads before any I/O
+        if config.wealth_schema_validation:
+            wealth_validator = get_wealth_validator()
+            try:
+                with stage('validate'):
+                    data = wealth_validator.decode(request.get_data(cache=True))
+            except SchemaError as e:
+                logger.warning(f"Rejected wealth payload at {e.path}: {e.message}")
+                return jsonify({
+                    'error': 'Payload does not match the wealth data schema',
+                    'details': [e.to_dict()],
+                    'validator': wealth_validator.backend
+                }), 422
+        else:
+            # Get JSON data from request
+            with stage('parse'):
+                data = request.get_json()
         
         # Basic validation
         if not data:
@@ -54,7 +75,22 @@ def submit_wealth_data():
         
         # Store data using database service
         try:
-            result = db_service.insert_wealth_data(data)
+            with stage('db'):
+                result = db_service.insert_wealth_data(data)
+            
+            # Database slow or down: the record is safely on disk and will be replayed
+            if result.get('spooled'):
+                logger.info(f"Queued raw JSON data for replay (spool depth {result['spool_depth']})")
+                return jsonify({
+                    'status': 'accepted',
+                    'message': 'Raw JSON data queued and will be stored when the database is available',
+                    'queued_at': result['inserted_at'],
+                    'duplicate': result['duplicate'],
+                    'processed_at': datetime.utcnow().isoformat(),
+                    'data_summary': {
+                        'total_fields': len(data)
+                    }
+                }), 202
             
             # Prepare success response
             response = {
@@ -84,6 +120,141 @@ def submit_wealth_data():
             'message': 'Failed to process wealth data'
         }), 500
 
+@wealth_bp.route('/utgl-gary-wealth-data/totals', methods=['GET'])
+@require_api_key
+def wealth_data_totals():
+    """
+    Current cross-account balance per symbol, or one account's balances with ?account_id=
+    
+    Served from the summary tables maintained at ingest
+    (migrations/002_utgl_gary_portfolio_totals.sql), so the cost doesn't grow with history.
+    Needs an X-API-Key listed in API_KEYS.
+    """
+    if not config.portfolio_totals_enabled:
+        return jsonify({
+            'error': 'Portfolio totals are disabled',
+            'message': 'Apply migrations/002_utgl_gary_portfolio_totals.sql and set PORTFOLIO_TOTALS_ENABLED=true'
+        }), 404
+    account_id = request.args.get('account_id')
+    try:
+        if account_id:
+            balances = db_service.get_account_balances(account_id)
+            return jsonify({
+                'account_id': account_id,
+                'balances': balances,
+                'total_symbols': len(balances)
+            }), 200
+        
+        totals = db_service.get_symbol_totals()
+        return jsonify({
+            'totals': totals,
+            'total_symbols': len(totals)
+        }), 200
+    except Exception as e:
+        logger.error(f"Failed to read portfolio totals: {str(e)}")
+        return jsonify({
+            'error': 'Database operation failed',
+            'message': str(e)
+        }), 500
+
+def _int_arg(name: str, default, minimum: int = 0, maximum: int = None):
+    """Integer query parameter; raises ValueError with a client-facing message"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < minimum or (maximum is not None and number > maximum):
+        raise ValueError(f"{name} must be between {minimum} and {maximum}" if maximum is not None
+                         else f"{name} must be at least {minimum}")
+    return number
+
+def _date_arg(name: str):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or timestamp")
+    return value
+
+@wealth_bp.route('/utgl-gary-wealth-data/export', methods=['GET'])
+@require_api_key
+def export_wealth_data():
+    """
+    Stream snapshots in id order as NDJSON, CSV or Parquet; needs an X-API-Key listed in API_KEYS
+    
+    Query parameters:
+        format: ndjson (default; one {"id", "date", "data"} line per snapshot), csv (one row
+            per account with a column per balance symbol) or parquet (the CSV layout, needs pyarrow)
+        cursor: Resume after this snapshot id (the last id / snapshot_id received)
+        limit: Most snapshots to send
+        page_size: Snapshots per database page and Parquet row group (max 1000)
+        since, until: Only snapshots dated in [since, until)
+        symbols: Comma-separated balance columns for csv/parquet (default: every symbol in the
+            totals; none while PORTFOLIO_TOTALS_ENABLED is off, so all balances go to other_balances)
+    
+    Pages are fetched and sent one at a time, so memory use doesn't depend on the export size.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            'error': f"Unknown format '{export_format}'",
+            'formats': list(EXPORT_FORMATS)
+        }), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({
+            'error': 'Parquet export is not available',
+            'message': 'Install pyarrow on the server to enable it'
+        }), 501
+    
+    try:
+        cursor = _int_arg('cursor', 0)
+        limit = _int_arg('limit', None, minimum=1)
+        page_size = _int_arg('page_size', min(config.export_page_size, MAX_PAGE_SIZE), minimum=1,
+                             maximum=MAX_PAGE_SIZE)
+        since = _date_arg('since')
+        until = _date_arg('until')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def fetch_page(after_id, size):
+        return db_service.get_wealth_records_page(after_id, size, since=since, until=until)
+    
+    # Fail with a proper status while nothing has been sent yet
+    try:
+        symbols = None
+        if export_format != 'ndjson':
+            requested = request.args.get('symbols')
+            if requested:
+                symbols = list(dict.fromkeys(symbol.strip() for symbol in requested.split(',') if symbol.strip()))
+            elif config.portfolio_totals_enabled:
+                symbols = [row['symbol'] for row in db_service.get_symbol_totals()]
+            else:
+                symbols = []
+        pages = iter_pages(fetch_page, cursor, page_size, limit)
+        first_page = next(pages, [])
+    except Exception as e:
+        logger.error(f"Failed to start wealth data export: {str(e)}")
+        return jsonify({
+            'error': 'Database operation failed',
+            'message': str(e)
+        }), 500
+    
+    logger.info(f"Exporting wealth data as {export_format} after id {cursor} "
+                f"({page_size} per page{f', limit {limit}' if limit else ''})")
+    response = Response(
+        stream_with_context(export_chunks(export_format, chain([first_page], pages), symbols)),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename="utgl-gary-wealth-after-{cursor}.{export_format}"'
+    )
+    return response
+
 @wealth_bp.route('/utgl-gary-wealth-data', methods=['GET'])
 def wealth_data_info():
     """GET endpoint to provide information about the wealth data submission endpoint"""
@@ -92,7 +263,11 @@ def wealth_data_info():
         'method': 'POST',
         'description': 'Submit UTGL Gary wealth data - accepts any raw JSON',
         'content_type': 'application/json',
-        'required_fields': 'None - accepts any JSON structure',
+        'required_fields': (
+            'userId and accountId (strings) and balances (object of numbers) per account; '
+            'invalid payloads get a 422' if config.wealth_schema_validation
+            else 'None - accepts any JSON structure'
+        ),
         'example_payload': {
             'userId': '1686e05d-8170-4760-8b3e-6eafeda51a8e',
             'accountId': '002-022-0692409',
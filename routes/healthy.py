@@ -21,7 +21,8 @@ def health_check():
             'status': 'healthy' if overall_health else 'unhealthy',
             'timestamp': datetime.utcnow().isoformat(),
             'service': 'data-collector-api',
-            'database': 'connected' if overall_health else 'disconnected'
+            'database': 'connected' if overall_health else 'disconnected',
+            'spool': db_service.spool_status()
         }
         
         status_code = 200 if overall_health else 503
@@ -2,10 +2,17 @@
 """
 Script to send sample.json data to webhook URL
 """
+import argparse
+import hashlib
+import zlib
+import os
 import requests
 import json
+import threading
 import time
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Set
+from requests.adapters import HTTPAdapter
 
 # Configuration
 WEBHOOK_URL = "https://n8n.ungr.app/webhook/a22755ec-26cb-4297-8d5f-8f5490d8b42b"
@@ -15,6 +22,16 @@ HEADERS = {
     'User-Agent': 'DataCollector-Webhook-Sender/1.0'
 }
 
+# Individual item sending
+MAX_CONCURRENCY = 16        # Upper bound for requests in flight
+TARGET_LATENCY = 1.0        # Seconds; slower responses halve the concurrency like a 429 does
+MAX_ATTEMPTS = 4            # Per item, for 429, 5xx and connection errors
+CHECKPOINT_FILE = "data.json.checkpoint"
+
+# Chunked whole-file sending
+CHUNK_BYTES = 1024 * 1024   # Uncompressed JSON per request
+CHUNK_ATTEMPTS = 4          # Per chunk; chunks that succeeded are never resent
+
 def load_data() -> Any:
     """Load clean data from data.json file"""
     try:
@@ -36,17 +53,19 @@ def load_data() -> Any:
         print(f"❌ Error: Invalid JSON in {DATA_FILE}: {str(e)}")
         return None
 
-def send_to_webhook(data: Any) -> bool:
+def send_to_webhook(data: Any, url: str = WEBHOOK_URL) -> bool:
     """Send data to webhook URL"""
     try:
+        # Serialized once: the same bytes are measured and sent
+        body = json.dumps(data).encode()
         print(f"🚀 Sending data to webhook...")
-        print(f"🌐 URL: {WEBHOOK_URL}")
-        print(f"📦 Data size: {len(json.dumps(data)) if data else 0} bytes")
+        print(f"🌐 URL: {url}")
+        print(f"📦 Data size: {len(body) if data else 0} bytes")
         
         response = requests.post(
-            WEBHOOK_URL,
+            url,
             headers=HEADERS,
-            json=data,
+            data=body,
             timeout=30
         )
         
@@ -78,28 +97,309 @@ def send_to_webhook(data: Any) -> bool:
         print(f"❌ ERROR: {str(e)}")
         return False
 
-def send_individual_items(data: list) -> None:
-    """Send each item in the array individually"""
+def iter_chunks(items: List[bytes], max_bytes: int) -> Iterator[List[bytes]]:
+    """Group serialized items into chunks of at most `max_bytes` (an oversized item gets a chunk of its own)"""
+    chunk, size = [], 2
+    for item in items:
+        if chunk and size + len(item) + 1 > max_bytes:
+            yield chunk
+            chunk, size = [], 2
+        chunk.append(item)
+        size += len(item) + 1
+    if chunk:
+        yield chunk
+
+
+def chunk_stream(items: List[bytes], compress: bool, piece_bytes: int = 64 * 1024) -> Iterator[bytes]:
+    """JSON array of pre-serialized items, gzip-compressed as it is sent"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    buffer = bytearray(b'[')
+    for index, item in enumerate(items):
+        if index:
+            buffer += b','
+        buffer += item
+        if len(buffer) >= piece_bytes:
+            piece = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+            if piece:
+                yield piece
+    buffer += b']'
+    if compressor:
+        yield compressor.compress(bytes(buffer)) + compressor.flush()
+    else:
+        yield bytes(buffer)
+
+
+def send_chunk(session: requests.Session, url: str, chunk: List[bytes], index: int, count: int,
+               compress: bool) -> Optional[str]:
+    """
+    POST one chunk, retrying failures with backoff
+
+    Returns:
+        None on success, otherwise the last error
+    """
+    headers = dict(HEADERS)
+    headers.update({'X-Chunk-Index': str(index), 'X-Chunk-Count': str(count)})
+    if compress:
+        headers['Content-Encoding'] = 'gzip'
+    # Allow 10 s plus 1 s per 100 KB for the receiver to read and answer
+    read_timeout = 10 + sum(len(item) for item in chunk) / (100 * 1024)
+
+    error = None
+    for attempt in range(CHUNK_ATTEMPTS):
+        if attempt:
+            time.sleep(min(2 ** attempt, 30))
+        try:
+            # A generator body goes out with chunked transfer encoding, compressed piece by piece
+            response = session.post(url, data=chunk_stream(chunk, compress), headers=headers,
+                                    timeout=(10, read_timeout))
+            if 200 <= response.status_code < 300:
+                return None
+            error = f"HTTP {response.status_code}"
+            if response.status_code < 500 and response.status_code != 429:
+                return error  # Rejected; retrying won't help
+        except requests.exceptions.RequestException as e:
+            error = type(e).__name__
+        print(f"   ⚠️ Chunk {index + 1}/{count} attempt {attempt + 1} failed: {error}")
+    return error
+
+
+def send_chunked(data: Any, max_bytes: int = CHUNK_BYTES, compress: bool = True, url: str = WEBHOOK_URL) -> bool:
+    """
+    Send a list payload as size-bounded, gzip-compressed chunks
+
+    Every item is serialized exactly once; each chunk is a JSON array of whole
+    items tagged with X-Chunk-Index / X-Chunk-Count, and only failed chunks are
+    retried. Non-list payloads are sent as a single chunk.
+    """
+    items = [json.dumps(item).encode() for item in (data if isinstance(data, list) else [data])]
+    chunks = list(iter_chunks(items, max_bytes))
+    raw_bytes = sum(len(item) for item in items) + len(items) + 1
+    print(f"🚀 Sending {len(items)} items in {len(chunks)} chunks of up to {max_bytes} bytes"
+          f"{' (gzip)' if compress else ''}...")
+    print(f"🌐 URL: {url}")
+    print(f"📦 Data size: {raw_bytes} bytes")
+
+    failed = {}
+    started = time.monotonic()
+    with requests.Session() as session:
+        for index, chunk in enumerate(chunks):
+            error = send_chunk(session, url, chunk, index, len(chunks), compress)
+            if error:
+                failed[index] = error
+            else:
+                print(f"   ✅ Chunk {index + 1}/{len(chunks)}: {len(chunk)} items")
+    elapsed = time.monotonic() - started
+
+    print(f"\n📊 Summary: {len(chunks) - len(failed)}/{len(chunks)} chunks sent in {elapsed:.1f}s "
+          f"({raw_bytes / 1024 / elapsed if elapsed else 0:.0f} KB/s uncompressed)")
+    if failed:
+        print(f"❌ Failed chunks: {', '.join(f'{index + 1} ({error})' for index, error in failed.items())}")
+        return False
+    print("✅ SUCCESS: Data sent to webhook successfully!")
+    return True
+
+
+def item_key(item: Any) -> str:
+    """Content hash identifying an item in the checkpoint file"""
+    return hashlib.sha256(json.dumps(item, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class AimdLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease
+
+    Every fast success adds 1/limit (about +1 per round of requests); a 429 or a
+    response slower than `target_latency` halves the limit. A Retry-After header
+    pauses all new requests until it has passed.
+    """
+
+    def __init__(self, max_limit: int, target_latency: float, initial: float = 2.0):
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.limit = min(initial, max_limit)
+        self.in_flight = 0
+        self.peak = self.limit
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self.in_flight >= int(self.limit):
+                    self._cond.wait()
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self, latency: float, throttled: bool = False, retry_after: Optional[float] = None) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled or latency > self.target_latency:
+                # One decrease per latency window: the requests already in flight saw the same congestion
+                if now - self._last_decrease > max(latency, self.target_latency):
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+                self.peak = max(self.peak, self.limit)
+            self._cond.notify_all()
+
+
+class Checkpoint:
+    """Append-only file of sent item hashes, so an interrupted run resumes where it stopped"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done = {line.strip() for line in f if line.strip()}
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def mark(self, key: str) -> None:
+        with self._lock:
+            self._file.write(key + '\n')
+            self._file.flush()
+            self.done.add(key)
+
+    def close(self, remove: bool = False) -> None:
+        self._file.close()
+        if remove:
+            os.remove(self.path)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def send_item(session: requests.Session, limiter: AimdLimiter, body: bytes, stats: Dict[str, Any],
+              url: str = WEBHOOK_URL) -> bool:
+    """POST one serialized item, retrying 429, 5xx and connection errors"""
+    for attempt in range(MAX_ATTEMPTS):
+        limiter.acquire()
+        started = time.monotonic()
+        throttled, retry_after, status = False, None, None
+        try:
+            response = session.post(url, data=body, headers=HEADERS, timeout=30)
+            status = response.status_code
+            throttled = status == 429
+            retry_after = retry_after_seconds(response) if throttled else None
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+        latency = time.monotonic() - started
+        limiter.release(latency, throttled=throttled or status == 503, retry_after=retry_after)
+
+        with stats['lock']:
+            stats['latencies'].append(latency)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+        if isinstance(status, int) and 200 <= status < 300:
+            return True
+        if isinstance(status, int) and status < 500 and status != 429:
+            return False  # Rejected; retrying won't help
+        if not retry_after:
+            time.sleep(min(2 ** attempt * 0.5, 8))
+    return False
+
+
+def send_individual_items(data: list, max_concurrency: int = MAX_CONCURRENCY,
+                          checkpoint_file: str = CHECKPOINT_FILE, fresh: bool = False,
+                          url: str = WEBHOOK_URL) -> None:
+    """
+    Send each item in the array individually, concurrently
+
+    Concurrency adapts to the webhook (AIMD on latency and 429s) up to
+    `max_concurrency` over one pooled session. Sent items are recorded in
+    `checkpoint_file`; a rerun skips them unless `fresh` is set.
+    """
     if not isinstance(data, list):
         print("❌ Data is not a list, cannot send individual items")
         return
-    
-    print(f"\n🔄 Sending {len(data)} items individually...")
-    success_count = 0
-    
-    for i, item in enumerate(data):
-        print(f"\n--- Item {i+1}/{len(data)} ---")
-        if send_to_webhook(item):
-            success_count += 1
-        
-        # Small delay between requests to avoid overwhelming the webhook
-        if i < len(data) - 1:  # Don't delay after the last item
-            time.sleep(0.5)
-    
-    print(f"\n📊 Summary: {success_count}/{len(data)} items sent successfully")
+
+    if fresh and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    checkpoint = Checkpoint(checkpoint_file)
+    pending = [(item_key(item), item) for item in data]
+    pending = [(key, item) for key, item in pending if key not in checkpoint.done]
+    skipped = len(data) - len(pending)
+
+    print(f"\n🔄 Sending {len(pending)} items individually (up to {max_concurrency} concurrent)...")
+    if skipped:
+        print(f"⏭️ Skipping {skipped} items already sent (checkpoint {checkpoint_file})")
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    limiter = AimdLimiter(max_concurrency, TARGET_LATENCY)
+    stats = {'lock': threading.Lock(), 'latencies': [], 'statuses': {}, 'sent': 0, 'failed': 0}
+
+    def send(entry) -> None:
+        key, item = entry
+        ok = send_item(session, limiter, json.dumps(item).encode(), stats, url)
+        with stats['lock']:
+            stats['sent' if ok else 'failed'] += 1
+            finished = stats['sent'] + stats['failed']
+        if ok:
+            checkpoint.mark(key)
+        if finished % 50 == 0 or finished == len(pending):
+            print(f"   {finished}/{len(pending)} done, concurrency {limiter.limit:.1f}")
+
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            list(executor.map(send, pending))
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted; rerun to resume from the checkpoint")
+        raise
+    finally:
+        session.close()
+        checkpoint.close(remove=stats['failed'] == 0 and stats['sent'] == len(pending))
+    elapsed = time.monotonic() - started
+
+    latencies = stats['latencies']
+    print(f"\n📊 Summary: {stats['sent'] + skipped}/{len(data)} items sent successfully "
+          f"({stats['sent']} now, {skipped} earlier, {stats['failed']} failed)")
+    print(f"⏱️ {elapsed:.1f}s, {stats['sent'] / elapsed if elapsed else 0:.1f} items/s, "
+          f"concurrency {limiter.limit:.1f} (peak {limiter.peak:.1f})")
+    if latencies:
+        print(f"📈 Latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, p90 {percentile(latencies, 0.9) * 1000:.0f} ms, "
+              f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms "
+              f"over {len(latencies)} requests")
+    print(f"📬 Responses: {', '.join(f'{status}: {count}' for status, count in stats['statuses'].items())}")
+    if stats['failed']:
+        print(f"❌ {stats['failed']} items failed; rerun to retry them (checkpoint {checkpoint_file})")
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description=f"Send {DATA_FILE} to the webhook")
+    parser.add_argument('--individual', action='store_true', help='Send each item of a list payload as its own request')
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY,
+                        help=f'Maximum requests in flight with --individual (default: {MAX_CONCURRENCY})')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE, help=f'Checkpoint file for --individual (default: {CHECKPOINT_FILE})')
+    parser.add_argument('--url', default=WEBHOOK_URL, help='Webhook URL (default: the configured webhook)')
+    parser.add_argument('--chunk-bytes', type=int,
+                        help=f'Send the payload in gzip-compressed chunks of up to N bytes of JSON (e.g. {CHUNK_BYTES})')
+    parser.add_argument('--no-gzip', action='store_true', help='Send --chunk-bytes chunks uncompressed')
+    parser.add_argument('--fresh', action='store_true', help='Ignore the checkpoint and send every item again')
+    args = parser.parse_args()
+
     print("🎯 Webhook Data Sender")
     print("=" * 50)
     
@@ -119,9 +419,17 @@ def main():
     
     print("\n" + "=" * 50)
     
+    if args.individual:
+        send_individual_items(data, args.concurrency, args.checkpoint, args.fresh, args.url)
+        return
+    
+    if args.chunk_bytes:
+        send_chunked(data, args.chunk_bytes, not args.no_gzip, args.url)
+        return
+    
     # Send the entire data.json as one payload
     print("🚀 Sending entire data.json to webhook...")
-    send_to_webhook(data)
+    send_to_webhook(data, args.url)
 
 if __name__ == "__main__":
     main()
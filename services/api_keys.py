@@ -0,0 +1,88 @@
+"""
+API keys for the wealth data API
+Keys are listed in API_KEYS; only their SHA-256 digests are kept in memory and
+a presented key is compared against them in constant time. A key counts only
+once it has been validated here, so callers can't pick an identity (or a rate
+limit bucket) by sending an arbitrary header value.
+
+Read endpoints that expose stored data are wrapped in require_api_key; while
+API_KEYS is empty they stay closed.
+"""
+import functools
+import hashlib
+import hmac
+from typing import Any, Callable, FrozenSet, Optional
+
+from flask import jsonify, request
+
+from config.settings import config
+
+API_KEY_HEADER = 'X-API-Key'
+
+
+def key_digest(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _parse_keys(value: Any) -> FrozenSet[str]:
+    """Digests of a YAML list or a comma-separated string of keys"""
+    if not value:
+        return frozenset()
+    keys = value.split(',') if isinstance(value, str) else value
+    return frozenset(key_digest(str(key).strip()) for key in keys if str(key).strip())
+
+
+_cache = (None, frozenset())
+
+
+def configured_digests() -> FrozenSet[str]:
+    """Digests of the API_KEYS entries, recomputed only when the setting changes"""
+    global _cache
+    value = config.api_keys
+    if _cache[0] != repr(value):
+        _cache = (repr(value), _parse_keys(value))
+    return _cache[1]
+
+
+def validated_key_digest() -> Optional[str]:
+    """
+    Digest of the request's API key if it is one of API_KEYS
+
+    Returns:
+        The digest, or None when no key was sent or it isn't configured
+    """
+    key = request.headers.get(API_KEY_HEADER)
+    if not key:
+        return None
+    presented = key_digest(key)
+    # Compare against every digest so the time taken doesn't depend on which one matches
+    matched = False
+    for digest in configured_digests():
+        matched |= hmac.compare_digest(digest, presented)
+    return presented if matched else None
+
+
+def require_api_key(view: Callable) -> Callable:
+    """
+    Answer 401 unless the request carries one of API_KEYS in X-API-Key
+
+    With no API_KEYS configured the view is closed (403), never open to everyone.
+    """
+    @functools.wraps(view)
+    def guarded(*args, **kwargs):
+        if not configured_digests():
+            return jsonify({
+                'error': 'Endpoint disabled',
+                'message': 'Set API_KEYS to enable this endpoint'
+            }), 403
+        if validated_key_digest() is None:
+            response = jsonify({
+                'error': 'Unauthorized',
+                'message': f"Send a valid API key in the {API_KEY_HEADER} header"
+            })
+            response.status_code = 401
+            response.headers['WWW-Authenticate'] = API_KEY_HEADER
+            return response
+        return view(*args, **kwargs)
+
+    return guarded
@@ -0,0 +1,105 @@
+"""
+Normalized balance facts for Gary wealth snapshots
+Explodes the `balances` of every account in a utgl_gary_wealth_records payload
+into narrow (snapshot, account, symbol, balance) rows stored in
+utgl_gary_balance_facts (see migrations/001_utgl_gary_balance_facts.sql), and
+groups them per account for the incremental totals in
+migrations/002_utgl_gary_portfolio_totals.sql
+"""
+from numbers import Number
+from typing import Dict, Any, Iterator, List
+
+FACTS_TABLE = 'utgl_gary_balance_facts'
+SYMBOL_TOTALS_TABLE = 'utgl_gary_symbol_totals'
+ACCOUNT_BALANCES_TABLE = 'utgl_gary_account_balances'
+APPLY_SNAPSHOT_RPC = 'apply_balance_snapshot'
+
+# Rows per bulk insert request
+FACT_BATCH_SIZE = 1000
+
+
+def iter_accounts(data: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every account object (a dict with a `balances` dict) in a payload:
+    a single account, a list of accounts, or accounts nested under other keys
+    """
+    if isinstance(data, list):
+        for item in data:
+            yield from iter_accounts(item)
+    elif isinstance(data, dict):
+        if isinstance(data.get('balances'), dict):
+            yield data
+        else:
+            for value in data.values():
+                if isinstance(value, (list, dict)):
+                    yield from iter_accounts(value)
+
+
+def is_nonzero_balance(value: Any) -> bool:
+    return isinstance(value, Number) and not isinstance(value, bool) and value != 0
+
+
+def explode_balances(snapshot_id: Any, date: str, data: Any) -> List[Dict[str, Any]]:
+    """
+    Narrow fact rows for one snapshot, keeping only non-zero balances
+
+    Args:
+        snapshot_id: id of the utgl_gary_wealth_records row
+        date: Snapshot timestamp
+        data: The snapshot's raw JSON payload
+
+    Returns:
+        List of rows with snapshot_id, date, account_id, user_id, symbol and balance
+    """
+    rows = []
+    for account in iter_accounts(data):
+        account_id = account.get('accountId')
+        user_id = account.get('userId')
+        for symbol, balance in account['balances'].items():
+            if is_nonzero_balance(balance):
+                rows.append({
+                    'snapshot_id': snapshot_id,
+                    'date': date,
+                    'account_id': str(account_id) if account_id is not None else '',
+                    'user_id': user_id,
+                    'symbol': symbol,
+                    'balance': balance
+                })
+    return rows
+
+
+def chunked(rows: List[Dict[str, Any]], size: int = FACT_BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def group_by_account(data: Any) -> List[Dict[str, Any]]:
+    """
+    Per-account non-zero balances of one snapshot, the shape apply_balance_snapshot() takes
+
+    Every account in the payload is included, even one whose balances are all zero
+    or empty: the database then replaces that account's stored balances with nothing.
+
+    Args:
+        data: The snapshot's raw JSON payload
+
+    Returns:
+        List of {'account_id', 'user_id', 'balances': {symbol: balance}}; an account
+        listed twice in a payload has its balances summed
+    """
+    accounts: Dict[str, Dict[str, Any]] = {}
+    for source in iter_accounts(data):
+        account_id = source.get('accountId')
+        account_id = str(account_id) if account_id is not None else ''
+        account = accounts.setdefault(account_id, {
+            'account_id': account_id,
+            'user_id': source.get('userId'),
+            'balances': {}
+        })
+        balances = account['balances']
+        for symbol, balance in source['balances'].items():
+            if is_nonzero_balance(balance):
+                balances[symbol] = balances.get(symbol, 0) + balance
+    for account in accounts.values():
+        account['balances'] = {symbol: balance for symbol, balance in account['balances'].items() if balance != 0}
+    return list(accounts.values())
@@ -0,0 +1,5 @@
+"""
+Gary wealth collector
+Stages (holdings, prices, sheets, database report) live in separate modules and
+import their heavy dependencies only when they run; see cli.py for the entry points
+"""
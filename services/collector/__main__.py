@@ -0,0 +1,3 @@
+from services.collector.cli import run
+
+run()
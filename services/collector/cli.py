@@ -0,0 +1,231 @@
+"""
+Collector command line
+Each subcommand imports only the stages (and heavy libraries) it runs:
+
+    python -m services.collector run          # full pipeline once, resuming a failed run (default)
+    python -m services.collector daemon       # full pipeline on a schedule
+    python -m services.collector holdings     # fetch and print wallet holdings
+    python -m services.collector prices BTC   # race prices for symbols (default: sheet symbols)
+    python -m services.collector sheet        # fetch holdings and write them to the sheet
+    python -m services.collector db-report    # print the latest database snapshot
+    python -m services.collector compact      # roll old snapshots into daily/weekly rollups
+
+Subcommands that fetch wallets or write to the sheet take the same instance
+lock as `run`, so they never interleave with a scheduled run.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from services.collector.settings import STATE_DIR, RAW_RETENTION_DAYS, DAILY_RETENTION_DAYS, COMPACTION_BATCH_SIZE
+
+COMMANDS = ['run', 'daemon', 'holdings', 'prices', 'sheet', 'db-report', 'compact']
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--lock-file', default=os.path.join(STATE_DIR, 'gary_wealth.lock'),
+                        help='Single-instance lock file shared by one-shot and daemon runs')
+
+    parser = argparse.ArgumentParser(prog='python -m services.collector',
+                                     description="Collect Gary's wallet holdings and prices into Google Sheets")
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', parents=[common], help='Run the full pipeline once')
+    run_parser.add_argument('--force', action='store_true',
+                            help='Rewrite the sheet even when holdings are unchanged since the last run')
+    run_parser.add_argument('--fresh', action='store_true',
+                            help='Discard checkpoints of an unfinished run instead of resuming it')
+
+    daemon_parser = subparsers.add_parser('daemon', parents=[common], help='Run the full pipeline on a schedule, keeping clients warm')
+    daemon_parser.add_argument('--cron', default=os.getenv('COLLECTOR_CRON', '0 * * * *'),
+                               help="Cron expression for daemon runs (default: '0 * * * *')")
+    daemon_parser.add_argument('--interval', type=float, default=os.getenv('COLLECTOR_INTERVAL'),
+                               help='Run every N seconds instead of the cron expression')
+    daemon_parser.add_argument('--jitter', type=float, default=float(os.getenv('COLLECTOR_JITTER', 0)),
+                               help='Random extra delay in seconds added to each interval run')
+    daemon_parser.add_argument('--run-now', action='store_true', help='Start the daemon with an immediate run')
+    daemon_parser.add_argument('--force', action='store_true',
+                               help='Rewrite the sheet even when holdings are unchanged since the last run')
+
+    subparsers.add_parser('holdings', parents=[common], help='Fetch and print wallet holdings')
+
+    prices_parser = subparsers.add_parser('prices', parents=[common], help='Fetch USD prices')
+    prices_parser.add_argument('symbols', nargs='*', help='Symbols to price (default: symbols listed in the sheet)')
+    prices_parser.add_argument('--write', action='store_true', help='Write the prices to the sheet')
+
+    subparsers.add_parser('sheet', parents=[common], help='Fetch holdings and write them to the sheet (no repricing)')
+    subparsers.add_parser('db-report', parents=[common], help='Print the latest database snapshot')
+
+    compact_parser = subparsers.add_parser('compact', help='Roll old snapshots into daily and weekly rollups')
+    # Its own lock: compaction may overlap a collector run, but never another compaction
+    compact_parser.add_argument('--lock-file', default=os.path.join(STATE_DIR, 'compaction.lock'),
+                                help='Single-instance lock file for compaction runs')
+    compact_parser.add_argument('--raw-days', type=int, default=RAW_RETENTION_DAYS,
+                                help=f'Days of hourly snapshots to keep as-is (default: {RAW_RETENTION_DAYS})')
+    compact_parser.add_argument('--daily-days', type=int, default=DAILY_RETENTION_DAYS,
+                                help=f'Days of daily rollups to keep before folding into weeks (default: {DAILY_RETENTION_DAYS})')
+    compact_parser.add_argument('--batch-size', type=int, default=COMPACTION_BATCH_SIZE,
+                                help=f'Rows per read or delete request (default: {COMPACTION_BATCH_SIZE})')
+    compact_parser.add_argument('--max-buckets', type=int,
+                                help='Stop after compacting this many days and weeks (default: until caught up)')
+    compact_parser.add_argument('--dry-run', action='store_true', help='Report what would be compacted without changing anything')
+    compact_parser.add_argument('--cron', default=os.getenv('COMPACTION_CRON'),
+                                help="Keep running and compact on this cron schedule (e.g. '30 3 * * *')")
+    return parser
+
+
+def normalize_argv(argv):
+    """
+    Keep the pre-subcommand interface working: no subcommand means `run`,
+    and a bare `--daemon` flag means the `daemon` subcommand
+    """
+    argv = list(argv)
+    if any(arg in COMMANDS for arg in argv) or argv[:1] in (['-h'], ['--help']):
+        return argv
+    if '--daemon' in argv:
+        argv.remove('--daemon')
+        return ['daemon'] + argv
+    return ['run'] + argv
+
+
+def print_run_header() -> None:
+    print("\n=== LOGS ===")
+    print(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Current directory: {os.getcwd()}")
+
+
+def with_lock(lock_file, func, *args, **kwargs):
+    """Run `func` holding the single-instance lock, exiting if another run holds it"""
+    from services.scheduler import InstanceLock
+
+    lock = InstanceLock(lock_file)
+    try:
+        lock.acquire()
+    except RuntimeError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        lock.release()
+
+
+def run_daemon(args) -> None:
+    from services.collector.run import main
+    from services.scheduler import CronSchedule, IntervalSchedule, run_scheduled
+
+    if args.interval:
+        schedule = IntervalSchedule(float(args.interval), args.jitter)
+    else:
+        schedule = CronSchedule(args.cron)
+    runs_per_hour = schedule.runs_per_hour()
+
+    def job():
+        print_run_header()
+        main(runs_per_hour, force=args.force)
+
+    run_scheduled(job, schedule, run_now=args.run_now)
+
+
+def run_compact(args) -> None:
+    from services.collector.compaction import run_compaction
+
+    def job():
+        run_compaction(args.raw_days, args.daily_days, args.batch_size, args.max_buckets, args.dry_run)
+
+    if args.cron:
+        from services.scheduler import CronSchedule, run_scheduled
+
+        run_scheduled(job, CronSchedule(args.cron))
+    else:
+        job()
+
+
+def run_prices(args) -> None:
+    from services.collector.prices import get_crypto_prices
+
+    symbols = args.symbols
+    sheet = None
+    if not symbols or args.write:
+        from services.collector.sheets import setup_google_sheets, read_crypto_symbols
+
+        _, sheet = setup_google_sheets()
+        if not sheet:
+            print("\nWarning: Google Sheets setup failed. Cannot proceed without spreadsheet access.")
+            return
+        sheet_symbols, start_row = read_crypto_symbols(sheet)
+        symbols = symbols or sheet_symbols
+
+    prices = get_crypto_prices(symbols)
+    print("\nSymbol\tPrice (USD)")
+    print("-----------------")
+    for symbol, price in prices.items():
+        print(f"{symbol}\t${price}")
+
+    if args.write and prices:
+        from services.collector.run import discard_unfinished_runs
+        from services.collector.sheets import update_crypto_prices
+
+        if update_crypto_prices(sheet, prices, start_row):
+            discard_unfinished_runs()
+
+
+def run_sheet() -> None:
+    from services.collector.holdings import fetch_all_zerion_wallets
+    from services.collector.run import discard_unfinished_runs, record_sheet_write
+    from services.collector.sheets import setup_google_sheets, extract_and_write_crypto_data
+
+    _, sheet = setup_google_sheets()
+    if not sheet:
+        print("\nWarning: Google Sheets setup failed. Cannot proceed without spreadsheet access.")
+        return
+    portfolio = fetch_all_zerion_wallets()
+    _, start_row = extract_and_write_crypto_data(sheet, portfolio)
+    if start_row is not None:
+        # The next run finds these holdings already written and only refreshes prices
+        record_sheet_write(portfolio.fingerprint(), start_row)
+        discard_unfinished_runs()
+
+
+def run(argv=None) -> None:
+    """Collector entry point"""
+    args = build_parser().parse_args(normalize_argv(sys.argv[1:] if argv is None else argv))
+    print_run_header()
+
+    # `run` and `daemon` trace each pipeline run themselves; single stages get one trace per command
+    if args.command == 'run':
+        from services.collector.run import main
+
+        with_lock(args.lock_file, main, force=args.force, fresh=args.fresh)
+    elif args.command == 'daemon':
+        with_lock(args.lock_file, run_daemon, args)
+    elif args.command == 'holdings':
+        from services.collector.holdings import fetch_all_zerion_wallets
+        from services.collector.run import traced_run
+
+        # The fetch updates the wallet holdings cache and spends the shard's request budget
+        with traced_run('collector.holdings'):
+            with_lock(args.lock_file, fetch_all_zerion_wallets)
+    elif args.command == 'prices':
+        from services.collector.run import traced_run
+
+        with traced_run('collector.prices'):
+            if args.write:
+                with_lock(args.lock_file, run_prices, args)
+            else:
+                run_prices(args)
+    elif args.command == 'sheet':
+        from services.collector.run import traced_run
+
+        with traced_run('collector.sheet'):
+            with_lock(args.lock_file, run_sheet)
+    elif args.command == 'db-report':
+        from services.collector.database import fetch_latest_database_record
+        from services.collector.run import traced_run
+
+        with traced_run('collector.db_report'):
+            fetch_latest_database_record()
+    elif args.command == 'compact':
+        with_lock(args.lock_file, run_compact, args)
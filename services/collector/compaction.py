@@ -0,0 +1,345 @@
+"""
+Retention compaction stage
+Keeps hourly utgl_gary_wealth_records snapshots for RAW_RETENTION_DAYS, then
+rolls them up into one daily row per UTC day (last, min and max of every
+symbol's cross-account total) and deletes them; daily rollups older than
+DAILY_RETENTION_DAYS are folded into weekly rollups the same way. Every
+read and delete is bounded by COMPACTION_BATCH_SIZE rows.
+
+utgl_gary_balance_facts rows are not deleted with their snapshot: the foreign
+key is `on delete set null` (migrations/003), so per-account history stays.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+from services.balance_facts import explode_balances, chunked
+from services.collector.settings import RAW_RETENTION_DAYS, DAILY_RETENTION_DAYS, COMPACTION_BATCH_SIZE
+
+RECORDS_TABLE = 'utgl_gary_wealth_records'
+ROLLUPS_TABLE = 'utgl_gary_wealth_rollups'
+STORAGE_REPORT_RPC = 'wealth_storage_report'
+
+PERIOD_LENGTHS = {'day': timedelta(days=1), 'week': timedelta(days=7)}
+
+
+def parse_date(value: str) -> datetime:
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def bucket_start(moment: datetime, period: str) -> datetime:
+    """Start of the UTC day, or of the ISO week (Monday) for 'week'"""
+    start = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'week':
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def symbol_totals(data: Any) -> Dict[str, float]:
+    """Cross-account balance per symbol of one snapshot payload (zero balances left out)"""
+    totals: Dict[str, float] = {}
+    for row in explode_balances(None, None, data):
+        totals[row['symbol']] = totals.get(row['symbol'], 0) + row['balance']
+    return {symbol: total for symbol, total in totals.items() if total != 0}
+
+
+def new_rollup(period: str, start: datetime) -> Dict[str, Any]:
+    return {
+        'period': period,
+        'bucket_start': start.isoformat(),
+        'bucket_end': (start + PERIOD_LENGTHS[period]).isoformat(),
+        'first_date': None,
+        'last_date': None,
+        'samples': 0,
+        'last_snapshot_id': None,
+        'symbols': {},
+        'sources': []
+    }
+
+
+def fold_snapshot(rollup: Dict[str, Any], snapshot_id: Any, date: str, totals: Dict[str, float]) -> None:
+    """Add one raw snapshot to a rollup; snapshots must be folded oldest first"""
+    symbols = rollup['symbols']
+    had_samples = rollup['samples'] > 0
+    for symbol in set(symbols) | set(totals):
+        value = totals.get(symbol, 0)
+        stats = symbols.get(symbol)
+        if stats is None:
+            # A symbol missing from earlier samples of this bucket was zero in them
+            low, high = (min(value, 0), max(value, 0)) if had_samples else (value, value)
+            symbols[symbol] = {'last': value, 'min': low, 'max': high}
+        else:
+            stats['last'] = value
+            stats['min'] = min(stats['min'], value)
+            stats['max'] = max(stats['max'], value)
+
+    rollup['samples'] += 1
+    rollup['first_date'] = rollup['first_date'] or date
+    rollup['last_date'] = date
+    rollup['last_snapshot_id'] = snapshot_id
+    rollup['sources'].append(snapshot_id)
+
+
+def merge_rollups(first: Dict[str, Any], second: Dict[str, Any], period: str, start: datetime) -> Dict[str, Any]:
+    """
+    Combine two non-empty rollups into one for `period` starting at `start`
+
+    The rollup with the later last_date provides the `last` values; a symbol
+    missing from one side was zero throughout that side.
+    """
+    if parse_date(first['last_date']) > parse_date(second['last_date']):
+        first, second = second, first
+    zero = {'last': 0, 'min': 0, 'max': 0}
+
+    merged = new_rollup(period, start)
+    for symbol in set(first['symbols']) | set(second['symbols']):
+        earlier = first['symbols'].get(symbol, zero)
+        later = second['symbols'].get(symbol, zero)
+        stats = {
+            'last': later['last'],
+            'min': min(earlier['min'], later['min']),
+            'max': max(earlier['max'], later['max'])
+        }
+        if any(stats.values()):
+            merged['symbols'][symbol] = stats
+
+    merged['samples'] = first['samples'] + second['samples']
+    merged['first_date'] = min(first['first_date'], second['first_date'], key=parse_date)
+    merged['last_date'] = second['last_date']
+    merged['last_snapshot_id'] = second['last_snapshot_id']
+    return merged
+
+
+def rebucket(rollup: Dict[str, Any], period: str, start: datetime) -> Dict[str, Any]:
+    """Copy of a rollup's values under another period and bucket"""
+    copy = new_rollup(period, start)
+    for key in ('first_date', 'last_date', 'samples', 'last_snapshot_id', 'symbols'):
+        copy[key] = rollup[key]
+    return copy
+
+
+def fetch_storage_report(client) -> Optional[List[Dict[str, Any]]]:
+    """Table sizes from wealth_storage_report(), or None if migrations/003 hasn't been applied"""
+    try:
+        return client.rpc(STORAGE_REPORT_RPC, {}).execute().data
+    except Exception as e:
+        print(f"⚠️ Storage report unavailable: {e}")
+        return None
+
+
+def fetch_existing_rollup(client, period: str, start: datetime) -> Optional[Dict[str, Any]]:
+    result = client.table(ROLLUPS_TABLE)\
+        .select('*')\
+        .eq('period', period)\
+        .eq('bucket_start', start.isoformat())\
+        .limit(1)\
+        .execute()
+    return result.data[0] if result.data else None
+
+
+def save_rollup(client, rollup: Dict[str, Any]) -> None:
+    row = dict(rollup)
+    row['updated_at'] = datetime.now(timezone.utc).isoformat()
+    client.table(ROLLUPS_TABLE).upsert(row, on_conflict='period,bucket_start', returning='minimal').execute()
+
+
+def compact_raw_day(client, start: datetime, batch_size: int, dry_run: bool) -> Dict[str, int]:
+    """
+    Roll one UTC day of raw snapshots into its daily rollup, then delete them
+
+    Snapshots are read a page at a time so memory stays bounded by the batch size.
+    """
+    end = start + PERIOD_LENGTHS['day']
+    existing = fetch_existing_rollup(client, 'day', start)
+    already_folded = set(existing['sources']) if existing else set()
+
+    rollup = new_rollup('day', start)
+    ids, payload_bytes, offset = [], 0, 0
+    while True:
+        page = client.table(RECORDS_TABLE)\
+            .select('id,date,data')\
+            .gte('date', start.isoformat())\
+            .lt('date', end.isoformat())\
+            .order('date')\
+            .order('id')\
+            .range(offset, offset + batch_size - 1)\
+            .execute().data
+        for row in page:
+            ids.append(row['id'])
+            payload_bytes += len(json.dumps(row['data'], separators=(',', ':')))
+            # Left behind by a run that stopped between writing the rollup and deleting
+            if row['id'] not in already_folded:
+                fold_snapshot(rollup, row['id'], row['date'], symbol_totals(row['data']))
+        if len(page) < batch_size:
+            break
+        offset += batch_size
+
+    if rollup['samples']:
+        if existing:
+            rollup = merge_rollups(existing, rollup, 'day', start)
+            rollup['sources'] = sorted(already_folded | set(ids))
+        if not dry_run:
+            save_rollup(client, rollup)
+    if not dry_run:
+        for batch in chunked(ids, batch_size):
+            client.table(RECORDS_TABLE).delete(returning='minimal').in_('id', batch).execute()
+    return {'rows': len(ids), 'payload_bytes': payload_bytes, 'rollups': 1 if rollup['samples'] else 0}
+
+
+def compact_daily_week(client, start: datetime, dry_run: bool) -> Dict[str, int]:
+    """Fold the daily rollups of one ISO week into its weekly rollup, then delete them"""
+    end = start + PERIOD_LENGTHS['week']
+    days = client.table(ROLLUPS_TABLE)\
+        .select('*')\
+        .eq('period', 'day')\
+        .gte('bucket_start', start.isoformat())\
+        .lt('bucket_start', end.isoformat())\
+        .order('bucket_start')\
+        .execute().data
+
+    weekly = fetch_existing_rollup(client, 'week', start)
+    sources = set(weekly['sources']) if weekly else set()
+    for day in days:
+        day_start = parse_date(day['bucket_start']).isoformat()
+        if day_start in sources:
+            continue
+        weekly = merge_rollups(weekly, day, 'week', start) if weekly else rebucket(day, 'week', start)
+        sources.add(day_start)
+    if weekly:
+        weekly['sources'] = sorted(sources)
+
+    if not dry_run:
+        if weekly and days:
+            save_rollup(client, weekly)
+        client.table(ROLLUPS_TABLE)\
+            .delete(returning='minimal')\
+            .eq('period', 'day')\
+            .gte('bucket_start', start.isoformat())\
+            .lt('bucket_start', end.isoformat())\
+            .execute()
+    return {'rows': len(days), 'rollups': 1 if days else 0}
+
+
+def compact_wealth_records(client, raw_days: int = RAW_RETENTION_DAYS, daily_days: int = DAILY_RETENTION_DAYS,
+                           batch_size: int = COMPACTION_BATCH_SIZE, max_buckets: Optional[int] = None,
+                           dry_run: bool = False, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Apply the retention policy to utgl_gary_wealth_records, oldest buckets first
+
+    Args:
+        client: Supabase client
+        raw_days: Days of hourly snapshots kept as-is; older whole days become daily rollups
+        daily_days: Days of daily rollups kept; older whole weeks become weekly rollups
+        batch_size: Rows per read or delete request
+        max_buckets: Stop after this many days plus weeks (None: until caught up)
+        dry_run: Read and report without writing or deleting anything
+        now: Reference time (default: current UTC time)
+
+    Returns:
+        Report with rows deleted, rollups written, payload bytes removed and table sizes
+    """
+    now = now or datetime.now(timezone.utc)
+    raw_cutoff = bucket_start(now - timedelta(days=raw_days), 'day')
+    daily_cutoff = bucket_start(now - timedelta(days=daily_days), 'week')
+    report = {
+        'dry_run': dry_run,
+        'raw_cutoff': raw_cutoff.isoformat(),
+        'daily_cutoff': daily_cutoff.isoformat(),
+        'days_compacted': 0,
+        'weeks_compacted': 0,
+        'raw_rows_deleted': 0,
+        'daily_rollups_written': 0,
+        'daily_rollups_deleted': 0,
+        'weekly_rollups_written': 0,
+        'payload_bytes_removed': 0,
+        'storage_before': fetch_storage_report(client)
+    }
+
+    def budget_left() -> bool:
+        return max_buckets is None or report['days_compacted'] + report['weeks_compacted'] < max_buckets
+
+    # Hourly snapshots -> daily rollups; the lower bound moves on so dry runs terminate too
+    after = None
+    while budget_left():
+        query = client.table(RECORDS_TABLE).select('date').lt('date', raw_cutoff.isoformat())
+        if after:
+            query = query.gte('date', after.isoformat())
+        oldest = query.order('date').limit(1).execute().data
+        if not oldest:
+            break
+        start = bucket_start(parse_date(oldest[0]['date']), 'day')
+        result = compact_raw_day(client, start, batch_size, dry_run)
+        print(f"🗜️ {start.date()}: {result['rows']} snapshots -> daily rollup")
+        report['days_compacted'] += 1
+        report['raw_rows_deleted'] += result['rows']
+        report['daily_rollups_written'] += result['rollups']
+        report['payload_bytes_removed'] += result['payload_bytes']
+        after = start + PERIOD_LENGTHS['day']
+
+    # Daily rollups -> weekly rollups
+    after = None
+    while budget_left():
+        query = client.table(ROLLUPS_TABLE).select('bucket_start').eq('period', 'day')\
+            .lt('bucket_start', daily_cutoff.isoformat())
+        if after:
+            query = query.gte('bucket_start', after.isoformat())
+        oldest = query.order('bucket_start').limit(1).execute().data
+        if not oldest:
+            break
+        start = bucket_start(parse_date(oldest[0]['bucket_start']), 'week')
+        result = compact_daily_week(client, start, dry_run)
+        print(f"🗜️ Week of {start.date()}: {result['rows']} daily rollups -> weekly rollup")
+        report['weeks_compacted'] += 1
+        report['daily_rollups_deleted'] += result['rows']
+        report['weekly_rollups_written'] += result['rollups']
+        after = start + PERIOD_LENGTHS['week']
+
+    if not dry_run and (report['raw_rows_deleted'] or report['daily_rollups_deleted']):
+        report['storage_after'] = fetch_storage_report(client)
+    else:
+        report['storage_after'] = report['storage_before']
+    return report
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024 or unit == 'GB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+        size /= 1024
+
+
+def print_compaction_report(report: Dict[str, Any]) -> None:
+    title = "Compaction dry run (nothing written)" if report['dry_run'] else "Compaction report"
+    print(f"\n📦 {title}")
+    print("-" * 70)
+    print(f"Raw snapshots before {report['raw_cutoff']}: {report['days_compacted']} days, "
+          f"{report['raw_rows_deleted']} rows -> {report['daily_rollups_written']} daily rollups")
+    print(f"Daily rollups before {report['daily_cutoff']}: {report['weeks_compacted']} weeks, "
+          f"{report['daily_rollups_deleted']} rows -> {report['weekly_rollups_written']} weekly rollups")
+    print(f"Snapshot payload removed: {format_bytes(report['payload_bytes_removed'])}")
+
+    before = {row['relation']: row for row in report['storage_before'] or []}
+    after = {row['relation']: row for row in report['storage_after'] or []}
+    if before:
+        print(f"\n{'Table':<28}{'Size before':>14}{'Size after':>14}{'Dead rows':>12}")
+        for relation, row in before.items():
+            current = after.get(relation, row)
+            print(f"{relation:<28}{format_bytes(row['total_bytes']):>14}"
+                  f"{format_bytes(current['total_bytes']):>14}{current['dead_rows']:>12}")
+        print("Deleted rows are reclaimed for reuse by autovacuum; run VACUUM FULL to shrink the files.")
+    print("-" * 70)
+
+
+def run_compaction(raw_days: int = RAW_RETENTION_DAYS, daily_days: int = DAILY_RETENTION_DAYS,
+                   batch_size: int = COMPACTION_BATCH_SIZE, max_buckets: Optional[int] = None,
+                   dry_run: bool = False) -> Optional[Dict[str, Any]]:
+    """Compact utgl_gary_wealth_records and print the report"""
+    from services.collector.database import get_supabase_client
+
+    client = get_supabase_client()
+    if client is None:
+        return None
+    report = compact_wealth_records(client, raw_days, daily_days, batch_size, max_buckets, dry_run)
+    print_compaction_report(report)
+    return report
@@ -0,0 +1,42 @@
+"""
+Docker helpers for browser-based collectors (selenium container on port 4444)
+"""
+import os
+import platform
+
+def get_docker_client():
+    import docker
+
+    system = platform.system()
+    if system == "Windows":
+        os.environ["DOCKER_HOST"] = "npipe:////./pipe/docker_engine"
+    elif system == "Linux":
+        os.environ["DOCKER_HOST"] = "unix:///var/run/docker.sock"
+    return docker.from_env()
+
+def start_docker_container(container_name, image_name):
+    try:
+        stop_docker_container(container_name)
+    except Exception as e:
+        print(f"Error stopping existing container: {e}")
+    import docker
+
+    client = docker.from_env()
+    client.containers.run(
+        image_name,
+        name=container_name,
+        ports={"4444/tcp": 4444},
+        detach=True,
+    )
+
+def stop_docker_container(container_name):
+    import docker
+
+    client = docker.from_env()
+    try:
+        container = client.containers.get(container_name)
+        print(f"Stopping container: {container_name}")
+        container.stop()
+        container.remove()
+    except docker.errors.NotFound:
+        print(f"Container {container_name} not found. Skipping stop.")
@@ -0,0 +1,530 @@
+"""
+Holdings stage
+Fetches wallet holdings from Zerion, Solana RPC and Blockstream through the
+rate-limited wallet pool; providers with probe_calls set are probed first so
+unchanged wallets skip their fetch
+"""
+import json
+import os
+import time
+
+import requests
+
+from services.collector.portfolio import Holding, Portfolio
+from services.collector.settings import ZERION_API_KEY, STATE_DIR, WALLET_REGISTRY_FILE
+from services.tracing import span, traced, tracer
+from services.wallet_pool import WalletFetchPool
+from services.wallet_registry import load_wallet_registry, select_wallet_shard, HoldingsCache
+
+# Shared HTTP session, kept warm between runs when running as a daemon
+http_session = None
+
+def get_http_session():
+    """Shared HTTP session so wallet fetches reuse pooled connections across requests and runs"""
+    global http_session
+    if http_session is None:
+        http_session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=32)
+        http_session.mount('https://', adapter)
+        http_session.mount('http://', adapter)
+        http_session.hooks['response'].append(record_response_size)
+    return http_session
+
+def record_response_size(response, *args, **kwargs):
+    """Response hook adding each response's size and status to the span that made the request"""
+    current = tracer.current()
+    current.add('response.bytes', len(response.content))
+    current.add('http.requests', 1)
+    current.set('http.status_code', response.status_code)
+
+def fetch_zerion_value(address, api_key=None, throttle=None):
+    """
+    Fetch wallet portfolio value from Zerion API using Basic Auth and no_filter for positions.
+
+    `throttle` is called before each retry after a 429 (e.g. to take a token from the
+    provider's bucket), so retries count against the rate limit like first attempts.
+    """
+    import base64
+    
+    # API configuration
+    api_key = api_key or ZERION_API_KEY
+    url = f"https://api.zerion.io/v1/wallets/{address}/portfolio?currency=usd&filter[positions]=no_filter"
+    
+    try:
+        # Create Basic Auth header
+        auth_string = f"{api_key}:"
+        encoded_auth = base64.b64encode(auth_string.encode()).decode()
+        
+        # Set headers with Basic Auth
+        headers = {
+            'Authorization': f'Basic {encoded_auth}',
+            'Accept': 'application/json',
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        
+        # Make the API request with timeout and retries
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = get_http_session().get(url, headers=headers, timeout=30)
+                
+                if response.status_code == 200:
+                    data = response.json()
+                    
+                    # Extract the total portfolio value from the correct path
+                    if (
+                        'data' in data and
+                        'attributes' in data['data'] and
+                        'total' in data['data']['attributes'] and
+                        'positions' in data['data']['attributes']['total']
+                    ):
+                        total_value = data['data']['attributes']['total']['positions']
+                        return str(int(float(total_value)))
+                    else:
+                        return None
+                elif response.status_code == 401:
+                    print("Authentication failed - check API key")
+                    print(f"Response: {response.text}")
+                    return None
+                elif response.status_code == 429:
+                    print(f"Rate limited (429). Waiting before retry {attempt + 1}/{max_retries}")
+                    time.sleep(5)
+                    if throttle:
+                        throttle()
+                    continue
+                else:
+                    print(f"API request failed with status {response.status_code}")
+                    print(f"Response: {response.text[:500]}")
+                    
+            except requests.exceptions.RequestException as e:
+                print(f"Request error on attempt {attempt + 1}: {e}")
+                if attempt < max_retries - 1:
+                    time.sleep(2)
+                    continue
+                else:
+                    break
+        
+        return None
+        
+    except Exception as e:
+        print(f"Error fetching Zerion value via API: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def fetch_wallet_holdings(wallet, throttle=None):
+    """
+    Fetch holdings for one registry wallet, routed to the API for its blockchain type
+
+    `throttle` is passed to fetchers that retry rate-limited requests and is called
+    before each retry.
+    """
+    with span('wallet.fetch', 'client', wallet=wallet['name'], api=wallet['api']) as fetch_span:
+        if wallet['api'] == 'zerion':
+            holdings = fetch_wallet_holdings_zerion(ZERION_API_KEY, wallet['address'], wallet['name'], throttle=throttle)
+        elif wallet['api'] == 'solana_rpc':
+            holdings = fetch_wallet_holdings_solana(wallet['address'], wallet['name'])
+        elif wallet['api'] == 'blockstream':
+            holdings = fetch_wallet_holdings_bitcoin(wallet['address'], wallet['name'])
+        else:
+            print(f"  ❌ Unknown API '{wallet['api']}' for {wallet['name']}")
+            holdings = None
+
+        if holdings is None:
+            fetch_span.fail('no holdings returned')
+        else:
+            fetch_span.set('holdings', len(holdings))
+        return holdings
+
+def probe_wallet_bitcoin(address):
+    """Cheap change probe for a Bitcoin address: confirmed and mempool transaction counts"""
+    url = f"https://blockstream.info/api/address/{address}"
+    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+    response = get_http_session().get(url, headers=headers, timeout=10)
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    return f"{data.get('chain_stats', {}).get('tx_count')}:{data.get('mempool_stats', {}).get('tx_count')}"
+
+def probe_wallet_solana(address):
+    """Cheap change probe for a Solana address: signature of its most recent transaction"""
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getSignaturesForAddress",
+        "params": [address, {"limit": 1}]
+    }
+    response = get_http_session().post("https://api.mainnet-beta.solana.com", json=payload,
+                                       headers={'Content-Type': 'application/json'}, timeout=10)
+    if response.status_code != 200:
+        return None
+    result = response.json().get('result')
+    if result is None:
+        return None
+    return result[0]['signature'] if result else 'no-transactions'
+
+# Providers that can be probed; Zerion has no probe cheaper than the positions fetch itself
+# (its portfolio total is a full call and moves with market prices)
+PROBES = {
+    'solana_rpc': probe_wallet_solana,
+    'blockstream': probe_wallet_bitcoin
+}
+
+def probe_wallet(wallet):
+    """
+    Return a value that changes whenever the wallet's holdings may have changed,
+    or None when the provider can't be probed (the wallet is then fetched in full)
+    """
+    probe = PROBES.get(wallet['api'])
+    if probe is None:
+        return None
+    with span('wallet.probe', 'client', wallet=wallet['name'], api=wallet['api']) as probe_span:
+        try:
+            return probe(wallet['address'])
+        except Exception as e:
+            probe_span.fail(f"{type(e).__name__}: {e}")
+            print(f"  ⚠️ Change probe failed for {wallet['name']}: {e}")
+        return None
+
+@traced('holdings')
+def fetch_all_zerion_wallets(runs_per_hour=1):
+    """Fetch holdings from all registry wallets and show total holdings. Returns the aggregated Portfolio for further processing."""
+    registry = load_wallet_registry(WALLET_REGISTRY_FILE)
+    if not ZERION_API_KEY and any(wallet['api'] == 'zerion' for wallet in registry['wallets']):
+        print("⚠️ ZERION_API_KEY not set - Zerion wallets will fail to authenticate")
+
+    # Fetch the wallets that fit this run's share of the hourly request budget; the rest reuse their last holdings
+    selected, deferred = select_wallet_shard(
+        registry['wallets'], registry['providers'],
+        run_slot=int(time.time() * runs_per_hour // 3600), runs_per_hour=runs_per_hour
+    )
+    cache = HoldingsCache(os.path.join(STATE_DIR, 'wallet_holdings.json'))
+    pool = WalletFetchPool(registry['providers'], max_workers=registry['workers'])
+
+    started = time.monotonic()
+
+    # Probe first where the provider has a cheap probe (probe_calls); wallets whose probe matches
+    # the cached one keep their previous holdings, the others are fetched in full
+    probed = [wallet for wallet in selected
+              if wallet['api'] in PROBES and registry['providers'][wallet['api']].get('probe_calls')]
+    probes = dict(zip((wallet['address'] for wallet in probed), pool.run(probed, probe_wallet, calls_key='probe_calls')))
+    changed = [
+        wallet for wallet in selected
+        if probes.get(wallet['address']) is None
+        or probes[wallet['address']] != cache.get_probe(wallet['address'])
+        or cache.get(wallet['address']) is None
+    ]
+
+    # Retries after a 429 take a token from the provider's bucket like the first attempt did
+    def fetch(wallet):
+        return fetch_wallet_holdings(wallet, throttle=lambda: pool.acquire(wallet['api']))
+
+    fetched = dict(zip((wallet['address'] for wallet in changed), pool.run(changed, fetch)))
+    print(f"Fetched {len(changed)} of {len(selected)} wallets in {time.monotonic() - started:.1f}s "
+          f"({len(selected) - len(changed)} unchanged, {len(deferred)} deferred to later runs)")
+    for api, waited in pool.throttled.items():
+        if waited:
+            print(f"  {api}: throttled for {waited:.1f}s")
+
+    all_holdings = []
+
+    for wallet in registry['wallets']:
+        if wallet['address'] in fetched:
+            holdings = fetched[wallet['address']]
+            if holdings is not None:
+                cache.put(wallet['address'], [holding.to_dict() for holding in holdings], probes.get(wallet['address']))
+        else:
+            cached = cache.get(wallet['address'])
+            holdings = [Holding.from_dict(holding) for holding in cached] if cached else None
+
+        if holdings:
+            all_holdings.extend(holdings)
+
+    cache.save()
+
+    # Aggregated once; the summary below, the sheet write and the price stage all read these totals
+    portfolio = Portfolio(all_holdings, wallet_names=[wallet['name'] for wallet in registry['wallets']])
+    print_portfolio(portfolio)
+    return portfolio
+
+def print_portfolio(portfolio):
+    """Print the categorized portfolio summary"""
+    print(f"\n🏆 GARY'S PORTFOLIO")
+    print("=" * 80)
+
+    if not portfolio:
+        print("❌ No holdings found across all wallets")
+        return
+
+    print(f"💰 Total Portfolio Value: ${portfolio.total_usd:,.2f}")
+    print("=" * 80)
+
+    # Show holdings by wallet category, largest positions (or debts) first
+    for wallet_name, wallet_symbols in portfolio.by_wallet.items():
+        if not wallet_symbols:
+            continue
+        print(f"\n📂 {wallet_name.upper()}")
+        print(f"💵 Wallet Value: ${portfolio.wallet_usd(wallet_name):,.2f}")
+        print("-" * 50)
+
+        for i, totals in enumerate(wallet_symbols):
+            debt_indicator = " 🔴DEBT" if totals.quantity < 0 or totals.usd_value < 0 else ""
+            quantity_str = f"{totals.quantity:,.6f}".rstrip('0').rstrip('.')
+            print(f"{i+1:2d}. {totals.symbol}: {quantity_str} (${totals.usd_value:,.2f}){debt_indicator}")
+
+    print("\n" + "=" * 80)
+    print(f"📈 Total unique assets: {len(portfolio.symbols)}")
+    print(f"🏦 Wallets tracked: {sum(1 for wallet_symbols in portfolio.by_wallet.values() if wallet_symbols)}")
+
+def fetch_wallet_holdings_zerion(api_key, address, wallet_name, throttle=None, max_retries=3):
+    """
+    Fetch holdings for a single wallet from Zerion API using the same method as the working portfolio endpoint
+
+    A 429 is retried up to `max_retries` times; `throttle` is called before each retry
+    (e.g. to take a token from the provider's bucket).
+    """
+    import base64
+    
+    # Use the fungible positions endpoint to get individual token holdings
+    url = f"https://api.zerion.io/v1/wallets/{address}/positions?filter[positions]=no_filter"
+    
+    try:
+        # Create Basic Auth header (same as working function)
+        auth_string = f"{api_key}:"
+        encoded_auth = base64.b64encode(auth_string.encode()).decode()
+        
+        headers = {
+            'Authorization': f'Basic {encoded_auth}',
+            'Accept': 'application/json',
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+        }
+        
+        for attempt in range(max_retries):
+            response = get_http_session().get(url, headers=headers, timeout=30)
+            if response.status_code != 429 or attempt == max_retries - 1:
+                break
+            print(f"  ⏳ Rate limited (429) for {wallet_name}. Waiting before retry {attempt + 1}/{max_retries}")
+            time.sleep(5)
+            if throttle:
+                throttle()
+        
+        if response.status_code == 200:
+            data = response.json()
+            holdings = []
+            
+            # Save the full raw response to file for debugging (silently)
+            try:
+                with open('raw.json', 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+            except Exception as e:
+                pass  # Silent failure
+            
+            # Parse positions endpoint response - positions should be in data array
+            if 'data' in data and isinstance(data['data'], list):
+                
+                for position in data['data']:
+                    if isinstance(position, dict) and 'type' in position and position['type'] == 'positions':
+                        if 'attributes' in position:
+                            attrs = position['attributes']
+                            
+                            # Get token info, quantity, and USD value
+                            if 'fungible_info' in attrs and 'quantity' in attrs:
+                                token = attrs['fungible_info']
+                                
+                                # Handle quantity object format from positions endpoint
+                                quantity_data = attrs['quantity']
+                                if isinstance(quantity_data, dict):
+                                    # Use the float value from the quantity object
+                                    quantity = float(quantity_data.get('float', 0))
+                                else:
+                                    # Fallback for simple number format
+                                    quantity = float(quantity_data)
+                                
+                                # Get USD value of this position (handle None/null values)
+                                value_raw = attrs.get('value', 0)
+                                usd_value = float(value_raw) if value_raw is not None else 0.0
+                                
+                                # Check if this is a debt position (loan = borrowed money)
+                                position_type = attrs.get('position_type', '')
+                                is_debt = position_type == 'loan'
+                                
+                                # For debt positions, make quantity and USD value negative
+                                if is_debt:
+                                    quantity = -abs(quantity)  # Ensure negative
+                                    usd_value = -abs(usd_value)  # Ensure negative USD value
+                                
+                                # Include positions with non-zero quantities OR non-zero USD values (including negative debt)
+                                if quantity != 0 or usd_value != 0:
+                                    symbol = token.get('symbol', 'UNKNOWN')
+                                    name = token.get('name', symbol)
+                                    position_name = attrs.get('name', f"{symbol} Position")
+                                    debt_indicator = " 🔴DEBT" if is_debt else ""
+                                    
+                                    # Skip Aave aTokens to avoid double counting with underlying assets
+                                    # aTokens represent deposited funds in Aave and would duplicate the underlying token values
+                                    if symbol.startswith('aEth') or symbol.startswith('aglaMerkl'):
+                                        continue
+                                    
+                                    # Skip tokens that Zerion hides: not displayable or unpriced (null value/price=0)
+                                    # This matches Zerion's UI behavior of hiding dust/spam tokens
+                                    position_flags = attrs.get('flags', {})
+                                    is_displayable = position_flags.get('displayable', True)
+                                    raw_value = attrs.get('value')
+                                    price = attrs.get('price', 0)
+                                    
+                                    # Skip if not displayable OR if unpriced (unless it's a debt position)
+                                    if not is_displayable or (raw_value is None and price == 0 and not is_debt):
+                                        continue
+                                    
+                                    holdings.append(Holding(
+                                        wallet=wallet_name,
+                                        symbol=symbol,
+                                        name=name,
+                                        position_name=position_name + debt_indicator,
+                                        quantity=quantity,
+                                        usd_value=usd_value,
+                                        is_debt=is_debt,
+                                        address=address[:10] + "..."
+                                    ))
+            
+            # Holdings processed - details will be shown in final summary
+            else:
+                print(f"  ⚠️ Could not find positions data for {wallet_name}")
+                print(f"  📄 Available keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
+                if 'data' in data:
+                    print(f"  📄 data type: {type(data['data'])}")
+                    if isinstance(data['data'], list) and len(data['data']) > 0:
+                        print(f"  📄 first data item: {data['data'][0].keys() if isinstance(data['data'][0], dict) else 'Not a dict'}")
+                    elif isinstance(data['data'], dict):
+                        print(f"  📄 data keys: {list(data['data'].keys())}")
+            
+            return holdings
+            
+        elif response.status_code == 401:
+            print(f"  ❌ Authentication failed for {wallet_name}")
+            return None
+        elif response.status_code == 404:
+            print(f"  ❌ Wallet not found: {wallet_name}")
+            return None
+        else:
+            print(f"  ❌ API error {response.status_code} for {wallet_name}: {response.text[:200]}")
+            return None
+            
+    except Exception as e:
+        print(f"  ❌ Error fetching {wallet_name}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def fetch_wallet_holdings_solana(address, wallet_name):
+    """Fetch holdings for a Solana wallet using Solana RPC API"""
+    try:
+        # Solana RPC endpoint (you can use a free public RPC or get an API key from services like Alchemy, QuickNode)
+        url = "https://api.mainnet-beta.solana.com"
+        
+        # Get account info for the wallet
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "getAccountInfo",
+            "params": [
+                address,
+                {"encoding": "base64"}
+            ]
+        }
+        
+        headers = {'Content-Type': 'application/json'}
+        response = get_http_session().post(url, json=payload, headers=headers, timeout=30)
+        
+        if response.status_code == 200:
+            data = response.json()
+            
+            # Get token accounts for this wallet
+            token_payload = {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "getTokenAccountsByOwner",
+                "params": [
+                    address,
+                    {"programId": "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"},  # SPL Token program
+                    {"encoding": "jsonParsed"}
+                ]
+            }
+            
+            token_response = get_http_session().post(url, json=token_payload, headers=headers, timeout=30)
+            
+            if token_response.status_code == 200:
+                token_data = token_response.json()
+                holdings = []
+                
+                # Check SOL balance first
+                if 'result' in data and data['result'] and 'value' in data['result']:
+                    sol_lamports = data['result']['value']['lamports'] if data['result']['value'] else 0
+                    sol_balance = sol_lamports / 1_000_000_000  # Convert lamports to SOL
+                    
+                    if sol_balance > 0:
+                        # Calculate USD value (approximate using $175 per SOL)
+                        sol_usd_value = sol_balance * 175  # You could fetch real price from API
+                        
+                        holdings.append(Holding(
+                            wallet=wallet_name,
+                            symbol='SOL',
+                            name='Solana',
+                            quantity=sol_balance,
+                            usd_value=sol_usd_value,
+                            address=address[:10] + "..."
+                        ))
+                        pass  # SOL added to holdings silently
+                
+                return holdings
+            else:
+                print(f"  ❌ Solana token API error: {token_response.status_code}")
+                return None
+        else:
+            print(f"  ❌ Solana RPC error: {response.status_code}")
+            return None
+            
+    except Exception as e:
+        print(f"  ❌ Error fetching Solana wallet: {e}")
+        return None
+
+def fetch_wallet_holdings_bitcoin(address, wallet_name):
+    """Fetch holdings for a Bitcoin wallet using Blockstream API"""
+    try:
+        # Blockstream API endpoint
+        url = f"https://blockstream.info/api/address/{address}"
+        
+        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+        response = get_http_session().get(url, headers=headers, timeout=30)
+        
+        if response.status_code == 200:
+            data = response.json()
+            
+            # Get BTC balance
+            balance_satoshis = data.get('chain_stats', {}).get('funded_txo_sum', 0) - data.get('chain_stats', {}).get('spent_txo_sum', 0)
+            btc_balance = balance_satoshis / 100_000_000  # Convert satoshis to BTC
+            
+            holdings = []
+            if btc_balance > 0:
+                # Calculate USD value (approximate using $117K per BTC)
+                btc_usd_value = btc_balance * 117000  # You could fetch real price from API
+                
+                holdings.append(Holding(
+                    wallet=wallet_name,
+                    symbol='BTC',
+                    name='Bitcoin',
+                    quantity=btc_balance,
+                    usd_value=btc_usd_value,
+                    address=address[:10] + "..."
+                ))
+                pass  # BTC added to holdings silently
+            
+            return holdings
+        else:
+            print(f"  ❌ Blockstream API error: {response.status_code}")
+            print(f"  Response: {response.text[:200]}")
+            return None
+            
+    except Exception as e:
+        print(f"  ❌ Error fetching Bitcoin wallet: {e}")
+        return None
@@ -0,0 +1,150 @@
+"""
+Holdings model
+Holding is a slotted dataclass (about a third of the memory of the dict it
+replaces), and Portfolio aggregates a run's holdings once: per-wallet and
+per-symbol totals are built in a single pass and sorted once each, and the
+holdings summary, the sheet write and the price stage all read from them.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+# Currencies left out of the sheet and of price lookups
+FIAT_SYMBOLS = frozenset(['USD', 'HKD', 'JPY'])
+
+
+@dataclass(slots=True)
+class Holding:
+    """One position of one wallet"""
+    wallet: str
+    symbol: str
+    name: str
+    quantity: float
+    usd_value: float
+    address: str = ''
+    position_name: Optional[str] = None
+    is_debt: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for the JSON holdings cache and run checkpoints"""
+        return {
+            'wallet': self.wallet,
+            'symbol': self.symbol,
+            'name': self.name,
+            'quantity': self.quantity,
+            'usd_value': self.usd_value,
+            'address': self.address,
+            'position_name': self.position_name,
+            'is_debt': self.is_debt
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Holding':
+        return cls(
+            wallet=data.get('wallet', ''),
+            symbol=data['symbol'],
+            name=data.get('name', data['symbol']),
+            quantity=data.get('quantity', 0),
+            usd_value=data.get('usd_value', 0),
+            address=data.get('address', ''),
+            position_name=data.get('position_name'),
+            is_debt=data.get('is_debt', False)
+        )
+
+
+@dataclass(slots=True)
+class SymbolTotal:
+    """Summed quantity and USD value of one symbol"""
+    symbol: str
+    quantity: float = 0.0
+    usd_value: float = 0.0
+
+
+def _by_abs_value(item) -> float:
+    return abs(item[1][1])
+
+
+class Portfolio:
+    """
+    A run's holdings with their totals, aggregated once
+
+    Args:
+        holdings: Holding objects, or dicts in the cache format
+        wallet_names: Wallets to list in by_wallet even when they hold nothing (registry order)
+
+    Attributes:
+        total_usd: Value of every holding
+        symbols: Totals per symbol across wallets, largest absolute value first
+        by_wallet: Wallet name -> totals per symbol in that wallet, largest absolute value first
+    """
+
+    __slots__ = ('holdings', 'total_usd', 'symbols', 'by_wallet')
+
+    def __init__(self, holdings: Iterable[Union[Holding, Dict[str, Any]]], wallet_names: Iterable[str] = ()):
+        self.holdings: List[Holding] = [
+            holding if isinstance(holding, Holding) else Holding.from_dict(holding) for holding in holdings
+        ]
+
+        # One pass builds both groupings; running sums are [quantity, usd_value] lists until the end
+        symbols: Dict[str, list] = {}
+        wallets: Dict[str, Dict[str, list]] = {name: {} for name in wallet_names}
+        for holding in self.holdings:
+            symbol, quantity, usd_value = holding.symbol, holding.quantity, holding.usd_value
+            sums = symbols.get(symbol)
+            if sums is None:
+                symbols[symbol] = [quantity, usd_value]
+            else:
+                sums[0] += quantity
+                sums[1] += usd_value
+
+            wallet = wallets.get(holding.wallet)
+            if wallet is None:
+                wallet = wallets[holding.wallet] = {}
+            sums = wallet.get(symbol)
+            if sums is None:
+                wallet[symbol] = [quantity, usd_value]
+            else:
+                sums[0] += quantity
+                sums[1] += usd_value
+
+        self.total_usd = sum(holding.usd_value for holding in self.holdings)
+        self.symbols: List[SymbolTotal] = [
+            SymbolTotal(symbol, quantity, usd_value)
+            for symbol, (quantity, usd_value) in sorted(symbols.items(), key=_by_abs_value, reverse=True)
+        ]
+
+        # Every wallet's symbols are sorted once, here; consumers only iterate
+        self.by_wallet: Dict[str, List[SymbolTotal]] = {
+            name: [
+                SymbolTotal(symbol, quantity, usd_value)
+                for symbol, (quantity, usd_value) in sorted(wallet.items(), key=_by_abs_value, reverse=True)
+            ]
+            for name, wallet in wallets.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.holdings)
+
+    def __iter__(self) -> Iterator[Holding]:
+        return iter(self.holdings)
+
+    @property
+    def crypto(self) -> List[SymbolTotal]:
+        """Symbol totals without fiat, in the same order as `symbols`"""
+        return [totals for totals in self.symbols if totals.symbol not in FIAT_SYMBOLS]
+
+    def wallet_usd(self, wallet: str) -> float:
+        return sum(cell.usd_value for cell in self.by_wallet.get(wallet, ()))
+
+    def fingerprint(self) -> str:
+        """
+        Stable hash of the token quantities, used to detect runs where no holding changed
+
+        USD values are left out: they move with market prices on every run.
+        """
+        rows = sorted((str(h.wallet), str(h.symbol), repr(h.quantity)) for h in self.holdings)
+        return hashlib.sha256(json.dumps(rows).encode()).hexdigest()
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [holding.to_dict() for holding in self.holdings]
@@ -0,0 +1,82 @@
+"""
+Prices stage
+Prices holdings in USD by racing the configured ccxt exchanges
+"""
+import os
+
+from services.collector.settings import (
+    PRICE_EXCHANGES, PRICE_MODE, PRICE_LATENCY_BUDGET, PRICE_DEADLINE, PRICE_MAX_FANOUT, STATE_DIR
+)
+from services.tracing import traced, tracer
+
+# Hedged price engine, created on first use (imports ccxt)
+price_engine = None
+
+def get_price_engine():
+    """Create the hedged price engine once per process"""
+    global price_engine
+    if price_engine is None:
+        from services.price_engine import PriceEngine
+
+        price_engine = PriceEngine(
+            exchange_ids=PRICE_EXCHANGES,
+            mode=PRICE_MODE,
+            latency_budget=PRICE_LATENCY_BUDGET,
+            deadline=PRICE_DEADLINE,
+            max_fanout=PRICE_MAX_FANOUT,
+            stats_file=os.path.join(STATE_DIR, 'price_engine_stats.json')
+        )
+        print(f"Initialized price engine: {', '.join(PRICE_EXCHANGES)} ({PRICE_MODE}, "
+              f"{PRICE_MAX_FANOUT or len(PRICE_EXCHANGES)} per market)")
+    return price_engine
+
+@traced('prices')
+def get_crypto_prices(symbols):
+    """Get cryptocurrency prices for the given symbols by racing all configured CCXT exchanges"""
+    try:
+        engine = get_price_engine()
+
+        # First, get the USDT/USD rate (only USD venues such as Kraken list it)
+        usdt_usd_rate = 1.0  # Default fallback
+        quote = engine.fetch_quote('USDT/USD')
+        if quote:
+            usdt_usd_rate = quote['price']
+            print(f"Got USDT/USD price: {usdt_usd_rate} ({quote['method']})")
+        else:
+            print("No valid USDT/USD price found, using 1.0")
+
+        prices = {}
+        # Add USDT price to results if it's in our symbols list
+        if 'USDT' in symbols:
+            prices['USDT'] = usdt_usd_rate
+
+        # Race every remaining symbol concurrently and convert to USD
+        trading_symbols = {
+            symbol: f"{symbol}/USDT" if '/' not in symbol else symbol
+            for symbol in symbols
+            if symbol and symbol != 'USDT'  # Skip empty symbols and USDT (already handled)
+        }
+        quotes = engine.fetch_quotes(list(trading_symbols.values()))
+
+        for symbol, trading_symbol in trading_symbols.items():
+            quote = quotes.get(trading_symbol)
+            if quote:
+                # Convert from USDT to USD using the USDT/USD rate
+                price_in_usdt = quote['price']
+                price_in_usd = price_in_usdt * usdt_usd_rate
+                prices[symbol] = price_in_usd
+                print(f"Converted {symbol} price: {price_in_usdt} USDT = {price_in_usd} USD ({quote['method']}, rate: {usdt_usd_rate})")
+            else:
+                print(f"No valid price found for {trading_symbol}")
+
+        engine.print_stats()
+        engine.save_stats()
+        return prices
+
+    except Exception as e:
+        tracer.current().fail(f"{type(e).__name__}: {e}")
+        print(f"\nError getting crypto prices: {e}")
+        print(f"Error details: {type(e)}")
+        import traceback
+        traceback.print_exc()
+        return {}
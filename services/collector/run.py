@@ -0,0 +1,188 @@
+"""
+Full collector run
+The stages form a dependency graph run by services.pipeline: holdings and the
+Sheets setup start together with the database report, then the sheet write and
+the price fetch run side by side, and the price write waits for both. Each
+stage's output is checkpointed (run_state.py), so a run that fails part way
+is resumed by the next one from the stages that didn't finish.
+"""
+import json
+import os
+from contextlib import nullcontext
+
+from services.collector.database import fetch_latest_database_record
+from services.collector.holdings import fetch_all_zerion_wallets
+from services.collector.prices import get_crypto_prices
+from services.collector.run_state import RunStateStore
+from services.collector.settings import (STATE_DIR, TRACE_ENABLED, TRACE_DIR, TRACE_MAX_FILES, TRACE_TOP,
+                                         RUN_STATE_DIR, RUN_STATE_TTL, PIPELINE_WORKERS, STAGE_TIMEOUTS)
+from services.collector.portfolio import Portfolio
+from services.collector.sheets import setup_google_sheets, extract_and_write_crypto_data, update_crypto_prices
+from services.pipeline import Pipeline, Stage, StageError
+from services.tracing import NOOP_SPAN, tracer
+
+# Fingerprint and start row of the last holdings write, shared by `run` and the `sheet` subcommand
+SHEET_WRITE_FILE = os.path.join(STATE_DIR, 'last_sheet_write.json')
+
+def traced_run(name, **attributes):
+    """Trace one collector run (TRACE_* settings); does nothing when TRACE_ENABLED is off"""
+    if not TRACE_ENABLED:
+        return nullcontext(NOOP_SPAN)
+    return tracer.run(name, export_dir=TRACE_DIR, max_files=TRACE_MAX_FILES, top=TRACE_TOP, **attributes)
+
+def main(runs_per_hour=1, force=False, fresh=False):
+    run_state = RunStateStore(RUN_STATE_DIR, RUN_STATE_TTL).start(fresh)
+    with traced_run('collector.run', runs_per_hour=runs_per_hour, force=force,
+                    run_id=run_state.run_id, resumed=run_state.resumed) as run_span:
+        try:
+            if run_state.resumed:
+                print(f"\n♻️ Resuming run {run_state.run_id} after: {', '.join(run_state.stages)}")
+
+            result = build_pipeline(runs_per_hour, force, run_state).run()
+            result.print_summary()
+
+            if result.ok:
+                run_state.complete()
+            else:
+                run_span.fail(f"Failed stages: {', '.join(result.failed())}")
+                print(f"\n⚠️ Run {run_state.run_id} did not finish; the next run resumes it (--fresh to start over)")
+
+        except Exception as e:
+            run_span.fail(f"{type(e).__name__}: {e}")
+            print(f"\nFatal error: {e}")
+            print(f"Error type: {type(e)}")
+            import traceback
+            traceback.print_exc()
+
+def build_pipeline(runs_per_hour, force, run_state):
+    """
+    The collector run as a stage graph
+
+    Stages already checkpointed in `run_state` reuse their outputs instead of running again.
+    """
+    def sheets_setup():
+        _, sheet = setup_google_sheets()
+        if not sheet:
+            raise StageError('Google Sheets setup failed. Cannot proceed without spreadsheet access.')
+        return {'sheet': sheet}
+
+    def holdings():
+        if run_state.has('holdings'):
+            portfolio = Portfolio(run_state.get('holdings'))
+            print(f"\nReusing {len(portfolio)} holdings fetched by run {run_state.run_id}")
+            return {'holdings': portfolio}
+
+        print("\n=== ZERION WALLET HOLDINGS ===")
+        portfolio = fetch_all_zerion_wallets(runs_per_hour)
+        if not portfolio:
+            raise StageError('No holdings found across all wallets')
+        run_state.save(holdings=portfolio.to_dicts())
+        return {'holdings': portfolio}
+
+    def plan(holdings):
+        # Token quantities identical to the last sheet write: keep the written rows, only refresh prices
+        fingerprint = holdings.fingerprint()
+        symbols = [totals.symbol for totals in holdings.crypto]
+        last_write = read_state_json(SHEET_WRITE_FILE) or {}
+        if not force and last_write.get('fingerprint') == fingerprint and last_write.get('start_row'):
+            tracer.current().set('sheet_skipped', True)
+            print("\n✅ Holdings unchanged since the last sheet write - only refreshing prices (use --force to rewrite)")
+            return {'changed_holdings': None, 'last_start_row': last_write['start_row'],
+                    'symbols': symbols, 'fingerprint': fingerprint}
+        return {'changed_holdings': holdings, 'last_start_row': None, 'symbols': symbols, 'fingerprint': fingerprint}
+
+    def sheet_write(sheet, changed_holdings, last_start_row):
+        if changed_holdings is None:
+            return {'start_row': last_start_row}
+
+        # Extract crypto data from wallet holdings and write to Google Sheets
+        if run_state.has('layout'):
+            start_row = run_state.get('layout')['start_row']
+            print(f"\nReusing the sheet write of run {run_state.run_id} (symbols from row {start_row})")
+            return {'start_row': start_row}
+
+        symbols, start_row = extract_and_write_crypto_data(sheet, changed_holdings)
+        if start_row is None:
+            raise StageError('Holdings were not written to the sheet')
+        run_state.save(symbols=symbols, layout={'start_row': start_row})
+        return {'start_row': start_row}
+
+    def prices(symbols):
+        if not symbols:
+            print("\nNo cryptocurrency symbols found in wallet holdings")
+            return {'prices': {}}
+
+        # Get latest cryptocurrency prices
+        if run_state.has('prices'):
+            crypto_prices = run_state.get('prices')
+            print(f"\nReusing {len(crypto_prices)} prices fetched by run {run_state.run_id}")
+        else:
+            crypto_prices = get_crypto_prices(symbols)
+            if not crypto_prices:
+                raise StageError('No cryptocurrency data retrieved')
+            run_state.save(prices=crypto_prices)
+
+        print("\nLatest Cryptocurrency Prices:")
+        print("\nSymbol\tPrice (USD)")
+        print("-----------------")
+        for symbol, price in crypto_prices.items():
+            print(f"{symbol}\t${price}")
+        return {'prices': crypto_prices}
+
+    def price_write(sheet, prices, start_row):
+        # Update Google Sheet with prices
+        if not update_crypto_prices(sheet, prices, start_row):
+            raise StageError('Prices were not written to the sheet')
+        return {'prices_written': True}
+
+    def record_write(fingerprint, start_row, prices_written):
+        record_sheet_write(fingerprint, start_row)
+
+    def db_report():
+        # Fetch and print most recent data from database
+        print("\n=== DATABASE DATA ===")
+        fetch_latest_database_record()
+
+    # Sheet writes stay ordered (sheet_write, then price_write): the Sheets transport isn't thread-safe
+    return Pipeline([
+        Stage('sheets_setup', sheets_setup, outputs=['sheet'], timeout=STAGE_TIMEOUTS.get('sheets_setup')),
+        Stage('holdings', holdings, outputs=['holdings'], timeout=STAGE_TIMEOUTS.get('holdings')),
+        Stage('db_report', db_report, timeout=STAGE_TIMEOUTS.get('db_report')),
+        Stage('plan', plan, inputs=['holdings'],
+              outputs=['changed_holdings', 'last_start_row', 'symbols', 'fingerprint']),
+        Stage('sheet_write', sheet_write, inputs=['sheet', 'changed_holdings', 'last_start_row'], outputs=['start_row'],
+              timeout=STAGE_TIMEOUTS.get('sheet_write')),
+        Stage('prices', prices, inputs=['symbols'], outputs=['prices'], timeout=STAGE_TIMEOUTS.get('prices')),
+        Stage('price_write', price_write, inputs=['sheet', 'prices', 'start_row'], outputs=['prices_written'],
+              timeout=STAGE_TIMEOUTS.get('price_write')),
+        Stage('record_write', record_write, inputs=['fingerprint', 'start_row', 'prices_written']),
+    ], max_workers=PIPELINE_WORKERS)
+
+def record_sheet_write(fingerprint, start_row):
+    """Remember what was written so the next unchanged run only has to refresh prices"""
+    try:
+        os.makedirs(os.path.dirname(SHEET_WRITE_FILE) or '.', exist_ok=True)
+        with open(SHEET_WRITE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'start_row': start_row}, f)
+    except OSError as e:
+        print(f"Could not record sheet write state: {e}")
+
+def discard_unfinished_runs():
+    """
+    Drop the checkpoints of unfinished runs after the sheet was written outside a run
+
+    A resumed run would otherwise write its checkpointed layout and prices over the newer sheet.
+    """
+    store = RunStateStore(RUN_STATE_DIR, RUN_STATE_TTL)
+    for state in store.pending():
+        print(f"Discarding checkpoints of unfinished run {state.run_id}: the sheet changed since")
+        store.remove(state.run_id)
+
+def read_state_json(path):
+    """Read a small JSON object state file, returning None if it doesn't exist yet or is unreadable"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
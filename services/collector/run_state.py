@@ -0,0 +1,137 @@
+"""
+Run-state store
+Checkpoints the output of each collector stage (holdings, symbols, sheet
+layout, prices) under a run id, so the next run resumes a failed one from the
+first stage that didn't finish instead of fetching everything again.
+Checkpoints expire RUN_STATE_TTL seconds after their run started, and a run's
+file is deleted once it completes.
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+RUN_PREFIX = 'run-'
+RUN_SUFFIX = '.json'
+
+
+class RunState:
+    """Stage outputs of one collector run; each save() is persisted immediately (stages may save concurrently)"""
+
+    def __init__(self, store: 'RunStateStore', run_id: str, started: float, stages: Optional[Dict[str, Any]] = None):
+        self.store = store
+        self.run_id = run_id
+        self.started = started
+        self.stages: Dict[str, Dict[str, Any]] = stages or {}
+        self._lock = threading.Lock()
+
+    @property
+    def resumed(self) -> bool:
+        return bool(self.stages)
+
+    @property
+    def expires(self) -> float:
+        return self.started + self.store.ttl
+
+    def has(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        entry = self.stages.get(stage)
+        return entry['output'] if entry else default
+
+    def save(self, **outputs: Any) -> None:
+        """Checkpoint finished stages, e.g. save(holdings=all_holdings)"""
+        with self._lock:
+            for stage, output in outputs.items():
+                self.stages[stage] = {'saved_at': time.time(), 'output': output}
+            self.store.write(self)
+
+    def complete(self) -> None:
+        """The run finished; nothing is left to resume"""
+        self.store.remove(self.run_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'run_id': self.run_id, 'started': self.started, 'expires': self.expires, 'stages': self.stages}
+
+
+class RunStateStore:
+    """
+    One JSON file per unfinished run in `directory`
+
+    Args:
+        directory: Where run files are kept
+        ttl: Seconds after a run started that its checkpoints may be reused
+    """
+
+    def __init__(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+
+    def path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{RUN_PREFIX}{run_id}{RUN_SUFFIX}")
+
+    def start(self, fresh: bool = False, now: Optional[float] = None) -> RunState:
+        """
+        Resume the newest unexpired unfinished run, or start a new one
+
+        Args:
+            fresh: Discard unfinished runs and start over
+        """
+        now = time.time() if now is None else now
+        pending = self.pending(now)
+        if pending and not fresh:
+            return pending[0]
+        for state in pending:
+            self.remove(state.run_id)
+        run_id = f"{datetime.fromtimestamp(now, timezone.utc):%Y%m%d-%H%M%S}-{secrets.token_hex(3)}"
+        return RunState(self, run_id, now)
+
+    def pending(self, now: Optional[float] = None) -> List[RunState]:
+        """Unfinished runs that haven't expired, newest first; expired and unreadable ones are deleted"""
+        now = time.time() if now is None else now
+        try:
+            names = [name for name in os.listdir(self.directory) if name.startswith(RUN_PREFIX) and name.endswith(RUN_SUFFIX)]
+        except FileNotFoundError:
+            return []
+
+        runs = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                state = RunState(self, data['run_id'], float(data['started']), data['stages'])
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Discarding unreadable run state {path}: {e}")
+                state = None
+            if state is None or state.expires <= now:
+                self._delete(path)
+            else:
+                runs.append(state)
+        return sorted(runs, key=lambda state: state.started, reverse=True)
+
+    def write(self, state: RunState) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(state.run_id)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state.to_dict(), f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # A run without checkpoints still works; it just can't be resumed
+            print(f"Could not checkpoint run {state.run_id}: {e}")
+
+    def remove(self, run_id: str) -> None:
+        self._delete(self.path(run_id))
+
+    @staticmethod
+    def _delete(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
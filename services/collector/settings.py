@@ -0,0 +1,64 @@
+"""
+Collector settings
+Environment configuration and constants shared by every collector stage
+"""
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Supabase configuration
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+
+# Zerion configuration
+ZERION_API_KEY = os.getenv('ZERION_API_KEY')
+
+# Google Sheets
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+SPREADSHEET_ID = '1i03nc79YYhFqQPz0knqN3jPoLvN8fMqe642AOE7Z3mk'
+SHEET_NAME = 'Cypto_Asset'  # Sheet name as specified
+SHEETS_VERIFY = os.getenv('SHEETS_VERIFY', 'false').lower() == 'true'  # Extra spreadsheets.get() per run
+
+# Paths are relative to the services directory, whatever the working directory
+SERVICES_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(SERVICES_DIR)
+SERVICE_ACCOUNT_FILE = os.path.join(SERVICES_DIR, 'utils', 'service-account.json')
+
+# Local state kept between runs (exchange statistics, caches, lock file)
+STATE_DIR = os.getenv('COLLECTOR_STATE_DIR', os.path.join(REPO_DIR, '.state'))
+
+# Price engine configuration
+PRICE_EXCHANGES = [ex.strip() for ex in os.getenv('PRICE_EXCHANGES', 'binance,kraken,kucoin').split(',') if ex.strip()]
+PRICE_MODE = os.getenv('PRICE_MODE', 'median')  # Options: median, first
+PRICE_LATENCY_BUDGET = float(os.getenv('PRICE_LATENCY_BUDGET', 1.5))
+PRICE_DEADLINE = float(os.getenv('PRICE_DEADLINE', 5.0))
+PRICE_MAX_FANOUT = int(os.getenv('PRICE_MAX_FANOUT', 2))  # Fastest exchanges queried per market (0 for all)
+
+# Retention compaction of utgl_gary_wealth_records (python -m services.collector compact)
+RAW_RETENTION_DAYS = int(os.getenv('RAW_RETENTION_DAYS', 14))        # Hourly snapshots kept as-is
+DAILY_RETENTION_DAYS = int(os.getenv('DAILY_RETENTION_DAYS', 180))   # Daily rollups kept before folding into weeks
+COMPACTION_BATCH_SIZE = int(os.getenv('COMPACTION_BATCH_SIZE', 200))  # Rows read or deleted per request
+
+# Wallet registry (addresses and provider rate limits)
+WALLET_REGISTRY_FILE = os.getenv('WALLET_REGISTRY_FILE', os.path.join(REPO_DIR, 'config', 'wallets.yaml'))
+
+# Span tracing of collector runs (OTLP/JSON files plus a slowest-spans table)
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'true').lower() == 'true'
+TRACE_DIR = os.getenv('TRACE_DIR', os.path.join(STATE_DIR, 'traces'))
+TRACE_MAX_FILES = int(os.getenv('TRACE_MAX_FILES', 14))  # Daily trace files kept
+TRACE_TOP = int(os.getenv('TRACE_TOP', 15))              # Slowest spans printed after each run
+
+# Stage checkpoints of unfinished runs, resumed by the next run until they expire
+RUN_STATE_DIR = os.getenv('RUN_STATE_DIR', os.path.join(STATE_DIR, 'runs'))
+RUN_STATE_TTL = int(os.getenv('RUN_STATE_TTL', 5400))  # Seconds after a run starts that its outputs may be reused (> the hourly cron interval)
+
+# Run pipeline: stages running at once, and per-stage timeouts in seconds ("holdings=600,prices=30" overrides)
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 4))
+STAGE_TIMEOUTS = {'sheets_setup': 60, 'holdings': 600, 'sheet_write': 120, 'prices': 60, 'price_write': 60, 'db_report': 60}
+STAGE_TIMEOUTS.update({
+    name.strip(): float(seconds)
+    for name, _, seconds in (item.partition('=') for item in os.getenv('STAGE_TIMEOUTS', '').split(','))
+    if name.strip()
+})
@@ -0,0 +1,341 @@
+"""
+Sheets stage
+Writes holdings and prices to the Cypto_Asset Google Sheet
+"""
+import os
+
+from services.collector.portfolio import Portfolio
+from services.collector.settings import SCOPES, SPREADSHEET_ID, SHEET_NAME, SERVICE_ACCOUNT_FILE, SHEETS_VERIFY, STATE_DIR
+from services.collector.sheets_client import SheetsClientFactory
+from services.tracing import traced, tracer
+
+# Sheets client factory kept warm between runs when running as a daemon
+sheets_factory = None
+
+@traced('sheets.setup')
+def setup_google_sheets():
+    """Setup Google Sheets API, reusing the service, transport and access token across runs"""
+    global sheets_factory
+    try:
+        from googleapiclient.errors import HttpError
+
+        if sheets_factory is None:
+            if not os.path.exists(SERVICE_ACCOUNT_FILE):
+                print(f"\nService account file not found: {SERVICE_ACCOUNT_FILE}")
+                return None, None
+
+            print(f"\nUsing service account file: {SERVICE_ACCOUNT_FILE}")
+            sheets_factory = SheetsClientFactory(SERVICE_ACCOUNT_FILE, SCOPES, STATE_DIR)
+
+        service = sheets_factory.service()
+        sheet = service.spreadsheets()
+
+        # Optional connection test (costs an extra API call per run)
+        if SHEETS_VERIFY:
+            try:
+                print("\nTesting connection to Google Sheets API...")
+                print(f"Successfully connected to spreadsheet: {sheets_factory.verify(SPREADSHEET_ID)}")
+            except HttpError as e:
+                print(f"\nError accessing spreadsheet: {e}")
+                return None, None
+
+        return service, sheet
+
+    except Exception as e:
+        tracer.current().fail(f"{type(e).__name__}: {e}")
+        print(f"\nError in setup_google_sheets: {str(e)}")
+        return None, None
+
+@traced('sheet.write')
+def extract_and_write_crypto_data(sheet, all_holdings):
+    """
+    Extract unique crypto symbols from wallet holdings, order by USD value, and write to Google Sheets with quantities and values
+
+    Args:
+        all_holdings: Portfolio (its totals are reused) or a list of holdings
+
+    Returns:
+        Tuple of (symbols, first symbol row); the row is None when nothing was written
+    """
+    try:
+        if not sheet or not all_holdings:
+            return [], None
+        
+        portfolio = all_holdings if isinstance(all_holdings, Portfolio) else Portfolio(all_holdings)
+        crypto_data = portfolio.crypto
+        crypto_symbols = [totals.symbol for totals in crypto_data]
+        
+        print(f"\nFound {len(crypto_symbols)} unique crypto symbols from wallet holdings")
+        print(f"Top 5: {crypto_symbols[:5]}")
+        
+        # Find headers in the first row
+        header_result = sheet.values().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{SHEET_NAME}!1:5"
+        ).execute()
+        
+        header_values = header_result.get('values', [])
+        currency_col = None
+        utgl_eth_col = None
+        currency_row = None
+        
+        # Search for Currency, UTGL.ETH, and UTGL.ETH (value) headers
+        utgl_eth_value_col = None
+        for row_idx, row in enumerate(header_values):
+            if row:
+                for col_idx, cell in enumerate(row):
+                    if cell == "Currency":
+                        currency_col = col_idx  # 0-based column index
+                        currency_row = row_idx + 1  # 1-based row index
+                    elif cell == "UTGL.ETH":
+                        utgl_eth_col = col_idx  # 0-based column index
+                    elif cell == "UTGL.ETH (value)":
+                        utgl_eth_value_col = col_idx  # 0-based column index
+        
+        if currency_col is None:
+            print("Currency header not found")
+            return crypto_symbols, None
+        
+        if utgl_eth_col is None:
+            print("UTGL.ETH header not found")
+            return crypto_symbols, None
+        
+        # Use UTGL.ETH (value) column if found, otherwise use next column after UTGL.ETH
+        if utgl_eth_value_col is not None:
+            value_col = utgl_eth_value_col
+        else:
+            value_col = utgl_eth_col + 1
+        
+        # Convert column indices to letters
+        currency_col_letter = chr(ord('A') + currency_col)
+        utgl_eth_col_letter = chr(ord('A') + utgl_eth_col)
+        value_col_letter = chr(ord('A') + value_col)
+        
+        print(f"Found Currency at column {currency_col_letter}, UTGL.ETH at column {utgl_eth_col_letter}, Value at column {value_col_letter}")
+        
+        # Calculate totals
+        total_portfolio_value = sum(totals.usd_value for totals in crypto_data)
+        total_quantity = sum(totals.quantity for totals in crypto_data)
+        
+        # Write totals directly above the headers (one row up from headers)
+        # If headers are in row 5, totals go in row 4
+        total_row = currency_row
+        
+        # Total quantity above UTGL.ETH column
+        quantity_total_range = f"{SHEET_NAME}!{utgl_eth_col_letter}{total_row}"
+        sheet.values().update(
+            spreadsheetId=SPREADSHEET_ID,
+            range=quantity_total_range,
+            valueInputOption='RAW',
+            body={'values': [[round(total_quantity, 2)]]}
+        ).execute()
+        
+        # Total value above UTGL.ETH (value) column
+        value_total_range = f"{SHEET_NAME}!{value_col_letter}{total_row}"
+        sheet.values().update(
+            spreadsheetId=SPREADSHEET_ID,
+            range=value_total_range,
+            valueInputOption='RAW',
+            body={'values': [[f"${total_portfolio_value:,.2f}"]]}
+        ).execute()
+        
+        print(f"Updated totals - Quantity: {round(total_quantity, 2)} at {quantity_total_range}, Value: ${total_portfolio_value:,.2f} at {value_total_range}")
+        
+        # Write symbols starting from 2 rows after the Currency header
+        start_row = currency_row + 2
+        
+        # Prepare data for batch write
+        currency_data = [[totals.symbol] for totals in crypto_data]
+        quantity_data = [[round(totals.quantity, 2)] for totals in crypto_data]
+        value_data = [[f"${totals.usd_value:,.2f}"] for totals in crypto_data]
+        
+        # Clear existing data in all columns
+        clear_rows = 50
+        clear_ranges = [
+            f"{SHEET_NAME}!{currency_col_letter}{start_row}:{currency_col_letter}{start_row + clear_rows}",
+            f"{SHEET_NAME}!{utgl_eth_col_letter}{start_row}:{utgl_eth_col_letter}{start_row + clear_rows}",
+            f"{SHEET_NAME}!{value_col_letter}{start_row}:{value_col_letter}{start_row + clear_rows}"
+        ]
+        
+        for clear_range in clear_ranges:
+            clear_body = {'values': [[''] for _ in range(clear_rows + 1)]}
+            sheet.values().update(
+                spreadsheetId=SPREADSHEET_ID,
+                range=clear_range,
+                valueInputOption='RAW',
+                body=clear_body
+            ).execute()
+        
+        # Write new data to all columns
+        if crypto_data:
+            end_row = start_row + len(crypto_data) - 1
+            
+            # Write symbols to Currency column
+            currency_range = f"{SHEET_NAME}!{currency_col_letter}{start_row}:{currency_col_letter}{end_row}"
+            sheet.values().update(
+                spreadsheetId=SPREADSHEET_ID,
+                range=currency_range,
+                valueInputOption='RAW',
+                body={'values': currency_data}
+            ).execute()
+            
+            # Write quantities to UTGL.ETH column
+            quantity_range = f"{SHEET_NAME}!{utgl_eth_col_letter}{start_row}:{utgl_eth_col_letter}{end_row}"
+            sheet.values().update(
+                spreadsheetId=SPREADSHEET_ID,
+                range=quantity_range,
+                valueInputOption='RAW',
+                body={'values': quantity_data}
+            ).execute()
+            
+            # Write USD values to next column
+            value_range = f"{SHEET_NAME}!{value_col_letter}{start_row}:{value_col_letter}{end_row}"
+            sheet.values().update(
+                spreadsheetId=SPREADSHEET_ID,
+                range=value_range,
+                valueInputOption='RAW',
+                body={'values': value_data}
+            ).execute()
+            
+            print(f"Updated {len(crypto_symbols)} entries across Currency, UTGL.ETH, and value columns")
+        
+        return crypto_symbols, start_row
+        
+    except Exception as e:
+        tracer.current().fail(f"{type(e).__name__}: {e}")
+        print(f"Error extracting and writing crypto data: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return [], None
+
+@traced('sheet.read_symbols')
+def read_crypto_symbols(sheet):
+    """
+    Dynamically find the Currency header and read cryptocurrency symbols below it
+
+    Returns:
+        Tuple of (symbols, first symbol row); the row is None when the header wasn't found
+    """
+    try:
+        if not sheet:
+            return [], None
+
+        print("\nLooking for 'Currency' header in spreadsheet...")
+        # First, read a larger range to find the "Currency" header
+        result = sheet.values().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{SHEET_NAME}!A1:A50"  # Read a large enough range to find the header
+        ).execute()
+
+        values = result.get('values', [])
+        if not values:
+            print("No data found in column A")
+            return [], None
+
+        # Find the "Currency" header
+        currency_row = None
+        for i, row in enumerate(values):
+            if row and row[0] == "Currency":
+                currency_row = i + 1  # 1-indexed row number
+                print(f"Found 'Currency' header at row {currency_row}")
+                break
+
+        if currency_row is None:
+            print("Currency header not found in column A")
+            return [], None
+
+        # Start reading symbols from TWO rows after the Currency header
+        # because the header spans two rows
+        start_row = currency_row + 2
+        print(f"Reading cryptocurrency symbols starting from row {start_row}")
+
+        # Read symbols until an empty cell is found
+        symbols_result = sheet.values().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{SHEET_NAME}!A{start_row}:A50"  # Read from start_row to row 50
+        ).execute()
+
+        symbols_values = symbols_result.get('values', [])
+
+        # Extract symbols until an empty cell
+        symbols = []
+        for row in symbols_values:
+            if not row or not row[0].strip():  # Stop at first empty cell
+                break
+            symbols.append(row[0])
+
+        print(f"Found {len(symbols)} cryptocurrency symbols: {symbols}")
+        return symbols, start_row
+
+    except Exception as e:
+        tracer.current().fail(f"{type(e).__name__}: {e}")
+        print(f"Error reading symbols from Google Sheet: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return [], None
+
+@traced('sheet.prices')
+def update_crypto_prices(sheet, prices, start_row):
+    """
+    Update cryptocurrency prices in column B for each symbol in column A
+
+    Args:
+        start_row: First symbol row, as returned by extract_and_write_crypto_data or read_crypto_symbols
+
+    Returns:
+        True unless the sheet couldn't be read or updated
+    """
+    try:
+        if not sheet or not prices:
+            return True
+
+        # Without the symbol rows we can't tell which cells to update
+        if not start_row:
+            return False
+
+        # Read symbols to ensure we're updating correct rows
+        result = sheet.values().get(
+            spreadsheetId=SPREADSHEET_ID,
+            range=f"{SHEET_NAME}!A{start_row}:A{start_row+30}"  # Read more rows than needed
+        ).execute()
+
+        values = result.get('values', [])
+        if not values:
+            print("No symbols found in the spreadsheet")
+            return False
+
+        # Prepare batch update
+        data = []
+        for i, row_data in enumerate(values):
+            if not row_data or not row_data[0].strip():  # Stop at first empty row
+                break
+
+            symbol = row_data[0]
+            if symbol in prices:
+                # Update the corresponding row in column B
+                current_row = start_row + i
+                data.append({
+                    'range': f"{SHEET_NAME}!B{current_row}",
+                    'values': [[prices[symbol]]]
+                })
+
+        # Execute batch update
+        if data:
+            body = {
+                'valueInputOption': 'RAW',
+                'data': data
+            }
+
+            result = sheet.values().batchUpdate(
+                spreadsheetId=SPREADSHEET_ID,
+                body=body
+            ).execute()
+
+        return True
+
+    except Exception as e:
+        tracer.current().fail(f"{type(e).__name__}: {e}")
+        print(f"Error updating Google Sheet: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
@@ -0,0 +1,152 @@
+"""
+Google Sheets client factory
+Builds the Sheets service from a static (or disk-cached) discovery document,
+persists the service-account access token until it expires and reuses one
+authorized HTTP transport for every call
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from services.tracing import span
+
+# Refresh tokens a little before Google's expiry so in-flight calls don't fail
+TOKEN_EXPIRY_MARGIN = timedelta(minutes=5)
+
+
+def traced_request_class():
+    """
+    HttpRequest subclass timing every Sheets API call as a span
+
+    Built on first use so googleapiclient is only imported by the stages that need it.
+    """
+    from googleapiclient.http import HttpRequest
+
+    class TracedHttpRequest(HttpRequest):
+        def execute(self, http=None, num_retries=0):
+            with span(self.methodId, 'client') as call_span:
+                call_span.set('request.bytes', len(self.body or ''))
+                postproc = self.postproc
+
+                def measured(resp, content):
+                    call_span.set('http.status_code', resp.status)
+                    call_span.set('response.bytes', len(content or b''))
+                    return postproc(resp, content)
+
+                self.postproc = measured
+                try:
+                    return super().execute(http=http, num_retries=num_retries)
+                finally:
+                    self.postproc = postproc
+
+    return TracedHttpRequest
+
+
+class SheetsClientFactory:
+    """Creates and caches an authorized Sheets v4 service for one service account"""
+
+    def __init__(self, service_account_file: str, scopes, cache_dir: str, timeout: int = 30):
+        self.service_account_file = service_account_file
+        self.scopes = scopes
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.token_file = os.path.join(cache_dir, 'sheets_token.json')
+        self.discovery_file = os.path.join(cache_dir, 'sheets_v4_discovery.json')
+
+        self._credentials = None
+        self._http = None
+        self._service = None
+
+    def _load_discovery_document(self) -> str:
+        """Discovery document bundled with googleapiclient, else a disk cache filled on first use"""
+        from googleapiclient.discovery_cache import get_static_doc
+
+        document = get_static_doc('sheets', 'v4')
+        if document:
+            return document
+
+        if os.path.exists(self.discovery_file):
+            with open(self.discovery_file, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        import requests
+
+        print("Downloading Sheets discovery document (cached for later runs)")
+        response = requests.get('https://sheets.googleapis.com/$discovery/rest?version=v4', timeout=self.timeout)
+        response.raise_for_status()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.discovery_file, 'w', encoding='utf-8') as f:
+            f.write(response.text)
+        return response.text
+
+    def _load_cached_token(self, credentials) -> None:
+        """Reuse a previously minted access token if it is still valid; a damaged cache is ignored"""
+        try:
+            with open(self.token_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if not isinstance(cached, dict) or cached.get('service_account') != credentials.service_account_email:
+                return
+            token = cached['token']
+            expiry = datetime.fromisoformat(cached['expiry'])
+            fresh = expiry - TOKEN_EXPIRY_MARGIN > datetime.utcnow()
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            print(f"Ignoring cached Sheets access token: {e!r}")
+            return
+
+        if fresh and isinstance(token, str):
+            credentials.token = token
+            credentials.expiry = expiry
+
+    def _save_token(self, credentials) -> None:
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd = os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'service_account': credentials.service_account_email,
+                    'token': credentials.token,
+                    'expiry': credentials.expiry.isoformat()
+                }, f)
+        except OSError as e:
+            print(f"Could not cache Sheets access token: {e}")
+
+    def ensure_token(self) -> None:
+        """Mint a new access token only when the cached one is missing or about to expire"""
+        credentials = self._credentials
+        if credentials.token and credentials.expiry and credentials.expiry - TOKEN_EXPIRY_MARGIN > datetime.utcnow():
+            return
+
+        import google_auth_httplib2
+
+        with span('sheets.token_refresh', 'client'):
+            credentials.refresh(google_auth_httplib2.Request(self._http.http))
+        self._save_token(credentials)
+
+    def service(self):
+        """Authorized Sheets v4 service; built once and reused for the life of the factory"""
+        if self._service is None:
+            import httplib2
+            import google_auth_httplib2
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build_from_document
+
+            self._credentials = service_account.Credentials.from_service_account_file(
+                self.service_account_file,
+                scopes=self.scopes
+            )
+            self._load_cached_token(self._credentials)
+            self._http = google_auth_httplib2.AuthorizedHttp(self._credentials, http=httplib2.Http(timeout=self.timeout))
+            self._service = build_from_document(self._load_discovery_document(), http=self._http,
+                                                requestBuilder=traced_request_class())
+
+        self.ensure_token()
+        return self._service
+
+    def verify(self, spreadsheet_id: str) -> Optional[str]:
+        """Optional connectivity check; returns the spreadsheet title"""
+        result = self.service().spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields='properties.title'
+        ).execute()
+        return result.get('properties', {}).get('title', 'Unknown')
@@ -3,19 +3,56 @@ Database service for Gary Wealth Data API
 Handles all Supabase database operations
 """
 import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
-from supabase import create_client, Client
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
 from config.settings import config
+from services.balance_facts import (
+    FACTS_TABLE, SYMBOL_TOTALS_TABLE, ACCOUNT_BALANCES_TABLE, APPLY_SNAPSHOT_RPC,
+    explode_balances, group_by_account, chunked
+)
+from services.ingest_spool import IngestSpool, SpoolReplayer, SpoolSlot, host_depth, record_hash
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 logger = logging.getLogger(__name__)
 
+# SQLSTATE classes (data exception, integrity violation) and PostgREST codes for a record
+# the database will never accept, however often it is retried
+REJECTED_RECORD_CODES = ('22', '23', 'PGRST102')
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Whether an insert failed because the database is down or slow rather than because it rejected the record
+    
+    Args:
+        error: The raised exception; wrapped exceptions are followed through __cause__
+    """
+    while error is not None:
+        code = getattr(error, 'code', None)
+        if isinstance(code, str) and code.startswith(REJECTED_RECORD_CODES):
+            return False
+        error = error.__cause__
+    return True
+
 class DatabaseService:
     """Service class for database operations"""
     
     def __init__(self):
-        self.client: Optional[Client] = None
+        self.client: Optional['Client'] = None
         self._initialized = False
+        self._spool: Optional[IngestSpool] = None
+        self._spool_slot: Optional[SpoolSlot] = None
+        self._replayer: Optional[SpoolReplayer] = None
+        self._spool_lock = threading.Lock()
+        self._insert_pool: Optional[ThreadPoolExecutor] = None
+        self._insert_pool_lock = threading.Lock()
+        # Inserts still running after their request was answered from the spool, by record hash
+        self._late_inserts: Dict[str, Future] = {}
     
     def _initialize_client(self) -> None:
         """Initialize Supabase client lazily"""
@@ -26,6 +63,10 @@ class DatabaseService:
             # Validate configuration
             config.validate_required_config()
             
+            # Imported here: supabase is the heaviest import in the app and most
+            # cold starts only need it once the first request reaches the database
+            from supabase import create_client
+            
             # Create Supabase client
             self.client = create_client(config.supabase_url, config.supabase_key)
             self._initialized = True
@@ -35,19 +76,335 @@ class DatabaseService:
             logger.error(f"Failed to initialize Supabase client: {str(e)}")
             raise
     
+    def preload(self) -> None:
+        """Import the Supabase client library without connecting (eager startup mode)"""
+        import supabase  # noqa: F401
+    
+    def warmup(self) -> bool:
+        """
+        Create the Supabase client ahead of the first request
+        
+        Returns:
+            True if the client is ready, False if initialization failed
+        """
+        try:
+            self._initialize_client()
+            return True
+        except Exception as e:
+            logger.warning(f"Database warmup failed, will retry on first request: {str(e)}")
+            return False
+    
+    def reset_after_fork(self) -> None:
+        """Drop a client inherited from the parent process; its connections are not fork-safe"""
+        if self._initialized:
+            logger.info("Discarding Supabase client inherited across fork")
+        self.client = None
+        self._initialized = False
+        # Threads, the spool slot lock and the insert pool don't survive fork either
+        self._spool = None
+        self._spool_slot = None
+        self._replayer = None
+        self._spool_lock = threading.Lock()
+        self._insert_pool = None
+        self._insert_pool_lock = threading.Lock()
+        self._late_inserts = {}
+    
+    def _get_spool(self) -> Optional[IngestSpool]:
+        """
+        Open this process's spool and start its replayer on first use
+        
+        Returns:
+            The spool, or None when spooling is disabled or the spool directory is unusable
+        """
+        if not config.spool_enabled:
+            return None
+        if self._spool is None:
+            with self._spool_lock:
+                if self._spool is None:
+                    try:
+                        if not config.spool_dir:
+                            raise RuntimeError("SPOOL_ENABLED is set without SPOOL_DIR (use a persistent volume)")
+                        slot = SpoolSlot(config.spool_dir)
+                        spool = IngestSpool(slot.claim(), fsync_interval=config.spool_fsync_interval)
+                    except (OSError, RuntimeError) as e:
+                        logger.error(f"Ingest spool unavailable, inserts will fail fast: {str(e)}")
+                        return None
+                    self._replayer = SpoolReplayer(
+                        spool,
+                        self.insert_batch,
+                        batch_size=config.spool_replay_batch,
+                        skip=self._stored_late,
+                        defer=self._insert_running,
+                        is_transient=is_transient_error,
+                        max_attempts=config.spool_max_attempts
+                    )
+                    self._replayer.start()
+                    self._spool_slot, self._spool = slot, spool
+                    if spool.depth:
+                        logger.info(f"Replaying {spool.depth} records left in {spool.directory}")
+        return self._spool
+    
+    def start_spool(self) -> None:
+        """Claim a spool slot now so records left by a previous worker are replayed without waiting for traffic"""
+        self._get_spool()
+    
+    def _get_insert_pool(self) -> ThreadPoolExecutor:
+        if self._insert_pool is None:
+            with self._insert_pool_lock:
+                if self._insert_pool is None:
+                    self._insert_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='db-insert')
+        return self._insert_pool
+    
     def insert_wealth_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Insert wealth data into the database
+        Insert wealth data into the database, spooling it to disk when the
+        database fails or doesn't answer within the latency budget
+        
+        While the spool's replayer is still getting failures from the database, new
+        records go straight to the spool. Otherwise they are inserted directly, even
+        if older records are still waiting; every record keeps the timestamp of its
+        request. A record the database rejects is never spooled: the error is raised.
         
         Args:
             data: Complete JSON payload to store
             
         Returns:
-            Dictionary containing the inserted record information
+            Dictionary containing the inserted record information; 'spooled' is
+            True when the record was queued for replay instead of inserted
+            
+        Raises:
+            Exception: If database operation fails and the record could not be spooled
+        """
+        # Prepare record with current timestamp
+        current_timestamp = datetime.now(timezone.utc).isoformat()
+        
+        db_record = {
+            'date': current_timestamp,
+            'data': data
+        }
+        
+        spool = self._get_spool()
+        if spool is None:
+            return self._insert_record(db_record)
+        
+        if self._replayer.failing:
+            return self._spool_record(spool, db_record, f"database is failing: {self._replayer.last_error}")
+        
+        future = self._get_insert_pool().submit(self._insert_record, db_record)
+        try:
+            return future.result(timeout=config.insert_latency_budget)
+        except FutureTimeout:
+            data_hash = record_hash(data, current_timestamp)
+            # The replayer defers the spooled copy while this insert runs and skips it if the insert lands
+            self._late_inserts[data_hash] = future
+            self._replayer.failing = True
+            return self._spool_record(spool, db_record, f"insert exceeded {config.insert_latency_budget}s", data_hash)
+        except Exception as e:
+            if not is_transient_error(e):
+                raise
+            self._replayer.failing = True
+            return self._spool_record(spool, db_record, str(e))
+    
+    def _spool_record(self, spool: IngestSpool, db_record: Dict[str, Any], reason: str,
+                      data_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Append a record to the spool and wake the replayer"""
+        try:
+            appended = spool.append(db_record['data'], db_record['date'], data_hash)
+        except OSError as e:
+            logger.error(f"Failed to spool wealth data record: {str(e)}")
+            raise Exception(f"Failed to store wealth data: {reason}")
+        
+        if appended:
+            logger.warning(f"Spooled wealth data record ({reason}); spool depth {spool.depth}")
+        else:
+            logger.info("Identical wealth data record is already spooled, skipping duplicate")
+        self._replayer.wake()
+        
+        return {
+            'success': True,
+            'spooled': True,
+            'duplicate': not appended,
+            'inserted_at': db_record['date'],
+            'record': None,
+            'spool_depth': spool.depth
+        }
+    
+    def _insert_running(self, data_hash: str) -> bool:
+        """Whether the insert that overran its latency budget for a spooled record is still running"""
+        future = self._late_inserts.get(data_hash)
+        return future is not None and not future.done()
+    
+    def _stored_late(self, data_hash: str) -> bool:
+        """
+        Whether a spooled record was stored by the insert that overran its latency budget
+        
+        Returns:
+            True if that insert succeeded (the spooled copy is a duplicate), False if
+            it failed or never existed
+        """
+        future = self._late_inserts.pop(data_hash, None)
+        return future is not None and future.done() and future.exception() is None
+    
+    def insert_batch(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Bulk insert spooled records, keeping their original timestamps
+        
+        Not idempotent: the replayer inserts at least once, so a batch stored just
+        before a crash is stored twice (same date and data).
+        
+        Args:
+            records: List of {'date', 'data'} records in ingest order
+            
+        Raises:
+            Exception: If database operation fails
+        """
+        self._initialize_client()
+        result = self.client.table('utgl_gary_wealth_records').insert(records).execute()
+        if not result.data:
+            raise Exception("No data returned from insert operation")
+        self.insert_balance_facts(result.data)
+    
+    def insert_balance_facts(self, snapshots: List[Dict[str, Any]]) -> int:
+        """
+        Explode stored snapshots into utgl_gary_balance_facts rows with bulk inserts
+        
+        The snapshot itself is already stored, so a failure here is logged rather
+        than raised; migrations/001_utgl_gary_balance_facts.sql backfills missing facts.
+        
+        Args:
+            snapshots: Inserted utgl_gary_wealth_records rows (with id, date and data)
+            
+        Returns:
+            Number of fact rows written
+        """
+        written = 0
+        if config.balance_facts_enabled:
+            rows = [
+                row for snapshot in snapshots
+                for row in explode_balances(snapshot.get('id'), snapshot.get('date'), snapshot.get('data'))
+            ]
+            try:
+                for batch in chunked(rows):
+                    self.client.table(FACTS_TABLE).insert(batch, returning='minimal').execute()
+                    written += len(batch)
+            except Exception as e:
+                logger.error(f"Failed to write balance facts ({written}/{len(rows)} rows written): {str(e)}")
+        
+        if config.portfolio_totals_enabled:
+            # In ingest order, so each snapshot's delta is taken against the one before it
+            for snapshot in snapshots:
+                self.apply_portfolio_totals(snapshot)
+        return written
+    
+    def apply_portfolio_totals(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Fold one snapshot into the running per-symbol and per-account totals
+        
+        The database applies the difference against each account's previous
+        balances, so the cost is proportional to the accounts in this snapshot.
+        Failures are logged; rerunning migrations/002 after truncating the
+        totals tables rebuilds them from the balance facts.
+        
+        Every account in the payload is sent, including one that was emptied, so
+        its previous balances are taken out of the totals.
+        """
+        accounts = group_by_account(snapshot.get('data'))
+        if not accounts:
+            return
+        try:
+            self.client.rpc(APPLY_SNAPSHOT_RPC, {
+                'p_snapshot_id': snapshot.get('id'),
+                'p_date': snapshot.get('date'),
+                'p_accounts': accounts
+            }).execute()
+        except Exception as e:
+            logger.error(f"Failed to update portfolio totals for snapshot {snapshot.get('id')}: {str(e)}")
+    
+    def get_symbol_totals(self) -> List[Dict[str, Any]]:
+        """
+        Cross-account totals per symbol from the incrementally maintained summary
+        
+        Returns:
+            List of {'symbol', 'total', 'accounts', 'updated_at'} sorted by symbol
+            
+        Raises:
+            Exception: If database operation fails
+        """
+        self._initialize_client()
+        result = self.client.table(SYMBOL_TOTALS_TABLE)\
+            .select('symbol,total,accounts,updated_at')\
+            .order('symbol')\
+            .execute()
+        return result.data or []
+    
+    def get_account_balances(self, account_id: str) -> List[Dict[str, Any]]:
+        """
+        Latest non-zero balances of one account
+        
+        Returns:
+            List of {'symbol', 'balance', 'snapshot_id', 'date'} sorted by symbol
             
         Raises:
             Exception: If database operation fails
         """
+        self._initialize_client()
+        result = self.client.table(ACCOUNT_BALANCES_TABLE)\
+            .select('symbol,balance,snapshot_id,date')\
+            .eq('account_id', account_id)\
+            .order('symbol')\
+            .execute()
+        return result.data or []
+
+    def get_wealth_records_page(self, after_id: int = 0, limit: int = 500, since: Optional[str] = None,
+                                until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        One page of utgl_gary_wealth_records in id order, starting after `after_id`
+
+        Keyset pagination: every page is an index range scan on the primary key,
+        so the cost of a page doesn't grow with how far into the table it is.
+
+        Args:
+            after_id: Last id already read (0 for the start of the table)
+            limit: Rows per page
+            since: Only snapshots dated at or after this ISO timestamp
+            until: Only snapshots dated before this ISO timestamp
+
+        Returns:
+            List of {'id', 'date', 'data'}; fewer than `limit` rows means the end was reached
+
+        Raises:
+            Exception: If database operation fails
+        """
+        self._initialize_client()
+        query = self.client.table('utgl_gary_wealth_records')\
+            .select('id,date,data')\
+            .gt('id', after_id)
+        if since:
+            query = query.gte('date', since)
+        if until:
+            query = query.lt('date', until)
+        result = query.order('id').limit(limit).execute()
+        return result.data or []
+
+    def spool_status(self) -> Dict[str, Any]:
+        """
+        Records waiting in every worker's spool on this host, and this worker's replay progress
+        
+        `depth` is read from the spool files, so it is the same whichever worker answers.
+        """
+        if not config.spool_enabled:
+            return {'enabled': False}
+        if self._get_spool() is None:
+            return {'enabled': True, 'available': False}
+        return {
+            'enabled': True,
+            'available': True,
+            'depth': host_depth(config.spool_dir),
+            'worker': self._replayer.status()
+        }
+    
+    def _insert_record(self, db_record: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert one prepared record into utgl_gary_wealth_records"""
         # Initialize client if not done yet
         self._initialize_client()
         
@@ -55,14 +412,6 @@ class DatabaseService:
             raise Exception("Database client not initialized")
         
         try:
-            # Prepare record with current timestamp
-            current_timestamp = datetime.now(timezone.utc).isoformat()
-            
-            db_record = {
-                'date': current_timestamp,
-                'data': data
-            }
-            
             # Debug: Log what we're about to insert
             logger.info(f"DEBUG - Inserting record: {db_record}")
             
@@ -75,6 +424,8 @@ class DatabaseService:
             inserted_record = result.data[0]
             logger.info(f"Successfully inserted wealth data record at: {inserted_record.get('date')}")
             
+            self.insert_balance_facts([inserted_record])
+            
             return {
                 'success': True,
                 'inserted_at': inserted_record.get('date'),
@@ -83,7 +434,7 @@ class DatabaseService:
             
         except Exception as e:
             logger.error(f"Database insert operation failed: {str(e)}")
-            raise Exception(f"Failed to store wealth data: {str(e)}")
+            raise Exception(f"Failed to store wealth data: {str(e)}") from e
     
     def health_check(self) -> Dict[str, Any]:
         """
@@ -99,8 +450,8 @@ class DatabaseService:
             if not self.client:
                 return {'healthy': False, 'error': 'Client not initialized'}
             
-            # Simple query to test connection
-            result = self.client.table('utgl_gary_wealth_records').select('count').limit(1).execute()
+            # Cheapest possible query: one id off the primary key index, whatever the table size
+            self.client.table('utgl_gary_wealth_records').select('id').limit(1).execute()
             
             return {
                 'healthy': True,
@@ -118,3 +469,8 @@ class DatabaseService:
 
 # Global database service instance
 db_service = DatabaseService()
+
+# Gunicorn --preload forks workers from a master that imported this module;
+# make sure no worker ever shares the master's HTTP connections
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=db_service.reset_after_fork)
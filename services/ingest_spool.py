@@ -0,0 +1,501 @@
+"""
+Disk-backed ingest spool for the wealth data API
+Records that can't be written to Supabase in time are appended to segmented
+NDJSON files, fsynced in batches, and replayed in order by a background
+thread once the database accepts writes again
+
+Replay is at-least-once: a batch the database stored just before a crash (or
+before the cursor was saved) is inserted again on restart. A replayed copy keeps
+the payload and the timestamp of the original request, so duplicates can be
+recognised by (date, data). Records the database rejects outright are moved to
+a dead-letter file instead of blocking the records behind them, and records
+whose fate isn't known yet are moved to the back of the spool.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.ndjson'
+
+# Slots let every gunicorn worker own a spool; a restarted worker claims a free slot and drains it
+MAX_SLOTS = 64
+
+
+DEAD_LETTER_FILE = 'dead-letter.ndjson'
+
+
+def record_hash(data: Any, date: str) -> str:
+    """
+    Key of one ingested record: its payload and the timestamp it was received at
+
+    Two requests with the same payload are different records; only a second copy
+    of the same request (same date) is a duplicate.
+    """
+    canonical = json.dumps({'date': date, 'data': data}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _segment_name(seq: int) -> str:
+    return f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}"
+
+
+def _list_segments(directory: str) -> List[int]:
+    segments = []
+    for name in os.listdir(directory):
+        if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+            segments.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+    return sorted(segments)
+
+
+def _read_cursor(cursor_file: str) -> Optional[Tuple[int, int]]:
+    try:
+        with open(cursor_file, 'r', encoding='utf-8') as f:
+            cursor = json.load(f)
+        return cursor['segment'], cursor['offset']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _count_records(directory: str, segments: List[int], cursor: Tuple[int, int]) -> int:
+    """Complete records from `cursor` onwards, counted by their newlines without parsing them"""
+    count = 0
+    for seq in segments:
+        if seq < cursor[0]:
+            continue
+        try:
+            with open(os.path.join(directory, _segment_name(seq)), 'rb') as f:
+                if seq == cursor[0]:
+                    f.seek(cursor[1])
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    count += chunk.count(b'\n')
+        except FileNotFoundError:
+            continue
+    return count
+
+
+def pending_records(directory: str) -> int:
+    """
+    Records waiting in one spool directory, read from its files alone
+
+    Safe to call on a spool another process owns: only complete lines are counted,
+    and a segment deleted while counting is skipped.
+    """
+    try:
+        segments = _list_segments(directory)
+    except FileNotFoundError:
+        return 0
+    if not segments:
+        return 0
+    return _count_records(directory, segments, _read_cursor(os.path.join(directory, 'cursor.json'))
+                          or (segments[0], 0))
+
+
+def host_depth(root: str) -> int:
+    """Records waiting across every slot under the spool root, whichever worker owns them"""
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return 0
+    return sum(pending_records(os.path.join(root, name)) for name in names if name.startswith('slot-'))
+
+
+class IngestSpool:
+    """
+    Append-only spool in one directory
+
+    Records are appended to the newest segment and a new segment is started once
+    it exceeds `segment_bytes`. Appends return only after their bytes are fsynced;
+    a flusher thread fsyncs every `fsync_interval` seconds so concurrent appends
+    share one fsync. A cursor file records how far the replayer has got, and
+    segments behind the cursor are deleted.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024, fsync_interval: float = 0.02):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.cursor_file = os.path.join(directory, 'cursor.json')
+        self.dead_letter_file = os.path.join(directory, DEAD_LETTER_FILE)
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._has_writes = threading.Condition(self._lock)
+        self._synced = threading.Condition(self._lock)
+        self._write_seq = 0
+        self._sync_seq = 0
+        self._flusher = None
+
+        self._segments = self._list_segments()
+        if not self._segments:
+            self._segments = [1]
+        self._cursor = self._load_cursor()
+        self._file = open(self._segment_path(self._segments[-1]), 'ab')
+
+        # Hashes of records this process appended that are still waiting, for append-time
+        # deduplication; records left by an earlier process carry timestamps no new request reuses
+        self._pending_hashes: Dict[str, int] = {}
+        self.depth = _count_records(directory, self._segments, self._cursor)
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, _segment_name(seq))
+
+    def _list_segments(self) -> List[int]:
+        return _list_segments(self.directory)
+
+    def _load_cursor(self) -> Tuple[int, int]:
+        return _read_cursor(self.cursor_file) or (self._segments[0], 0)
+
+    def _save_cursor(self) -> None:
+        temp_file = self.cursor_file + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'segment': self._cursor[0], 'offset': self._cursor[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.cursor_file)
+
+    def _iter_records(self, start: Tuple[int, int], limit: Optional[int] = None, segments: Optional[List[int]] = None):
+        """
+        Read complete records from `start` onwards
+
+        Returns:
+            Tuple of (records, position just after the last record returned)
+        """
+        records = []
+        position = start
+        for seq in segments if segments is not None else self._segments:
+            if seq < start[0]:
+                continue
+            offset = start[1] if seq == start[0] else 0
+            try:
+                with open(self._segment_path(seq), 'rb') as f:
+                    f.seek(offset)
+                    for line in f:
+                        # A line without a newline is a write that hasn't finished (or was torn by a crash)
+                        if not line.endswith(b'\n'):
+                            break
+                        offset += len(line)
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            logger.warning(f"Skipping corrupt spool record in {_segment_name(seq)}")
+                            continue
+                        position = (seq, offset)
+                        if limit and len(records) >= limit:
+                            return records, position
+            except FileNotFoundError:
+                continue
+            position = (seq, offset)
+        return records, position
+
+    def _rotate(self) -> None:
+        """Start a new segment; the old one is fsynced first so nothing waits on a closed file"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._sync_seq = self._write_seq
+        self._synced.notify_all()
+
+        self._segments.append(self._segments[-1] + 1)
+        self._file = open(self._segment_path(self._segments[-1]), 'ab')
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                while self._write_seq == self._sync_seq:
+                    self._has_writes.wait()
+            # Let concurrent appends pile up so one fsync covers all of them
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                target = self._write_seq
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._sync_seq = target
+                self._synced.notify_all()
+
+    def append(self, data: Any, date: str, data_hash: Optional[str] = None) -> bool:
+        """
+        Durably append one record
+
+        Args:
+            data: Payload to store later
+            date: Timestamp the record will be inserted with
+            data_hash: record_hash(data, date), if already computed
+
+        Returns:
+            False if the same record is already waiting in the spool (nothing is written)
+        """
+        data_hash = data_hash or record_hash(data, date)
+        with self._lock:
+            if data_hash in self._pending_hashes:
+                return False
+            self._write([{'hash': data_hash, 'date': date, 'data': data}])
+        return True
+
+    def defer(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Durably append copies of records returned by read_batch() to the end of the spool
+
+        commit() then drops the originals, so the records are replayed once the rest have been.
+        """
+        with self._lock:
+            self._write(records)
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        """Append records and wait until they are fsynced; called with the lock held"""
+        for record in records:
+            line = (json.dumps({'hash': record['hash'], 'date': record['date'], 'data': record['data']},
+                               separators=(',', ':')) + '\n').encode()
+            if self._file.tell() and self._file.tell() + len(line) > self.segment_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._pending_hashes[record['hash']] = self._pending_hashes.get(record['hash'], 0) + 1
+            self.depth += 1
+        self._write_seq += 1
+        ticket = self._write_seq
+
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='spool-fsync', daemon=True)
+            self._flusher.start()
+        self._has_writes.notify()
+        while self._sync_seq < ticket:
+            self._synced.wait()
+
+    def read_batch(self, max_records: int):
+        """
+        Oldest records not yet replayed, in append order
+
+        Returns:
+            Tuple of (records, position to pass to commit())
+        """
+        with self._lock:
+            self._file.flush()
+            cursor = self._cursor
+            segments = list(self._segments)
+        # Reading doesn't need the lock: segments are append-only and only commit() deletes them
+        return self._iter_records(cursor, limit=max_records, segments=segments)
+
+    def commit(self, records: List[Dict[str, Any]], position: Tuple[int, int]) -> None:
+        """Mark records returned by read_batch() as replayed and drop fully replayed segments"""
+        with self._lock:
+            self._cursor = position
+            self._save_cursor()
+            for record in records:
+                count = self._pending_hashes.get(record['hash'], 0) - 1
+                if count > 0:
+                    self._pending_hashes[record['hash']] = count
+                else:
+                    self._pending_hashes.pop(record['hash'], None)
+            self.depth = max(0, self.depth - len(records))
+
+            active = self._segments[-1]
+            for seq in [seq for seq in self._segments if seq < position[0] and seq != active]:
+                try:
+                    os.remove(self._segment_path(seq))
+                except FileNotFoundError:
+                    pass
+                self._segments.remove(seq)
+
+    def dead_letter(self, records: List[Dict[str, Any]], error: str) -> None:
+        """Durably copy records the database rejected to the dead-letter file; commit() then drops them"""
+        lines = b''.join(
+            (json.dumps({'hash': record['hash'], 'date': record['date'], 'data': record['data'], 'error': error},
+                        separators=(',', ':')) + '\n').encode()
+            for record in records
+        )
+        with open(self.dead_letter_file, 'ab') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'depth': self.depth,
+                'segments': len(self._segments),
+                'directory': self.directory
+            }
+
+
+class SpoolSlot:
+    """Exclusive claim on one slot directory under the spool root, held with an OS file lock"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.directory = None
+        self._lock_file = None
+
+    def try_claim(self, directory: str) -> bool:
+        os.makedirs(directory, exist_ok=True)
+        lock_file = open(os.path.join(directory, '.lock'), 'a+')
+        try:
+            try:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:
+                import msvcrt
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self.directory = directory
+        self._lock_file = lock_file
+        return True
+
+    def claim(self) -> str:
+        """Claim the lowest free slot; raises RuntimeError if all are taken"""
+        for index in range(MAX_SLOTS):
+            if self.try_claim(os.path.join(self.root, f"slot-{index}")):
+                return self.directory
+        raise RuntimeError(f"No free spool slot under {self.root}")
+
+    def release(self) -> None:
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class SpoolReplayer:
+    """
+    Background thread draining a spool into the database in order
+
+    Args:
+        spool: Spool to drain
+        insert_batch: Callable inserting a list of {'date', 'data'} records; raises on failure
+        batch_size: Records per insert
+        skip: Callable returning True for a record hash that is already stored
+        defer: Callable returning True for a record hash whose fate isn't known yet; the
+            record is moved to the back of the spool instead of holding up the replay
+        is_transient: Callable telling a temporary failure (database down or slow) from a rejected record
+        max_attempts: Times a record is rejected before it moves to the dead-letter file
+        idle_interval: Seconds between checks when the spool is empty
+        max_backoff: Upper bound in seconds for the retry delay while the database is down
+
+    A rejected batch is retried one record at a time, so only the records the database
+    keeps rejecting are dead-lettered. `failing` is True while the last attempt failed
+    for a temporary reason; the API spools new records only then.
+    """
+
+    def __init__(self, spool: IngestSpool, insert_batch: Callable[[List[Dict[str, Any]]], None],
+                 batch_size: int = 50, skip: Optional[Callable[[str], bool]] = None,
+                 defer: Optional[Callable[[str], bool]] = None,
+                 is_transient: Optional[Callable[[Exception], bool]] = None, max_attempts: int = 5,
+                 idle_interval: float = 5.0, max_backoff: float = 60.0):
+        self.spool = spool
+        self.insert_batch = insert_batch
+        self.batch_size = batch_size
+        self.skip = skip or (lambda data_hash: False)
+        self.defer = defer or (lambda data_hash: False)
+        self.is_transient = is_transient or (lambda error: True)
+        self.max_attempts = max_attempts
+        self.idle_interval = idle_interval
+        self.max_backoff = max_backoff
+        self.replayed = 0
+        self.skipped = 0
+        self.dead_lettered = 0
+        self.deferred = 0
+        self.failing = False
+        self.last_error: Optional[str] = None
+        # Records left to replay one at a time after a rejected batch, and rejections of the head record
+        self._isolate = 0
+        self._rejections = 0
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='spool-replayer', daemon=True)
+            self._thread.start()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def drain_once(self) -> int:
+        """
+        Replay one batch; returns how many records left the spool (deferred records don't count)
+
+        Raises:
+            Exception: The insert failure, unless the record was dead-lettered instead
+        """
+        records, position = self.spool.read_batch(1 if self._isolate else self.batch_size)
+        if not records:
+            self._isolate = 0
+            return 0
+
+        deferred, pending = [], []
+        for record in records:
+            if self.defer(record['hash']):
+                deferred.append(record)
+            elif not self.skip(record['hash']):
+                pending.append(record)
+        try:
+            if pending:
+                self.insert_batch([{'date': record['date'], 'data': record['data']} for record in pending])
+        except Exception as e:
+            if self.is_transient(e):
+                raise
+            if len(records) > 1:
+                # Find the rejected record(s) without holding back the rest of the batch
+                self._isolate = len(records)
+                raise
+            self._rejections += 1
+            if self._rejections < self.max_attempts:
+                raise
+            logger.error(f"Dead-lettering spooled record after {self._rejections} rejections: {str(e)}")
+            self.spool.dead_letter(records, str(e))
+            self.dead_lettered += 1
+            pending = []
+        if deferred:
+            self.spool.defer(deferred)
+        self.spool.commit(records, position)
+        self._rejections = 0
+        self._isolate = max(0, self._isolate - len(records))
+        self.replayed += len(pending)
+        self.skipped += len(records) - len(pending) - len(deferred)
+        self.deferred += len(deferred)
+        return len(records) - len(deferred)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            if not self.spool.depth:
+                self.failing = False
+                self._wake.wait(self.idle_interval)
+                self._wake.clear()
+                continue
+            try:
+                drained = self.drain_once()
+                if drained:
+                    logger.info(f"Replayed {drained} spooled records ({self.spool.depth} left)")
+                else:
+                    # Only deferred records are left; give them time before reading them again
+                    self._wake.wait(self.idle_interval)
+                    self._wake.clear()
+                backoff = 1.0
+                self.failing = False
+                self.last_error = None
+            except Exception as e:
+                self.failing = self.is_transient(e)
+                self.last_error = str(e)
+                logger.warning(f"Spool replay failed, retrying in {backoff:.0f}s: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+    def status(self) -> Dict[str, Any]:
+        status = self.spool.status()
+        status.update({
+            'replayed': self.replayed,
+            'duplicates_skipped': self.skipped,
+            'dead_lettered': self.dead_lettered,
+            'deferred': self.deferred,
+            'database_failing': self.failing,
+            'last_error': self.last_error
+        })
+        return status
+
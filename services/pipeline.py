@@ -0,0 +1,236 @@
+"""
+Dependency-driven stage executor
+Stages declare the values they need and the values they produce; a stage
+starts on its own thread as soon as its inputs exist, so stages that don't
+depend on each other run concurrently. A stage that raises or overruns its
+timeout fails alone: only the stages that need its outputs are skipped.
+"""
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.tracing import propagate, span
+
+OK = 'ok'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+SKIPPED = 'skipped'
+
+
+class StageError(Exception):
+    """Raised by a stage to fail it with a message and no traceback"""
+
+
+class Stage:
+    """
+    One step of a pipeline
+
+    Args:
+        name: Stage name, used in results and span names
+        func: Called with the inputs as keyword arguments; returns a dict holding some
+            or all of `outputs` (a missing output skips the stages that need it)
+        inputs: Names of the values the stage needs
+        outputs: Names of the values the stage may produce
+        timeout: Seconds before the stage counts as failed (None for no limit)
+    """
+
+    def __init__(self, name: str, func: Callable[..., Optional[Dict[str, Any]]], inputs: Iterable[str] = (),
+                 outputs: Iterable[str] = (), timeout: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.timeout = timeout
+
+
+class StageResult:
+    def __init__(self, status: str, duration: float = 0.0, error: Optional[str] = None):
+        self.status = status
+        self.duration = duration
+        self.error = error
+
+
+class PipelineResult:
+    """Values produced by a run and the outcome of every stage"""
+
+    def __init__(self, values: Dict[str, Any], stages: Dict[str, StageResult], duration: float):
+        self.values = values
+        self.stages = stages
+        self.duration = duration
+
+    @property
+    def ok(self) -> bool:
+        """True unless a stage failed or timed out (skipped stages are fine)"""
+        return all(result.status in (OK, SKIPPED) for result in self.stages.values())
+
+    def failed(self) -> List[str]:
+        return [name for name, result in self.stages.items() if result.status in (FAILED, TIMEOUT)]
+
+    def print_summary(self) -> None:
+        print(f"\n🧩 PIPELINE ({self.duration:.2f}s wall clock)")
+        print(f"{'Stage':<16}{'Status':<10}{'Duration':>10}  Detail")
+        print("-" * 70)
+        for name, result in self.stages.items():
+            print(f"{name:<16}{result.status:<10}{result.duration * 1000:>8.0f}ms  {result.error or ''}")
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, concurrently where the dependencies allow
+
+    The graph is checked when the pipeline is built: stage names must be unique, every
+    input must be produced by a stage or listed in `given`, and no stage may depend on
+    its own outputs, directly or through other stages.
+
+    Each stage runs on its own daemon thread, at most `max_workers` at a time. A
+    timed-out stage's thread can't be stopped; it is abandoned (its outputs, if it
+    ever returns, are ignored), no longer counts against `max_workers`, and doesn't
+    keep the interpreter from exiting. In a long-lived process a stage that hangs
+    for good keeps its thread, so stage code should still use its own I/O timeouts.
+
+    Args:
+        stages: Stages in any order; each output must have exactly one producer
+        max_workers: Stages running at once
+        given: Names of the values run() is called with
+
+    Raises:
+        ValueError: If two stages share a name or an output, an input has no source,
+            or the stages form a cycle
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: int = 4, given: Iterable[str] = ()):
+        self.stages = stages
+        self.max_workers = max(1, max_workers)
+        self.given = tuple(given)
+        self.producers: Dict[str, Stage] = {}
+        names = set()
+        for stage in stages:
+            if stage.name in names:
+                raise ValueError(f"Two stages are named {stage.name}")
+            names.add(stage.name)
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"'{output}' is produced by both {self.producers[output].name} and {stage.name}")
+                self.producers[output] = stage
+        for stage in stages:
+            missing = [name for name in stage.inputs if name not in self.producers and name not in self.given]
+            if missing:
+                raise ValueError(f"Stage {stage.name} needs {', '.join(missing)}, which nothing produces")
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        """Raise ValueError naming a dependency cycle, if there is one"""
+        visiting, done = [], set()
+
+        def visit(stage: Stage) -> None:
+            if stage.name in done:
+                return
+            if stage.name in visiting:
+                cycle = visiting[visiting.index(stage.name):] + [stage.name]
+                raise ValueError(f"Stages depend on each other in a cycle: {' -> '.join(cycle)}")
+            visiting.append(stage.name)
+            for name in stage.inputs:
+                if name in self.producers:
+                    visit(self.producers[name])
+            visiting.pop()
+            done.add(stage.name)
+
+        for stage in self.stages:
+            visit(stage)
+
+    def run(self, values: Optional[Dict[str, Any]] = None) -> PipelineResult:
+        """
+        Run every stage whose inputs can be met
+
+        Args:
+            values: Values available before any stage runs (those named in `given`)
+
+        Raises:
+            ValueError: If a value named in `given` is missing
+        """
+        values = dict(values or {})
+        missing = [name for name in self.given if name not in values and name not in self.producers]
+        if missing:
+            raise ValueError(f"Pipeline run is missing {', '.join(missing)}")
+
+        results: Dict[str, StageResult] = {}
+        pending = list(self.stages)
+        running: Dict[str, Stage] = {}
+        stage_started: Dict[str, float] = {}
+        finished = queue.Queue()
+        started = time.monotonic()
+        while pending or running:
+            for stage in list(pending):
+                if all(name in values for name in stage.inputs):
+                    if len(running) >= self.max_workers:
+                        continue
+                    pending.remove(stage)
+                    running[stage.name] = stage
+                    stage_started[stage.name] = time.monotonic()
+                    inputs = {name: values[name] for name in stage.inputs}
+                    # Stage spans opened on the stage thread nest under the caller's span
+                    threading.Thread(target=propagate(self._call), args=(stage, inputs, finished),
+                                     name=f"pipeline-{stage.name}", daemon=True).start()
+                elif any(self._unavailable(name, values, results) for name in stage.inputs):
+                    pending.remove(stage)
+                    results[stage.name] = StageResult(SKIPPED, error='needs ' + ', '.join(
+                        name for name in stage.inputs if name not in values))
+            if not running:
+                if pending:
+                    # Can't happen with a checked graph; fail loudly rather than spin
+                    raise RuntimeError(f"Stages {', '.join(stage.name for stage in pending)} can never start")
+                break
+
+            now = time.monotonic()
+            deadlines = [stage_started[name] + stage.timeout - now for name, stage in running.items()
+                         if stage.timeout is not None]
+            try:
+                outcomes = [finished.get(timeout=max(0.0, min(deadlines)) if deadlines else None)]
+            except queue.Empty:
+                outcomes = []
+            while not finished.empty():
+                outcomes.append(finished.get_nowait())
+
+            for name, produced, error in outcomes:
+                # An abandoned (timed-out) stage that returned after all
+                stage = running.pop(name, None)
+                if stage is None:
+                    continue
+                duration = time.monotonic() - stage_started[name]
+                if isinstance(error, StageError):
+                    results[name] = StageResult(FAILED, duration, str(error))
+                    print(f"\n❌ Stage {name} failed: {error}")
+                elif error is not None:
+                    results[name] = StageResult(FAILED, duration, f"{type(error).__name__}: {error}")
+                    print(f"\n❌ Stage {name} failed: {error}")
+                    traceback.print_exception(error)
+                else:
+                    values.update((key, value) for key, value in (produced or {}).items() if key in stage.outputs)
+                    results[name] = StageResult(OK, duration)
+
+            now = time.monotonic()
+            for name, stage in list(running.items()):
+                if stage.timeout is not None and now - stage_started[name] >= stage.timeout:
+                    del running[name]
+                    results[name] = StageResult(TIMEOUT, now - stage_started[name],
+                                                f"no result after {stage.timeout:g}s")
+                    print(f"\n⏰ Stage {name} timed out after {stage.timeout:g}s")
+
+        ordered = {stage.name: results[stage.name] for stage in self.stages}
+        return PipelineResult(values, ordered, time.monotonic() - started)
+
+    def _unavailable(self, name: str, values: Dict[str, Any], results: Dict[str, StageResult]) -> bool:
+        # The producer finished (or was skipped) without producing it
+        return name not in values and self.producers[name].name in results
+
+    @staticmethod
+    def _call(stage: Stage, inputs: Dict[str, Any], finished: queue.Queue) -> None:
+        try:
+            with span(f"stage.{stage.name}"):
+                produced = stage.func(**inputs)
+        except Exception as e:
+            finished.put((stage.name, None, e))
+            return
+        finished.put((stage.name, produced, None))
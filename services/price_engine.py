@@ -0,0 +1,298 @@
+"""
+Hedged multi-exchange price engine for the Gary wealth collector
+Queries the fastest configured ccxt exchanges for a market concurrently (the
+next ranked exchange replaces one that doesn't list the market or fails) and
+returns either the first valid quote inside a latency budget or the median of
+the quotes that arrive before the deadline
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional
+
+import ccxt
+
+from services.tracing import propagate, span, tracer
+
+DEFAULT_EXCHANGES = ['binance', 'kraken', 'kucoin']
+
+# Pending exchanges are abandoned once a quote has been decided; a ccxt call that is
+# already in flight cannot be interrupted, so the per-request timeout bounds how long
+# it can keep a worker thread busy
+REQUEST_TIMEOUT_MS = 10000
+
+# How often a race re-checks whether its first request has left the pool queue
+QUEUE_POLL_INTERVAL = 0.05
+
+
+def record_rest_response(code, reason, url, method, headers, body, request_headers, request_body):
+    """ccxt response hook adding the response size and status to the span that made the request"""
+    current = tracer.current()
+    current.add('response.bytes', len(body or ''))
+    current.set('http.status_code', code)
+    return body
+
+
+class ExchangeStats:
+    """Rolling latency and error-rate statistics for a single exchange"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+        self.error_rate = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: Optional[float], ok: bool) -> None:
+        """Fold one request outcome into the moving averages (latency None: the ticker was never requested)"""
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.errors += 1
+            if latency is None:
+                pass
+            elif self.latency is None:
+                self.latency = latency
+            else:
+                self.latency = self.alpha * latency + (1 - self.alpha) * self.latency
+            self.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.error_rate
+
+    @property
+    def score(self) -> float:
+        """Lower is better; exchanges without history are tried first"""
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + 4 * self.error_rate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'latency': self.latency,
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.error_rate
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], alpha: float = 0.3) -> 'ExchangeStats':
+        stats = cls(alpha)
+        stats.latency = data.get('latency')
+        stats.requests = data.get('requests', 0)
+        stats.errors = data.get('errors', 0)
+        stats.error_rate = data.get('error_rate', 0.0)
+        return stats
+
+
+class PriceEngine:
+    """
+    Races a market across several exchanges and aggregates the answers
+
+    Modes:
+        first:  return the first valid quote if it arrives within the latency budget;
+                otherwise return the median of the quotes received by the deadline
+        median: return the median of the quotes received once every exchange has
+                answered, or once the latency budget has passed with at least one
+                quote, or at the deadline
+
+    max_fanout caps the exchanges queried per market (None or 0: all of them); the
+    deadline and latency budget count from when a market's first request starts running.
+    """
+
+    def __init__(self, exchange_ids: Optional[List[str]] = None, mode: str = 'median',
+                 latency_budget: float = 1.5, deadline: float = 5.0,
+                 max_fanout: Optional[int] = None, max_workers: int = 16,
+                 stats_file: Optional[str] = None):
+        if mode not in ('first', 'median'):
+            raise ValueError(f"Unknown price engine mode: {mode}")
+
+        self.exchange_ids = exchange_ids or list(DEFAULT_EXCHANGES)
+        self.mode = mode
+        self.latency_budget = latency_budget
+        self.deadline = deadline
+        self.max_fanout = max_fanout
+        self.stats_file = stats_file
+
+        self.stats: Dict[str, ExchangeStats] = {ex_id: ExchangeStats() for ex_id in self.exchange_ids}
+        self._load_stats()
+
+        self._exchanges: Dict[str, Any] = {}
+        self._market_locks = {ex_id: threading.Lock() for ex_id in self.exchange_ids}
+        self._request_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='price-request')
+        self._symbol_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='price-symbol')
+
+    def _get_exchange(self, ex_id: str):
+        """Create ccxt exchange objects once and keep them (and their loaded markets) warm"""
+        exchange = self._exchanges.get(ex_id)
+        if exchange is None:
+            exchange = getattr(ccxt, ex_id)({'timeout': REQUEST_TIMEOUT_MS, 'enableRateLimit': True})
+            exchange.on_rest_response = record_rest_response
+            self._exchanges[ex_id] = exchange
+        return exchange
+
+    def _lists_market(self, ex_id: str, market_symbol: str) -> bool:
+        """Check whether an exchange lists a market, loading its markets at most once"""
+        exchange = self._get_exchange(ex_id)
+        if not exchange.markets:
+            with self._market_locks[ex_id]:
+                if not exchange.markets:
+                    with span('exchange.load_markets', 'client', exchange=ex_id):
+                        exchange.load_markets()
+        return market_symbol in exchange.markets
+
+    def ranked_exchanges(self) -> List[str]:
+        """Exchanges ordered by observed speed and reliability, fastest first"""
+        return sorted(self.exchange_ids, key=lambda ex_id: self.stats[ex_id].score)
+
+    def _fetch_one(self, ex_id: str, market_symbol: str) -> Optional[float]:
+        """Fetch the last price of a market from one exchange and record its latency"""
+        started = None
+        with span('exchange.ticker', 'client', exchange=ex_id, market=market_symbol) as ticker_span:
+            try:
+                if not self._lists_market(ex_id, market_symbol):
+                    ticker_span.set('listed', False)
+                    return None
+                # Only the ticker request counts toward the latency stat, not a first load_markets()
+                started = time.monotonic()
+                ticker = self._get_exchange(ex_id).fetch_ticker(market_symbol)
+                price = ticker.get('last') if ticker else None
+                ok = price is not None and price > 0
+                self.stats[ex_id].record(time.monotonic() - started, ok)
+                if not ok:
+                    ticker_span.fail('no valid price')
+                return price if ok else None
+            except Exception as e:
+                self.stats[ex_id].record(None if started is None else time.monotonic() - started, False)
+                ticker_span.fail(f"{type(e).__name__}: {e}")
+                print(f"Error fetching {market_symbol} from {ex_id}: {e}")
+                return None
+
+    def fetch_quote(self, market_symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        Race one market across the ranked exchanges
+
+        Returns:
+            Dictionary with the aggregated price, the method used and the per-exchange
+            quotes, or None if no exchange produced a valid price before the deadline
+        """
+        with span('price.quote', market=market_symbol) as quote_span:
+            quote = self._race(market_symbol)
+            if quote is None:
+                quote_span.fail('no quote before the deadline')
+            else:
+                quote_span.set('method', quote['method'])
+            return quote
+
+    def _fetch_timed(self, ex_id: str, market_symbol: str, race_started: List[float]) -> Optional[float]:
+        # The race's clock starts when its first request leaves the pool queue, so races
+        # queued behind other symbols (or behind abandoned requests) keep their full deadline
+        if not race_started:
+            race_started.append(time.monotonic())
+        return self._fetch_one(ex_id, market_symbol)
+
+    def _race(self, market_symbol: str) -> Optional[Dict[str, Any]]:
+        fetch_one = propagate(self._fetch_timed)
+        candidates = self.ranked_exchanges()
+        fanout = self.max_fanout or len(candidates)
+        race_started: List[float] = []
+        futures = {}
+        pending = set()
+        quotes: Dict[str, float] = {}
+        within_budget = True
+
+        while True:
+            # Keep up to `fanout` exchanges that may still produce a quote in flight; one that
+            # doesn't list the market or fails is replaced by the next ranked exchange
+            while candidates and len(pending) + len(quotes) < fanout:
+                ex_id = candidates.pop(0)
+                future = self._request_pool.submit(fetch_one, ex_id, market_symbol, race_started)
+                futures[future] = ex_id
+                pending.add(future)
+            if not pending:
+                break
+
+            if not race_started:
+                # Every request is still queued in the pool; the deadline hasn't started
+                timeout = QUEUE_POLL_INTERVAL
+            else:
+                elapsed = time.monotonic() - race_started[0]
+                timeout = self.deadline - elapsed
+                if timeout <= 0:
+                    break
+                # Wake up at the end of the latency budget even if nothing finished
+                budget_left = self.latency_budget - elapsed
+                if budget_left > 0:
+                    timeout = min(timeout, budget_left)
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                price = future.result()
+                if price is not None:
+                    quotes[futures[future]] = price
+
+            within_budget = not race_started or time.monotonic() - race_started[0] <= self.latency_budget
+            if quotes and self.mode == 'first' and within_budget:
+                break
+            if quotes and self.mode == 'median' and not within_budget:
+                break
+
+        # Abandon slower exchanges; requests that have not started yet are dropped
+        for future in pending:
+            future.cancel()
+
+        if not quotes:
+            return None
+
+        if self.mode == 'first' and within_budget:
+            ex_id, price = next(iter(quotes.items()))
+            return {'price': price, 'method': f"first ({ex_id})", 'quotes': quotes}
+
+        return {
+            'price': statistics.median(quotes.values()),
+            'method': f"median of {len(quotes)}",
+            'quotes': quotes
+        }
+
+    def fetch_quotes(self, market_symbols: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Race several markets at once; each market is raced independently"""
+        fetch_quote = propagate(self.fetch_quote)
+        futures = {
+            market_symbol: self._symbol_pool.submit(fetch_quote, market_symbol)
+            for market_symbol in market_symbols
+        }
+        return {market_symbol: future.result() for market_symbol, future in futures.items()}
+
+    def print_stats(self) -> None:
+        """Print the per-exchange latency and error-rate table"""
+        print("\nExchange\tLatency\tError rate\tRequests")
+        print("-" * 50)
+        for ex_id in self.ranked_exchanges():
+            stats = self.stats[ex_id]
+            latency = f"{stats.latency * 1000:.0f}ms" if stats.latency is not None else "n/a"
+            print(f"{ex_id}\t\t{latency}\t{stats.error_rate:.0%}\t\t{stats.requests}")
+
+    def _load_stats(self) -> None:
+        """Restore exchange statistics from a previous run so ranking survives restarts"""
+        if not self.stats_file or not os.path.exists(self.stats_file):
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            for ex_id, data in saved.items():
+                if ex_id in self.stats:
+                    self.stats[ex_id] = ExchangeStats.from_dict(data)
+        except (OSError, ValueError) as e:
+            print(f"Could not load exchange stats from {self.stats_file}: {e}")
+
+    def save_stats(self) -> None:
+        """Persist exchange statistics for the next run"""
+        if not self.stats_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.stats_file) or '.', exist_ok=True)
+            with open(self.stats_file, 'w', encoding='utf-8') as f:
+                json.dump({ex_id: stats.to_dict() for ex_id, stats in self.stats.items()}, f, indent=2)
+        except OSError as e:
+            print(f"Could not save exchange stats to {self.stats_file}: {e}")
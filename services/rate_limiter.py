@@ -0,0 +1,230 @@
+"""
+Per-client token-bucket rate limiting for the Flask app
+Buckets live in a small SQLite file so every gunicorn worker on the host
+draws from the same bucket; no Redis or other external store is needed.
+Limits are configured per route (RATE_LIMITS), clients are identified by a
+validated API key or their IP address, and a request over its limit gets a
+429 with Retry-After.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Flask, jsonify, request
+
+from config.settings import config
+from services.api_keys import validated_key_digest
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Takes between sweeps of buckets idle long enough to have refilled
+PRUNE_EVERY = 1000
+
+
+class RateLimit:
+    """
+    `count` requests per `period` seconds, with bursts of up to `burst` requests
+
+    Parsed from '60/minute' or '60/minute:10' (burst 10; defaults to the count).
+    """
+
+    def __init__(self, count: int, period: float, burst: Optional[int] = None):
+        if count <= 0 or period <= 0:
+            raise ValueError("Rate limits need a positive count and period")
+        self.count = count
+        self.period = period
+        self.burst = burst or count
+        self.rate = count / period
+
+    @classmethod
+    def parse(cls, spec: str) -> 'RateLimit':
+        spec = spec.strip()
+        rate, _, burst = spec.partition(':')
+        count, _, period = rate.partition('/')
+        period = period.strip().rstrip('s') or 'second'
+        if period not in PERIODS:
+            raise ValueError(f"Unknown rate limit period in '{spec}' (use {', '.join(PERIODS)})")
+        return cls(int(count), PERIODS[period], int(burst) if burst else None)
+
+    def __str__(self) -> str:
+        return f"{self.count}/{self.period:g}s (burst {self.burst})"
+
+
+def parse_limits(value: Any) -> Dict[str, RateLimit]:
+    """
+    Route limits from a mapping or a 'ROUTE=LIMIT;ROUTE=LIMIT' string
+
+    Routes are 'METHOD /path', '/path' (any method) or '*' (every other route).
+    """
+    if not value:
+        return {}
+    if isinstance(value, str):
+        value = dict(item.split('=', 1) for item in value.split(';') if item.strip())
+    return {' '.join(route.split()): RateLimit.parse(str(spec)) for route, spec in value.items()}
+
+
+class TokenBucketStore:
+    """
+    Token buckets in a SQLite file shared by every process on the host
+
+    Each take() is one short IMMEDIATE transaction, so concurrent workers
+    serialize on the file lock instead of double-spending tokens.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._takes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # A connection must not cross fork; each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('pragma journal_mode=wal')
+            conn.execute('pragma synchronous=off')  # Losing buckets in a crash only resets limits
+            conn.execute('create table if not exists buckets (key text primary key, tokens real not null, updated real not null)')
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def take(self, key: str, limit: RateLimit, now: Optional[float] = None) -> Tuple[bool, float, float]:
+        """
+        Take one token from `key`'s bucket
+
+        Returns:
+            Tuple of (allowed, seconds until a token is available, tokens left)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self._connect()
+            conn.execute('begin immediate')
+            try:
+                row = conn.execute('select tokens, updated from buckets where key = ?', (key,)).fetchone()
+                tokens = limit.burst if row is None else min(limit.burst, row[0] + max(0.0, now - row[1]) * limit.rate)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                conn.execute('insert or replace into buckets (key, tokens, updated) values (?, ?, ?)', (key, tokens, now))
+                self._takes += 1
+                if self._takes % PRUNE_EVERY == 0:
+                    self._prune(conn, now)
+                conn.execute('commit')
+            except Exception:
+                conn.execute('rollback')
+                raise
+        retry_after = 0.0 if allowed else (1 - tokens) / limit.rate
+        return allowed, retry_after, tokens
+
+    @staticmethod
+    def _prune(conn: sqlite3.Connection, now: float) -> None:
+        # A day without requests refills any bucket with a period of up to a day
+        conn.execute('delete from buckets where updated < ?', (now - PERIODS['day'],))
+
+
+def client_ip(proxy_hops: int = 1) -> str:
+    """
+    Address of the caller as seen by the outermost proxy we run behind
+
+    Each proxy appends the address it received the request from, so the entry
+    `proxy_hops` from the right was written by our own front end; anything to the
+    left of it came from the client and can be forged.
+    """
+    forwarded = [entry.strip() for entry in request.headers.get('X-Forwarded-For', '').split(',') if entry.strip()]
+    if proxy_hops > 0 and len(forwarded) >= proxy_hops:
+        return forwarded[-proxy_hops]
+    return request.remote_addr or 'unknown'
+
+
+def client_key(proxy_hops: int = 1) -> str:
+    """
+    Identify the caller: a validated API key (by digest, never the key itself), else the client IP
+
+    Unknown keys and free-form client headers are ignored, so a caller can't get a
+    fresh bucket by changing a header.
+    """
+    digest = validated_key_digest()
+    if digest:
+        return 'key:' + digest[:32]
+    return 'ip:' + client_ip(proxy_hops)
+
+
+class RateLimiter:
+    """
+    Flask before_request hook applying per-route limits per client
+
+    Args:
+        store: Shared token bucket store
+        limits: Route -> limit, see parse_limits()
+        proxy_hops: Proxies in front of the app that append to X-Forwarded-For
+    """
+
+    def __init__(self, store: TokenBucketStore, limits: Dict[str, RateLimit], proxy_hops: int = 1):
+        self.store = store
+        self.limits = limits
+        self.proxy_hops = proxy_hops
+        self.rejected = 0
+
+    def limit_for(self, method: str, path: str) -> Tuple[Optional[str], Optional[RateLimit]]:
+        for route in (f"{method} {path}", path, '*'):
+            if route in self.limits:
+                return route, self.limits[route]
+        return None, None
+
+    def check(self):
+        route, limit = self.limit_for(request.method, request.path)
+        if limit is None:
+            return None
+        client = client_key(self.proxy_hops)
+        try:
+            allowed, retry_after, remaining = self.store.take(f"{route}|{client}", limit)
+        except sqlite3.Error as e:
+            # Never turn a store problem into an outage
+            logger.warning(f"Rate limit store unavailable, allowing request: {str(e)}")
+            return None
+        if allowed:
+            return None
+
+        self.rejected += 1
+        retry_seconds = max(1, math.ceil(retry_after))
+        logger.warning(f"Rate limited {client} on {route} (retry in {retry_seconds}s)")
+        response = jsonify({
+            'error': 'Too many requests',
+            'message': f"Limit for {route} is {limit.count} requests per {limit.period:g}s",
+            'retry_after': retry_seconds
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_seconds)
+        response.headers['X-RateLimit-Limit'] = str(limit.count)
+        response.headers['X-RateLimit-Remaining'] = str(int(remaining))
+        return response
+
+    def install(self, app: Flask) -> None:
+        app.before_request(self.check)
+
+
+def init_rate_limiter(app: Flask) -> Optional[RateLimiter]:
+    """
+    Install rate limiting on `app` when RATE_LIMIT_ENABLED is set
+
+    Returns:
+        The limiter, or None when disabled or no limits are configured
+    """
+    if not config.rate_limit_enabled:
+        return None
+    limits = parse_limits(config.rate_limits)
+    if not limits:
+        logger.warning("RATE_LIMIT_ENABLED is set but RATE_LIMITS is empty; not rate limiting")
+        return None
+
+    limiter = RateLimiter(TokenBucketStore(config.rate_limit_store), limits, config.rate_limit_proxy_hops)
+    limiter.install(app)
+    logger.info("Rate limits: " + ', '.join(f"{route} {limit}" for route, limit in limits.items()))
+    return limiter
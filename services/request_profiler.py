@@ -0,0 +1,325 @@
+"""
+Opt-in request profiling for the Flask app
+A request is profiled when it carries a valid signed X-Profile header or is
+picked by PROFILE_SAMPLE_RATE. It runs under cProfile (a .pstats file) or a
+statistical stack sampler (a speedscope .json file) and gets a Server-Timing
+header with the stage timings recorded by stage(). With PROFILE_ENABLED off no
+hooks are installed and stage() returns a shared no-op context.
+
+Mint a header value (valid for --ttl seconds) with:
+
+    python -m services.request_profiler --ttl 600
+"""
+import argparse
+import cProfile
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask, g, request
+
+from config.settings import config
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PREFIX = 'profile-'
+PROFILE_SUFFIXES = ('.pstats', '.speedscope.json')
+
+# Returned by stage() for requests that aren't being profiled
+NO_STAGE = nullcontext()
+
+# Set once the hooks are installed; lets stage() bail out without touching `g`
+_active = False
+
+
+def sign_token(secret: str, expires: int) -> str:
+    """Header value `<expires>.<hmac>` accepted until the Unix time `expires`"""
+    digest = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{digest}"
+
+
+def verify_token(secret: str, token: str, now: Optional[float] = None) -> bool:
+    expires, _, digest = token.partition('.')
+    if not secret or not expires.isdigit() or int(expires) < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(sign_token(secret, int(expires)), f"{expires}.{digest}")
+
+
+class StackSampler:
+    """
+    Statistical profiler: samples one thread's stack every `interval` seconds from a helper thread
+
+    Cheaper than cProfile on call-heavy code and shows wall time spent waiting on I/O.
+    Needs real threads, so it samples nothing useful under gevent workers.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.frames: List[Dict[str, Any]] = []
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+        self._started = None
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({'name': code.co_name, 'file': code.co_filename, 'line': code.co_firstlineno})
+        return index
+
+    def _run(self) -> None:
+        last = self._started
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            now = time.perf_counter()
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.samples.append(stack)
+                self.weights.append(now - last)
+            last = now
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'automation-service request profiler',
+            'shared': {'frames': self.frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(self.weights),
+                'samples': self.samples,
+                'weights': self.weights
+            }]
+        }
+
+
+class RequestProfile:
+    """Profiler and stage timings for one request"""
+
+    def __init__(self, mode: str, interval: float):
+        self.mode = mode
+        self.stages: List[Tuple[str, float]] = []
+        self.started = time.perf_counter()
+        if mode == 'sampler':
+            self.profiler = StackSampler(interval)
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self) -> float:
+        if self.mode == 'sampler':
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        return time.perf_counter() - self.started
+
+    def write(self, path_base: str, name: str) -> str:
+        if self.mode == 'sampler':
+            path = path_base + '.speedscope.json'
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.profiler.to_speedscope(name), f, separators=(',', ':'))
+        else:
+            path = path_base + '.pstats'
+            self.profiler.dump_stats(path)
+        return path
+
+
+class _Stage:
+    def __init__(self, stages: List[Tuple[str, float]], name: str):
+        self.stages = stages
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.stages.append((self.name, time.perf_counter() - self.started))
+
+
+def stage(name: str):
+    """
+    Time a block as a Server-Timing stage of the current request
+
+    A no-op unless the request is being profiled.
+    """
+    if not _active:
+        return NO_STAGE
+    profile = g.get('request_profile')
+    if profile is None:
+        return NO_STAGE
+    return _Stage(profile.stages, name)
+
+
+def server_timing(stages: List[Tuple[str, float]], total: float, overhead: Optional[float] = None) -> str:
+    entries = [f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)};dur={seconds * 1000:.2f}" for name, seconds in stages]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    if overhead is not None:
+        entries.append(f"profile-write;dur={overhead * 1000:.2f}")
+    return ', '.join(entries)
+
+
+class RequestProfiler:
+    """
+    Flask hooks profiling signed or sampled requests into `directory`
+
+    One request per process is profiled at a time (cProfile can't run twice at once);
+    others arriving meanwhile are served unprofiled.
+
+    Args:
+        directory: Output directory
+        secret: HMAC key for X-Profile header values; None disables header activation
+        sample_rate: Fraction of requests profiled without a header (0-1)
+        mode: 'cprofile' (.pstats) or 'sampler' (speedscope .json)
+        interval: Sampler interval in seconds
+        max_files: Profiles kept; the oldest are deleted
+    """
+
+    def __init__(self, directory: str, secret: Optional[str] = None, sample_rate: float = 0.0,
+                 mode: str = 'cprofile', interval: float = 0.001, max_files: int = 50):
+        if mode not in ('cprofile', 'sampler'):
+            raise ValueError(f"Unknown profiler mode '{mode}' (use cprofile or sampler)")
+        self.directory = directory
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self.max_files = max_files
+        self.profiled = 0
+        self._busy = threading.Lock()
+
+    def wanted(self) -> bool:
+        token = request.headers.get(PROFILE_HEADER)
+        if token:
+            if self.secret and verify_token(self.secret, token):
+                return True
+            logger.warning(f"Ignoring invalid or expired {PROFILE_HEADER} header")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> None:
+        if self.wanted() and self._busy.acquire(blocking=False):
+            g.request_profile = RequestProfile(self.mode, self.interval)
+
+    def finish(self, response):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return response
+        try:
+            total = profile.stop()
+            written = time.perf_counter()
+            name = self.write(profile, total)
+            response.headers['Server-Timing'] = server_timing(profile.stages, total, time.perf_counter() - written)
+            response.headers['X-Profile-File'] = name
+        except Exception as e:
+            logger.warning(f"Request profiling failed: {str(e)}")
+        finally:
+            self._busy.release()
+        return response
+
+    def abandon(self, error=None) -> None:
+        # after_request is skipped when the request dies; never keep the profiler running
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.stop()
+            self._busy.release()
+
+    def write(self, profile: RequestProfile, total: float) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        self.profiled += 1
+        # The sequence number keeps requests finishing in the same second apart
+        name = (f"{PROFILE_PREFIX}{datetime.now(timezone.utc):%Y%m%d-%H%M%S}-{os.getpid()}-{self.profiled}-"
+                f"{request.method}-{slug}-{total * 1000:.0f}ms")
+        path = profile.write(os.path.join(self.directory, name), f"{request.method} {request.path}")
+        self._prune()
+        return os.path.basename(path)
+
+    def _prune(self) -> None:
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.startswith(PROFILE_PREFIX) and name.endswith(PROFILE_SUFFIXES)]
+        files.sort(key=os.path.getmtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def install(self, app: Flask) -> None:
+        global _active
+        app.before_request(self.start)
+        app.after_request(self.finish)
+        app.teardown_request(self.abandon)
+        _active = True
+
+
+def init_profiler(app: Flask) -> Optional[RequestProfiler]:
+    """
+    Install request profiling on `app` when PROFILE_ENABLED is set
+
+    Returns:
+        The profiler, or None when disabled
+    """
+    if not config.profile_enabled:
+        return None
+    if not config.profile_secret and not config.profile_sample_rate:
+        logger.warning("PROFILE_ENABLED is set without PROFILE_SECRET or PROFILE_SAMPLE_RATE; nothing will be profiled")
+
+    profiler = RequestProfiler(
+        config.profile_dir,
+        secret=config.profile_secret,
+        sample_rate=config.profile_sample_rate,
+        mode=config.profile_mode,
+        interval=config.profile_interval_ms / 1000,
+        max_files=config.profile_max_files
+    )
+    profiler.install(app)
+    logger.info(f"Request profiling ({profiler.mode}) to {profiler.directory}: "
+                f"{'signed header, ' if profiler.secret else ''}{profiler.sample_rate:.2%} sampled")
+    return profiler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Print an {PROFILE_HEADER} header value signed with PROFILE_SECRET")
+    parser.add_argument('--ttl', type=int, default=600, help='Seconds the header stays valid (default: 600)')
+    args = parser.parse_args()
+    if not config.profile_secret:
+        print("❌ PROFILE_SECRET is not set")
+        sys.exit(1)
+    print(f"{PROFILE_HEADER}: {sign_token(config.profile_secret, int(time.time()) + args.ttl)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+In-process scheduler for long-running collector daemons
+Supports five-field cron expressions or fixed intervals with jitter, and a
+single-instance lock so overlapping runs (daemon or cron) are impossible
+"""
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class CronSchedule:
+    """
+    Five-field cron expression: minute hour day-of-month month day-of-week
+
+    Each field accepts `*`, numbers, ranges (`1-5`), steps (`*/15`, `0-30/10`)
+    and comma-separated lists. Day-of-week uses 0-6 with Sunday as 0 (7 is also Sunday).
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_str = part.split('/', 1)
+                step = int(step_str)
+                if step < 1:
+                    raise ValueError(f"Invalid cron step: '{field}'")
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_str, end_str = part.split('-', 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field out of range {low}-{high}: '{field}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7  # Python: Monday=0, cron: Sunday=0
+        day_ok = moment.day in self.days
+        weekday_ok = weekday in self.weekdays
+        # Standard cron: when both fields are restricted either one may match
+        if self.days_restricted and self.weekdays_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_run(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after` (local time)"""
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 4)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment
+        raise ValueError(f"Cron expression never fires: '{self.expression}'")
+
+    def runs_per_hour(self) -> float:
+        """Average firing rate over the next week, used to split hourly request budgets"""
+        moment = datetime.now()
+        end = moment + timedelta(days=7)
+        runs = 0
+        while True:
+            moment = self.next_run(moment)
+            if moment > end:
+                break
+            runs += 1
+        return max(runs / (7 * 24), 1 / (7 * 24))
+
+    def __str__(self) -> str:
+        return f"cron '{self.expression}'"
+
+
+class IntervalSchedule:
+    """Fixed interval in seconds with up to `jitter` seconds of random delay per run"""
+
+    def __init__(self, interval: float, jitter: float = 0):
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        self.interval = interval
+        self.jitter = jitter
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.interval + random.uniform(0, self.jitter))
+
+    def runs_per_hour(self) -> float:
+        return 3600 / self.interval
+
+    def __str__(self) -> str:
+        return f"every {self.interval:g}s (jitter {self.jitter:g}s)"
+
+
+class InstanceLock:
+    """
+    Exclusive, non-blocking lock on a file, released automatically if the process dies
+
+    Raises:
+        RuntimeError: If another process already holds the lock
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock_file = open(self.path, 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.seek(0)
+            holder = lock_file.read().strip() or 'unknown'
+            lock_file.close()
+            raise RuntimeError(f"Another collector instance is running (pid {holder}, lock {self.path})")
+
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+
+    def release(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'InstanceLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def run_scheduled(job: Callable[[], None], schedule, run_now: bool = False,
+                  stop_event: Optional[threading.Event] = None) -> None:
+    """
+    Call `job` on every schedule tick until SIGINT/SIGTERM (or `stop_event`) is received
+
+    A run that overlaps the next tick delays it instead of running concurrently.
+    """
+    stop_event = stop_event or threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"\nReceived signal {signum}, stopping after the current run")
+        stop_event.set()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+    print(f"⏰ Scheduler started: {schedule}")
+    next_run = datetime.now() if run_now else schedule.next_run(datetime.now())
+
+    while not stop_event.is_set():
+        delay = (next_run - datetime.now()).total_seconds()
+        if delay > 0:
+            print(f"Next run at {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+            if stop_event.wait(delay):
+                break
+
+        started = time.monotonic()
+        try:
+            job()
+        except Exception as e:
+            print(f"Scheduled run failed: {e}")
+            import traceback
+            traceback.print_exc()
+        print(f"Run finished in {time.monotonic() - started:.1f}s")
+
+        # Keep the cadence anchored to the planned time; skip ticks missed by a long run
+        next_run = schedule.next_run(next_run)
+        if next_run < datetime.now():
+            next_run = schedule.next_run(datetime.now())
+
+    print("⏰ Scheduler stopped")
@@ -0,0 +1,301 @@
+"""
+Lightweight span tracing for the collector
+Nested spans record duration, outcome and payload size; each run is exported
+as one OTLP/JSON ExportTraceServiceRequest per line (the format the
+OpenTelemetry collector's file exporter writes and its otlpjsonfile receiver
+reads), and the slowest spans are printed at the end of the run. Spans opened
+outside a traced run cost nothing.
+"""
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_PREFIX = 'traces-'
+TRACE_SUFFIX = '.ndjson'
+
+# OTLP enum values
+SPAN_KIND = {'internal': 1, 'client': 3}
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation; use through Tracer.span()"""
+
+    def __init__(self, tracer: 'Tracer', name: str, trace_id: str, parent: Optional['Span'],
+                 kind: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.kind = kind
+        self.attributes = attributes
+        self.outcome = 'ok'
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def add(self, key: str, amount: float) -> None:
+        """Accumulate a numeric attribute, e.g. bytes over several HTTP requests"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, error: str) -> None:
+        """Mark the span failed without raising (for errors that are handled and returned as None)"""
+        self.outcome = 'error'
+        self.error = error
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        self.tracer._finished(self)
+
+    @property
+    def payload_bytes(self) -> Optional[int]:
+        size = self.attributes.get('response.bytes', self.attributes.get('payload.bytes'))
+        return int(size) if size is not None else None
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': SPAN_KIND.get(self.kind, 1),
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [otlp_attribute(key, value) for key, value in self.attributes.items()],
+            'status': {'code': STATUS_ERROR, 'message': self.error or ''} if self.outcome == 'error'
+            else {'code': STATUS_OK}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Stand-in yielded when no traced run is active"""
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount):
+        pass
+
+    def fail(self, error):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}  # int64 is a string in OTLP/JSON
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+class Tracer:
+    """
+    Collects the spans of one traced run at a time
+
+    Args:
+        service_name: OTLP resource service.name
+    """
+
+    def __init__(self, service_name: str):
+        self.service_name = service_name
+        self.last_run: List[Span] = []
+        self._spans: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, kind: str = 'internal', **attributes):
+        """
+        Time the enclosed block as a child of the current span
+
+        An exception escaping the block marks the span failed and is re-raised.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            yield NOOP_SPAN
+            return
+
+        span = Span(self, name, parent.trace_id, parent, kind, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+
+    def traced(self, name: str, kind: str = 'internal', **attributes) -> Callable:
+        """Decorator form of span() for a whole function"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, kind, **attributes):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current(self):
+        return _current_span.get() or NOOP_SPAN
+
+    def _finished(self, span: Span) -> None:
+        with self._lock:
+            # Spans finishing after their run was exported (abandoned price requests) are dropped
+            spans = self._spans.get(span.trace_id)
+            if spans is not None:
+                spans.append(span)
+
+    @contextmanager
+    def run(self, name: str, export_dir: Optional[str] = None, max_files: int = 14, top: int = 15, **attributes):
+        """
+        Trace one run: a root span whose subtree is exported and summarized when it ends
+
+        Args:
+            export_dir: Directory for the daily OTLP/JSON files, or None to only print the summary
+            max_files: Daily trace files kept
+            top: Slowest spans printed (0 for none)
+        """
+        trace_id = secrets.token_hex(16)
+        with self._lock:
+            self._spans[trace_id] = []
+        root = Span(self, name, trace_id, None, 'internal', attributes)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            root.finish()
+            with self._lock:
+                self.last_run = self._spans.pop(trace_id)
+            try:
+                if export_dir:
+                    path = self.export(self.last_run, export_dir, max_files)
+                    print(f"\n🧭 Trace {trace_id} written to {path}")
+                if top:
+                    print_slowest_spans(self.last_run, top)
+            except Exception as e:
+                print(f"⚠️ Could not export trace: {e}")
+
+    def to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [otlp_attribute('service.name', self.service_name)]},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [span.to_otlp() for span in sorted(spans, key=lambda span: span.start_ns)]
+                }]
+            }]
+        }
+
+    def export(self, spans: List[Span], directory: str, max_files: int = 14) -> str:
+        """Append the run to today's trace file and prune old files"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{TRACE_PREFIX}{datetime.now(timezone.utc):%Y%m%d}{TRACE_SUFFIX}")
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.to_otlp(spans), separators=(',', ':')) + '\n')
+
+        files = sorted(name for name in os.listdir(directory)
+                       if name.startswith(TRACE_PREFIX) and name.endswith(TRACE_SUFFIX))
+        for name in files[:max(0, len(files) - max_files)]:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+        return path
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Bind `func` to the caller's current span so spans it opens on a pool thread nest correctly
+
+    Thread pools don't carry context variables over, so wrap callables at submit time.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return func
+
+    @functools.wraps(func)
+    def run_in_span(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+    return run_in_span
+
+
+def describe(span: Span) -> str:
+    """Short label of the attributes that identify what a span worked on"""
+    details = [str(value) for key, value in span.attributes.items()
+               if key in ('wallet', 'exchange', 'market', 'method', 'table', 'stage')]
+    return ' '.join(details)
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024 or unit == 'MB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def print_slowest_spans(spans: List[Span], top: int = 15) -> None:
+    """Print the slowest spans of a run and the time spent per span name"""
+    if not spans:
+        return
+    root = next((span for span in spans if span.parent_id is None), None)
+    errors = sum(1 for span in spans if span.outcome == 'error')
+    print(f"\n⏱️ SLOWEST SPANS ({len(spans)} spans, {errors} failed"
+          f"{f', run took {root.duration:.2f}s' if root else ''})")
+    print(f"{'Span':<38}{'Detail':<30}{'Duration':>10}{'Size':>11}  Outcome")
+    print("-" * 100)
+    for span in sorted((span for span in spans if span is not root), key=lambda span: span.duration, reverse=True)[:top]:
+        outcome = 'ok' if span.outcome == 'ok' else f"error ({span.error})"[:40]
+        print(f"{span.name:<38}{describe(span)[:29]:<30}{span.duration * 1000:>8.0f}ms"
+              f"{format_size(span.payload_bytes):>11}  {outcome}")
+
+    totals: Dict[str, List[float]] = {}
+    for span in spans:
+        if span is not root:
+            totals.setdefault(span.name, []).append(span.duration)
+    print(f"\n{'Span':<38}{'Count':>7}{'Total':>11}{'Max':>11}")
+    print("-" * 67)
+    for name, durations in sorted(totals.items(), key=lambda item: sum(item[1]), reverse=True):
+        print(f"{name:<38}{len(durations):>7}{sum(durations) * 1000:>9.0f}ms{max(durations) * 1000:>9.0f}ms")
+
+
+# Tracer shared by every collector stage
+tracer = Tracer('gary-wealth-collector')
+span = tracer.span
+traced = tracer.traced
@@ -0,0 +1,156 @@
+"""
+Opt-in traffic capture for the Flask app
+Records a sample of requests to rotating NDJSON files so real workloads can be
+replayed against a local app (benchmarks/replay_capture.py)
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from flask import Flask, Response, g, request
+
+from config.settings import config
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_PREFIX = 'capture-'
+CAPTURE_SUFFIX = '.ndjson'
+
+# Never written to disk
+REDACTED_HEADERS = {'authorization', 'cookie', 'proxy-authorization', 'apikey', 'x-api-key'}
+
+
+class TrafficCapture:
+    """
+    Append sampled requests to NDJSON files in `directory`
+
+    Each process writes its own file, started afresh once it reaches
+    `max_file_bytes`; the oldest files are deleted beyond `max_files`.
+
+    Args:
+        directory: Capture directory
+        sample_rate: Fraction of requests recorded (0-1)
+        include_bodies: Store request bodies as well as their hashes
+        max_file_bytes: Size at which a capture file is rotated
+        max_files: Capture files kept across all processes
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 1.0, include_bodies: bool = False,
+                 max_file_bytes: int = 16 * 1024 * 1024, max_files: int = 20):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.include_bodies = include_bodies
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._pid = None
+        self._seq = 0
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._seq += 1
+        name = f"{CAPTURE_PREFIX}{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._seq}{CAPTURE_SUFFIX}"
+        self._file = open(os.path.join(self.directory, name), 'ab')
+        self._pid = os.getpid()
+        self._prune()
+
+    def _prune(self) -> None:
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.startswith(CAPTURE_PREFIX) and name.endswith(CAPTURE_SUFFIX)]
+        files.sort(key=os.path.getmtime)
+        for path in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        with self._lock:
+            # A file inherited across fork belongs to the parent
+            if self._file is None or self._pid != os.getpid():
+                self._open()
+            elif self._file.tell() + len(line) > self.max_file_bytes:
+                self._file.close()
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def build_record(self, response: Response, started: float, duration: float) -> Dict[str, Any]:
+        body = request.get_data(cache=True)
+        record = {
+            'ts': started,
+            'time': datetime.fromtimestamp(started, timezone.utc).isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'query': request.query_string.decode('latin-1'),
+            'headers': {
+                name: 'REDACTED' if name.lower() in REDACTED_HEADERS else value
+                for name, value in request.headers.items()
+            },
+            'body_bytes': len(body),
+            'body_sha256': hashlib.sha256(body).hexdigest(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'pid': os.getpid()
+        }
+        if self.include_bodies and body:
+            try:
+                record['body'] = body.decode('utf-8')
+            except UnicodeDecodeError:
+                record['body_b64'] = base64.b64encode(body).decode()
+        return record
+
+    def install(self, app: Flask) -> None:
+        """Register the before/after request hooks on `app`"""
+
+        @app.before_request
+        def start_capture():
+            if self.sampled():
+                g.capture_started = (time.time(), time.perf_counter())
+
+        @app.after_request
+        def finish_capture(response):
+            started = g.pop('capture_started', None)
+            if started:
+                try:
+                    self.write(self.build_record(response, started[0], time.perf_counter() - started[1]))
+                except Exception as e:
+                    logger.warning(f"Traffic capture failed: {str(e)}")
+            return response
+
+
+def init_capture(app: Flask) -> Optional[TrafficCapture]:
+    """
+    Install traffic capture on `app` when CAPTURE_ENABLED is set
+
+    Returns:
+        The capture, or None when disabled
+    """
+    if not config.capture_enabled:
+        return None
+
+    capture = TrafficCapture(
+        config.capture_dir,
+        sample_rate=config.capture_sample_rate,
+        include_bodies=config.capture_bodies,
+        max_file_bytes=config.capture_max_file_mb * 1024 * 1024,
+        max_files=config.capture_max_files
+    )
+    capture.install(app)
+    logger.info(f"Capturing {capture.sample_rate:.0%} of requests to {capture.directory}"
+                f"{' with bodies' if capture.include_bodies else ''}")
+    return capture
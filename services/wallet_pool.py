@@ -0,0 +1,98 @@
+"""
+Rate-limited worker pool for wallet fetches
+Every provider gets its own token bucket, so wallets are fetched as fast as the
+slowest provider allows instead of one after another
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
+
+from services.tracing import propagate
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Block until `tokens` are available and take them
+
+        Returns:
+            Seconds spent waiting
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                delay = (tokens - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class WalletFetchPool:
+    """Runs wallet fetches on a thread pool, throttled per provider"""
+
+    def __init__(self, providers: Dict[str, Dict[str, Any]], max_workers: int = 8):
+        self.providers = providers
+        self.max_workers = max_workers
+        self.buckets = {
+            api: TokenBucket(limits['rate_per_second'], limits['burst'])
+            for api, limits in providers.items()
+        }
+        self.throttled = {api: 0.0 for api in providers}
+        self._throttled_lock = threading.Lock()
+
+    def acquire(self, api: str, tokens: float = 1) -> None:
+        """Take `tokens` from a provider's bucket, e.g. before retrying a rate-limited request"""
+        bucket = self.buckets.get(api)
+        if bucket:
+            waited = bucket.acquire(tokens)
+            with self._throttled_lock:
+                self.throttled[api] += waited
+
+    def _run_one(self, wallet: Dict[str, Any], fetch: Callable[[Dict[str, Any]], Any], calls: Optional[int],
+                 calls_key: str):
+        api = wallet['api']
+        if api in self.buckets:
+            self.acquire(api, calls or self.providers[api].get(calls_key) or 1)
+        return fetch(wallet)
+
+    def run(self, wallets: List[Dict[str, Any]], fetch: Callable[[Dict[str, Any]], Any],
+            calls: Optional[int] = None, calls_key: str = 'calls_per_wallet') -> List[Any]:
+        """
+        Call `fetch` for every wallet and return the results in the same order as `wallets`
+
+        Each call takes `calls` tokens from the wallet's provider bucket (default: the
+        provider's `calls_key` limit, calls_per_wallet or probe_calls). A fetch that raises
+        counts as a failed wallet (None) rather than aborting the run.
+        """
+        if not wallets:
+            return []
+
+        def guarded(wallet):
+            try:
+                return self._run_one(wallet, fetch, calls, calls_key)
+            except Exception as e:
+                print(f"  ❌ Error fetching {wallet.get('name')}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(wallets)),
+                                thread_name_prefix='wallet-fetch') as executor:
+            # Fetch spans opened on the pool threads nest under the caller's span
+            return list(executor.map(propagate(guarded), wallets))
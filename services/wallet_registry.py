@@ -0,0 +1,124 @@
+"""
+Wallet registry for the Gary wealth collector
+Loads tracked addresses and provider limits from a YAML file, decides which
+wallets fit into the current run's request budget and remembers the last
+holdings of every wallet so deferred wallets still count towards totals
+"""
+import json
+import math
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import yaml
+
+DEFAULT_PROVIDER_LIMITS = {
+    'rate_per_second': 1.0,
+    'burst': 1,
+    'hourly_budget': None,
+    'calls_per_wallet': 1,
+    'probe_calls': 0  # Change-probe requests per wallet before a fetch (0: always fetched in full)
+}
+
+
+def load_wallet_registry(path: str) -> Dict[str, Any]:
+    """
+    Load the wallet registry file
+
+    Returns:
+        Dictionary with 'workers', 'providers' (limits filled with defaults) and 'wallets'
+
+    Raises:
+        ValueError: If a wallet entry is missing its address or provider
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        registry = yaml.safe_load(file) or {}
+
+    wallets = registry.get('wallets') or []
+    for wallet in wallets:
+        if not wallet.get('address') or not wallet.get('api'):
+            raise ValueError(f"Wallet entry needs 'address' and 'api': {wallet}")
+        wallet.setdefault('name', wallet['address'][:10] + "...")
+
+    providers = {}
+    for api in {wallet['api'] for wallet in wallets} | set((registry.get('providers') or {}).keys()):
+        limits = dict(DEFAULT_PROVIDER_LIMITS)
+        limits.update((registry.get('providers') or {}).get(api) or {})
+        providers[api] = limits
+
+    return {
+        'workers': int(registry.get('workers', 8)),
+        'providers': providers,
+        'wallets': wallets
+    }
+
+
+def select_wallet_shard(wallets: List[Dict[str, Any]], providers: Dict[str, Dict[str, Any]],
+                        run_slot: int, runs_per_hour: float = 1) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split wallets into the ones fetched this run and the ones deferred to later runs
+
+    A provider whose wallets need more calls per run than its hourly budget allows is
+    split into equal shards, and `run_slot` (e.g. the hour number) rotates through them.
+    A wallet is budgeted for its change probe plus a full fetch, the worst case.
+
+    Returns:
+        Tuple of (selected wallets, deferred wallets), both in registry order
+    """
+    selected_ids = set()
+    for api, limits in providers.items():
+        api_wallets = [wallet for wallet in wallets if wallet['api'] == api]
+        budget = limits.get('hourly_budget')
+        if not api_wallets or not budget:
+            selected_ids.update(id(wallet) for wallet in api_wallets)
+            continue
+
+        calls = limits.get('calls_per_wallet', 1) + (limits.get('probe_calls') or 0)
+        per_run = max(1, int(budget / runs_per_hour / calls))
+        shards = math.ceil(len(api_wallets) / per_run)
+        shard = run_slot % shards
+        selected_ids.update(id(wallet) for wallet in api_wallets[shard::shards])
+        if shards > 1:
+            print(f"⏳ {api}: {len(api_wallets)} wallets exceed the budget of {per_run}/run, "
+                  f"fetching shard {shard + 1}/{shards}")
+
+    selected = [wallet for wallet in wallets if id(wallet) in selected_ids]
+    deferred = [wallet for wallet in wallets if id(wallet) not in selected_ids]
+    return selected, deferred
+
+
+class HoldingsCache:
+    """Last known holdings per wallet address, persisted as JSON between runs"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Could not read holdings cache {path}: {e}")
+
+    def get(self, address: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self.entries.get(address)
+        return entry['holdings'] if entry else None
+
+    def get_probe(self, address: str) -> Optional[str]:
+        """Change-probe value recorded with the cached holdings, if any"""
+        entry = self.entries.get(address)
+        return entry.get('probe') if entry else None
+
+    def put(self, address: str, holdings: List[Dict[str, Any]], probe: Optional[str] = None) -> None:
+        self.entries[address] = {'fetched_at': time.time(), 'holdings': holdings, 'probe': probe}
+
+    def save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.entries, file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not write holdings cache {self.path}: {e}")
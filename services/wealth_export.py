@@ -0,0 +1,223 @@
+"""
+Streaming export of Gary wealth snapshots
+Pages through utgl_gary_wealth_records in id order (keyset pagination, so a
+page costs the same at any depth) and encodes each page as soon as it
+arrives: NDJSON lines, CSV rows with one column per balance symbol, or one
+Parquet row group. Only the current page is held in memory, and the last id
+a client received is the cursor it passes back to resume.
+
+pyarrow is optional and only needed for Parquet; it is imported on first use.
+"""
+import csv
+import gc
+import io
+import json
+import logging
+from numbers import Number
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.balance_facts import iter_accounts
+
+logger = logging.getLogger(__name__)
+
+# Export format -> response mimetype
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Largest page (and Parquet row group) a client may ask for
+MAX_PAGE_SIZE = 1000
+
+ACCOUNT_COLUMNS = ['snapshot_id', 'date', 'user_id', 'account_id']
+# JSON object of the balances without a column of their own
+OTHER_BALANCES_COLUMN = 'other_balances'
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def iter_pages(fetch_page: Callable[[int, int], List[Dict[str, Any]]], cursor: int = 0,
+               page_size: int = 500, limit: Optional[int] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of snapshots after `cursor` until the table (or `limit`) runs out
+
+    Args:
+        fetch_page: Called with (after_id, page_size); returns rows with id, date and data in id order
+        cursor: Last id the client already has (0 for the start)
+        page_size: Rows per page
+        limit: Most snapshots to yield in total (None for all)
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = fetch_page(cursor, size)
+        # httpx responses sit in a reference cycle with their stream, so each page's body
+        # would otherwise linger until a full collection; a young-generation pass frees it
+        gc.collect(1)
+        if not page:
+            return
+        yield page
+        cursor = page[-1]['id']
+        if remaining is not None:
+            remaining -= len(page)
+        if len(page) < size:
+            return
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+def flatten_snapshot(snapshot: Dict[str, Any], symbols: List[str]) -> Iterator[Tuple[Any, ...]]:
+    """
+    One row per account of a snapshot: ACCOUNT_COLUMNS, a balance per symbol, then other_balances
+
+    Numeric balances of `symbols` get their own column; every other balance goes into
+    the other_balances JSON. A snapshot without accounts still gets one row, so every
+    snapshot id appears in the output.
+    """
+    symbol_columns = set(symbols)
+    accounts = 0
+    for account in iter_accounts(snapshot.get('data')):
+        accounts += 1
+        balances = account['balances']
+        other = {symbol: value for symbol, value in balances.items()
+                 if symbol not in symbol_columns or not _is_number(value)}
+        account_id = account.get('accountId')
+        user_id = account.get('userId')
+        yield (
+            snapshot['id'],
+            snapshot.get('date'),
+            str(user_id) if user_id is not None else None,
+            str(account_id) if account_id is not None else None,
+            *(balances.get(symbol) if symbol not in other else None for symbol in symbols),
+            json.dumps(other, separators=(',', ':')) if other else None
+        )
+    if not accounts:
+        yield (snapshot['id'], snapshot.get('date'), None, None, *([None] * len(symbols)), None)
+
+
+def ndjson_chunks(pages: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """One {"id", "date", "data"} line per snapshot, one chunk per page"""
+    for page in pages:
+        if page:
+            yield ''.join(
+                json.dumps({'id': row['id'], 'date': row.get('date'), 'data': row.get('data')},
+                           separators=(',', ':')) + '\n'
+                for row in page
+            ).encode()
+
+
+def csv_chunks(pages: Iterable[List[Dict[str, Any]]], symbols: List[str]) -> Iterator[bytes]:
+    """Header, then one chunk of flattened account rows per page"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ACCOUNT_COLUMNS + symbols + [OTHER_BALANCES_COLUMN])
+    for page in pages:
+        for snapshot in page:
+            writer.writerows(flatten_snapshot(snapshot, symbols))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class _DrainableSink:
+    """Write-only file object for ParquetWriter whose bytes are taken out after every row group"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def parquet_chunks(pages: Iterable[List[Dict[str, Any]]], symbols: List[str]) -> Iterator[bytes]:
+    """
+    The CSV layout as a Parquet file, one row group per page
+
+    Balance columns are float64 and other_balances a JSON string. The footer is written
+    last, so a cut-off download is unreadable; split large exports with limit and cursor.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [('snapshot_id', pa.int64()), ('date', pa.string()), ('user_id', pa.string()), ('account_id', pa.string())]
+        + [(symbol, pa.float64()) for symbol in symbols]
+        + [(OTHER_BALANCES_COLUMN, pa.string())]
+    )
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for page in pages:
+            rows = [row for snapshot in page for row in flatten_snapshot(snapshot, symbols)]
+            if not rows:
+                continue
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_chunks(export_format: str, pages: Iterable[List[Dict[str, Any]]],
+                  symbols: Optional[List[str]] = None) -> Iterator[bytes]:
+    """
+    Encode pages of snapshots as `export_format`, logging a failure part way through
+
+    An error after the first chunk can't change the response status anymore; it is
+    logged and re-raised, which cuts the chunked response short.
+    """
+    if export_format == 'ndjson':
+        chunks = ndjson_chunks(pages)
+    elif export_format == 'csv':
+        chunks = csv_chunks(pages, symbols or [])
+    elif export_format == 'parquet':
+        chunks = parquet_chunks(pages, symbols or [])
+    else:
+        raise ValueError(f"Unknown export format '{export_format}' (use {', '.join(EXPORT_FORMATS)})")
+
+    sent = 0
+    try:
+        for chunk in chunks:
+            if chunk:
+                sent += len(chunk)
+                yield chunk
+    except Exception as e:
+        logger.error(f"Wealth data export ({export_format}) failed after {sent} bytes: {str(e)}")
+        raise
+    logger.info(f"Wealth data export ({export_format}) finished: {sent} bytes")
@@ -0,0 +1,194 @@
+"""
+Schema validation for Gary wealth payloads
+A payload is one account object or a non-empty list of them, each with
+string `userId` and `accountId` and a `balances` object of numbers. The
+validator is built once per process: with msgspec installed the request body is
+decoded and validated in a single pass in C; otherwise a precompiled
+pure-Python check runs over the json-decoded body. Either way a bad payload
+is rejected before any database I/O.
+
+Both backends report the same `path` and `message` for a rejected payload:
+the msgspec backend hands rejected bodies to the Python check to explain them,
+so only the (rare) error path pays for a second decode. Paths name balance
+symbols as `$.balances.BTC`, or `$.balances["odd key"]` when the symbol isn't
+an identifier.
+
+Nothing is compiled at import: get_wealth_validator() builds the validator
+(and imports msgspec) on first use, so processes that run with schema
+validation off never pay for it.
+"""
+import importlib.util
+import json
+import math
+import threading
+from typing import Annotated, Any, Dict, List, Union
+
+# Optional dependency, only imported once a msgspec validator is built
+MSGSPEC_AVAILABLE = importlib.util.find_spec('msgspec') is not None
+
+# Optional account fields accepted besides the required ones
+OPTIONAL_FIELDS = ('positions', 'orders')
+
+
+class SchemaError(ValueError):
+    """A payload that doesn't match the wealth schema; `path` locates the offending value"""
+
+    def __init__(self, message: str, path: str = '$'):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+
+    def to_dict(self) -> Dict[str, str]:
+        return {'path': self.path, 'message': self.message}
+
+
+def _member_path(path: str, key: str) -> str:
+    return f"{path}.{key}" if key.isidentifier() else f"{path}[{json.dumps(key)}]"
+
+
+def _reject_constant(name: str):
+    raise SchemaError(f"Expected a finite number, got `{name}`")
+
+
+class PythonWealthValidator:
+    """Pure-Python validator: json.loads, then one compiled walk over the result"""
+
+    backend = 'python'
+
+    def __init__(self):
+        required = (('userId', str), ('accountId', str))
+        allowed = {'userId', 'accountId', 'balances', *OPTIONAL_FIELDS}
+
+        # Everything the per-account check needs is bound here, once
+        def check_account(account: Any, path: str) -> None:
+            if type(account) is not dict:
+                raise SchemaError(f"Expected `object`, got `{type(account).__name__}`", path)
+            for field, field_type in required:
+                value = account.get(field)
+                if value is None:
+                    raise SchemaError(f"Object missing required field `{field}`", path)
+                if type(value) is not field_type or not value:
+                    raise SchemaError("Expected a non-empty `str`", f"{path}.{field}")
+            unknown = account.keys() - allowed
+            if unknown:
+                raise SchemaError(f"Object contains unknown field `{sorted(unknown)[0]}`", path)
+
+            balances = account.get('balances')
+            if type(balances) is not dict:
+                raise SchemaError("Object missing required field `balances`" if balances is None
+                                  else f"Expected `object`, got `{type(balances).__name__}`", f"{path}.balances")
+            for symbol, balance in balances.items():
+                kind = type(balance)
+                if kind is not int and kind is not float:
+                    raise SchemaError(f"Expected `int | float`, got `{kind.__name__}`",
+                                      _member_path(f"{path}.balances", symbol))
+                if kind is float and not math.isfinite(balance):
+                    raise SchemaError("Expected a finite number", _member_path(f"{path}.balances", symbol))
+
+        self._check_account = check_account
+        self._decoder = json.JSONDecoder(parse_constant=_reject_constant)
+
+    def check(self, data: Any) -> Any:
+        if type(data) is list:
+            if not data:
+                raise SchemaError("Expected at least one account")
+            for index, account in enumerate(data):
+                self._check_account(account, f"$[{index}]")
+        else:
+            self._check_account(data, '$')
+        return data
+
+    def decode(self, body: bytes) -> Any:
+        """
+        Decode and validate a request body
+
+        Raises:
+            SchemaError: If the body isn't JSON or doesn't match the schema
+        """
+        try:
+            data = self._decoder.decode(body.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise SchemaError(f"JSON is malformed: {e}")
+        return self.check(data)
+
+
+def _wealth_account_type():
+    """msgspec type for one account or a list of them, defined on first use"""
+    import msgspec
+
+    NonEmptyStr = Annotated[str, msgspec.Meta(min_length=1)]
+
+    class WealthAccount(msgspec.Struct, forbid_unknown_fields=True):
+        userId: NonEmptyStr
+        accountId: NonEmptyStr
+        balances: Dict[str, Union[int, float]]
+        positions: Any = msgspec.UNSET
+        orders: Any = msgspec.UNSET
+
+    return Union[WealthAccount, List[WealthAccount]]
+
+
+class MsgspecWealthValidator:
+    """msgspec validator: typed decoding straight from the request bytes"""
+
+    backend = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+
+        self._msgspec = msgspec
+        self._decoder = msgspec.json.Decoder(_wealth_account_type())
+        # msgspec's own errors don't name dict keys (`$.balances[...]`) and word some checks
+        # differently, so rejected bodies are explained by the Python validator instead
+        self._explain = PythonWealthValidator()
+
+    def _rejection(self, body: bytes, message: str, path: str = '$') -> SchemaError:
+        try:
+            self._explain.decode(body)
+        except SchemaError as e:
+            return e
+        return SchemaError(message, path)
+
+    def decode(self, body: bytes) -> Any:
+        """
+        Decode and validate a request body
+
+        Returns:
+            The payload as plain dicts and lists, ready to store
+
+        Raises:
+            SchemaError: If the body isn't JSON or doesn't match the schema
+        """
+        msgspec = self._msgspec
+        try:
+            value = self._decoder.decode(body)
+        except msgspec.ValidationError as e:
+            message, _, path = str(e).partition(' - at ')
+            raise self._rejection(body, message, path.strip('`') or '$')
+        except msgspec.DecodeError as e:
+            raise self._rejection(body, str(e))
+        if isinstance(value, list) and not value:
+            raise SchemaError("Expected at least one account")
+        return msgspec.to_builtins(value)
+
+
+def build_validator(prefer_msgspec: bool = True):
+    """Compile the wealth validator, using msgspec when it is installed"""
+    if prefer_msgspec and MSGSPEC_AVAILABLE:
+        return MsgspecWealthValidator()
+    return PythonWealthValidator()
+
+
+# Compiled once per process, on first use
+_wealth_validator = None
+_wealth_validator_lock = threading.Lock()
+
+
+def get_wealth_validator():
+    """The process-wide wealth validator, built on the first call"""
+    global _wealth_validator
+    if _wealth_validator is None:
+        with _wealth_validator_lock:
+            if _wealth_validator is None:
+                _wealth_validator = build_validator()
+    return _wealth_validator
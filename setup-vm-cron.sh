@@ -2,9 +2,16 @@
 
 # Automation Service Setup
 # Sets up cron job to run gary_wealth.py every hour
+# Usage: ./setup-vm-cron.sh            # hourly cron job (one-shot runs)
+#        ./setup-vm-cron.sh --daemon   # systemd service running the collector daemon
 
 set -e
 
+MODE="cron"
+if [ "$1" == "--daemon" ]; then
+    MODE="daemon"
+fi
+
 echo "🤖 Setting up Automation Service..."
 
 # Get current directory
@@ -47,14 +54,82 @@ mkdir -p logs
 # Set proper permissions for service account
 chmod 600 "$SERVICE_ACCOUNT_PATH"
 
+COMPACTION_JOB="30 3 * * * cd $REPO_DIR && $REPO_DIR/venv/bin/python -m services.collector compact >> logs/compaction.log 2>&1"
+
+# Print the current crontab without the jobs (and their "# Automation Service -" comments) this script adds
+clean_crontab() {
+    (crontab -l 2>/dev/null || true) \
+        | grep -vE "services/gary_wealth\.py|-m services\.collector compact|^# Automation Service - " \
+        | cat -s || true
+}
+
+# Make sure cron is running (the compaction job uses it in both modes)
+start_cron() {
+    echo "🔧 Ensuring cron service is running..."
+    sudo systemctl enable cron
+    sudo systemctl start cron
+    sudo systemctl status cron --no-pager
+}
+
+if [ "$MODE" == "daemon" ]; then
+    echo "⏰ Setting up collector daemon service..."
+
+    # Replace the hourly cron job with the daemon so runs never overlap; compaction stays in cron
+    {
+        clean_crontab
+        echo ""
+        echo "# Automation Service - daily retention compaction (python -m services.collector compact)"
+        echo "$COMPACTION_JOB"
+    } | crontab -
+    start_cron
+
+    sudo tee /etc/systemd/system/gary-wealth-collector.service > /dev/null << EOF
+[Unit]
+Description=Gary wealth collector daemon
+After=network-online.target
+Wants=network-online.target
+
+[Service]
+Type=simple
+User=$(whoami)
+WorkingDirectory=$REPO_DIR
+ExecStart=$REPO_DIR/venv/bin/python $SCRIPT_PATH --daemon --cron "0 * * * *"
+Restart=on-failure
+RestartSec=30
+StandardOutput=append:$REPO_DIR/logs/gary_wealth.log
+StandardError=append:$REPO_DIR/logs/gary_wealth.log
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+    sudo systemctl daemon-reload
+    sudo systemctl enable gary-wealth-collector
+    sudo systemctl restart gary-wealth-collector
+    sudo systemctl status gary-wealth-collector --no-pager
+
+    echo ""
+    echo "🎉 Automation Service Setup Complete!"
+    echo ""
+    echo "📋 Setup Summary:"
+    echo "   • Script Location: $SCRIPT_PATH"
+    echo "   • Service: gary-wealth-collector (systemd)"
+    echo "   • Schedule: Every hour (0 * * * *), edit ExecStart for --cron or --interval"
+    echo "   • Compaction: cron, daily at 03:30"
+    echo "   • Logs: logs/gary_wealth.log, logs/compaction.log"
+    echo ""
+    echo "📊 Management Commands:"
+    echo "   • Status: sudo systemctl status gary-wealth-collector"
+    echo "   • Check logs: tail -f logs/gary_wealth.log"
+    echo "   • Restart: sudo systemctl restart gary-wealth-collector"
+    exit 0
+fi
+
 # Get current crontab and add our job
 echo "⏰ Setting up cron job for Automation Service..."
 
-# Create temporary crontab file
-crontab -l > temp_crontab 2>/dev/null || touch temp_crontab
-
-# Remove any existing gary_wealth entries
-grep -v "gary_wealth" temp_crontab > temp_crontab_clean || touch temp_crontab_clean
+# Current crontab without the entries this script added on earlier runs
+clean_crontab > temp_crontab_clean
 
 # Add new cron job (every hour at minute 0)
 cat >> temp_crontab_clean << EOF
@@ -62,17 +137,16 @@ cat >> temp_crontab_clean << EOF
 # Automation Service - runs every hour
 0 * * * * cd $REPO_DIR && $REPO_DIR/venv/bin/python $SCRIPT_PATH >> logs/gary_wealth.log 2>&1
 
+# Automation Service - daily retention compaction (python -m services.collector compact)
+$COMPACTION_JOB
+
 EOF
 
 # Install the new crontab
 crontab temp_crontab_clean
-rm temp_crontab temp_crontab_clean
+rm temp_crontab_clean
 
-# Check if cron service is running
-echo "🔧 Ensuring cron service is running..."
-sudo systemctl enable cron
-sudo systemctl start cron
-sudo systemctl status cron --no-pager
+start_cron
 
 echo ""
 echo "🎉 Automation Service Setup Complete!"
@@ -80,8 +154,8 @@ echo ""
 echo "📋 Setup Summary:"
 echo "   • Script Location: $SCRIPT_PATH"
 echo "   • Service Account: $SERVICE_ACCOUNT_PATH"
-echo "   • Schedule: Every hour (0 * * * *)"
-echo "   • Logs: logs/gary_wealth.log"
+echo "   • Schedule: Every hour (0 * * * *), compaction daily at 03:30"
+echo "   • Logs: logs/gary_wealth.log, logs/compaction.log"
 echo ""
 echo "📊 Management Commands:"
 echo "   • View cron jobs: crontab -l"
@@ -90,6 +164,6 @@ echo "   • Test script: cd $REPO_DIR && venv/bin/python services/gary_wealth.p
 echo "   • Edit cron: crontab -e"
 echo ""
 echo "⏰ Current Cron Jobs:"
-crontab -l | grep -E "(gary_wealth|^#|^$)" || echo "   No cron jobs found"
+crontab -l | grep -E "(services/gary_wealth\.py|services\.collector compact|^# Automation Service - )" || echo "   No cron jobs found"
 echo ""
 echo "💡 The automation service will run every hour and collect wealth data automatically!"
@@ -0,0 +1,20 @@
+"""
+Shared test setup
+Tests never read env.yaml or reach Supabase: configuration comes from the
+environment set here, and database calls go to fakes or the local fake
+PostgREST in benchmarks/fake_postgrest.py
+"""
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+from fake_postgrest import FAKE_SUPABASE_KEY  # noqa: E402
+
+os.environ['ENV_FILE'] = os.devnull
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_KEY', FAKE_SUPABASE_KEY)
+os.environ['SPOOL_ENABLED'] = 'false'
+os.environ['TRACE_ENABLED'] = 'false'
@@ -0,0 +1,114 @@
+"""
+In-process stand-in for the parts of the supabase-py query builder the services use
+
+Rows live in plain lists per table; filters compare values as stored, so dates
+should be ISO strings in one format.
+"""
+import operator
+from types import SimpleNamespace
+
+OPERATORS = {'eq': operator.eq, 'gt': operator.gt, 'gte': operator.ge, 'lt': operator.lt, 'lte': operator.le}
+
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.action = 'select'
+        self.payload = None
+        self.on_conflict = None
+        self.filters = []
+        self.orders = []
+        self.bounds = None
+
+    def _rows(self):
+        return self.client.tables.setdefault(self.table, [])
+
+    def select(self, columns='*'):
+        return self
+
+    def insert(self, rows, returning=None):
+        self.action, self.payload = 'insert', rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict='', returning=None):
+        self.action, self.payload = 'upsert', rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict.split(',')
+        return self
+
+    def delete(self, returning=None):
+        self.action = 'delete'
+        return self
+
+    def __getattr__(self, name):
+        if name in OPERATORS:
+            def add_filter(column, value):
+                self.filters.append((column, OPERATORS[name], value))
+                return self
+            return add_filter
+        raise AttributeError(name)
+
+    def in_(self, column, values):
+        values = list(values)
+        self.filters.append((column, lambda value, allowed: value in allowed, values))
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def limit(self, count):
+        self.bounds = (0, count)
+        return self
+
+    def _matches(self, row):
+        return all(row.get(column) is not None and test(row.get(column), value)
+                   for column, test, value in self.filters)
+
+    def execute(self):
+        self.client.calls.append((self.action, self.table))
+        rows = self._rows()
+        if self.action == 'insert':
+            for row in self.payload:
+                row = dict(row)
+                row.setdefault('id', self.client.next_id())
+                rows.append(row)
+            return SimpleNamespace(data=self.payload)
+        if self.action == 'upsert':
+            for row in self.payload:
+                key = [row[column] for column in self.on_conflict]
+                rows[:] = [old for old in rows if [old.get(column) for column in self.on_conflict] != key]
+                rows.append(dict(row))
+            return SimpleNamespace(data=self.payload)
+        if self.action == 'delete':
+            rows[:] = [row for row in rows if not self._matches(row)]
+            return SimpleNamespace(data=[])
+
+        selected = [dict(row) for row in rows if self._matches(row)]
+        for column, desc in reversed(self.orders):
+            selected.sort(key=lambda row: row[column], reverse=desc)
+        if self.bounds:
+            selected = selected[self.bounds[0]:self.bounds[1]]
+        return SimpleNamespace(data=selected)
+
+
+class FakeSupabase:
+    def __init__(self, **tables):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in tables.items()}
+        self.calls = []
+        self._next_id = 1 + max((row.get('id', 0) for rows in self.tables.values() for row in rows), default=0)
+
+    def next_id(self):
+        self._next_id += 1
+        return self._next_id - 1
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        self.calls.append(('rpc', name))
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=None))
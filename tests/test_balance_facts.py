@@ -0,0 +1,80 @@
+from config.settings import Config
+from services.balance_facts import explode_balances, group_by_account, iter_accounts
+
+
+def test_facts_and_totals_are_off_by_default(monkeypatch):
+    monkeypatch.delenv('BALANCE_FACTS_ENABLED', raising=False)
+    monkeypatch.delenv('PORTFOLIO_TOTALS_ENABLED', raising=False)
+    fresh = Config()
+    assert not fresh.balance_facts_enabled
+    assert not fresh.portfolio_totals_enabled
+
+
+def test_iter_accounts_finds_nested_accounts():
+    data = {'accounts': [{'accountId': 1, 'balances': {'BTC': 1}}, {'wrapped': {'accountId': 2, 'balances': {}}}]}
+    assert [account['accountId'] for account in iter_accounts(data)] == [1, 2]
+
+
+def test_explode_keeps_only_nonzero_numeric_balances():
+    data = [{'accountId': 7, 'userId': 'u', 'balances': {'BTC': 0.5, 'ETH': 0, 'FLAG': True, 'NOTE': 'x'}}]
+    rows = explode_balances(3, '2026-01-01', data)
+    assert rows == [{'snapshot_id': 3, 'date': '2026-01-01', 'account_id': '7', 'user_id': 'u',
+                     'symbol': 'BTC', 'balance': 0.5}]
+
+
+def test_totals_route_is_404_while_disabled(monkeypatch):
+    from app import app
+    from config.settings import config
+
+    monkeypatch.setitem(config.config_data, 'PORTFOLIO_TOTALS_ENABLED', False)
+    monkeypatch.setitem(config.config_data, 'API_KEYS', 'reader-key')
+    response = app.test_client().get('/utgl-gary-wealth-data/totals', headers={'X-API-Key': 'reader-key'})
+    assert response.status_code == 404
+    assert 'PORTFOLIO_TOTALS_ENABLED' in response.get_json()['message']
+
+
+def test_group_by_account_sums_duplicates_and_drops_zeros():
+    data = [
+        {'accountId': 1, 'userId': 'u', 'balances': {'BTC': 1, 'ETH': 2}},
+        {'accountId': 1, 'userId': 'u', 'balances': {'BTC': 0.5, 'ETH': -2}},
+    ]
+    assert group_by_account(data) == [{'account_id': '1', 'user_id': 'u', 'balances': {'BTC': 1.5}}]
+
+
+def test_group_by_account_keeps_emptied_accounts():
+    data = {'accounts': [
+        {'accountId': 1, 'userId': 'u', 'balances': {'BTC': 0}},
+        {'accountId': 2, 'userId': 'u', 'balances': {}},
+        {'accountId': 3, 'userId': 'u', 'balances': {'ETH': 4}},
+    ]}
+    accounts = group_by_account(data)
+    assert [(account['account_id'], account['balances']) for account in accounts] == [
+        ('1', {}), ('2', {}), ('3', {'ETH': 4})
+    ]
+
+
+def test_emptied_account_reaches_the_rpc(monkeypatch):
+    from config.settings import config
+    from services.database_service import DatabaseService
+
+    calls = []
+
+    class Client:
+        def rpc(self, name, params):
+            calls.append((name, params))
+            return self
+
+        def execute(self):
+            return None
+
+    monkeypatch.setitem(config.config_data, 'BALANCE_FACTS_ENABLED', False)
+    monkeypatch.setitem(config.config_data, 'PORTFOLIO_TOTALS_ENABLED', True)
+    service = DatabaseService()
+    service.client = Client()
+
+    service.insert_balance_facts([{'id': 9, 'date': '2026-01-01', 'data': {'accountId': 5, 'balances': {'BTC': 0}}}])
+
+    assert calls == [('apply_balance_snapshot', {
+        'p_snapshot_id': 9, 'p_date': '2026-01-01',
+        'p_accounts': [{'account_id': '5', 'user_id': None, 'balances': {}}]
+    })]
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from services.collector import cli, run as collector_run
+from services.collector.portfolio import Holding, Portfolio
+from services.collector.run_state import RunStateStore
+from services.scheduler import InstanceLock
+
+
+@pytest.fixture
+def state_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(collector_run, 'SHEET_WRITE_FILE', str(tmp_path / 'last_sheet_write.json'))
+    monkeypatch.setattr(collector_run, 'RUN_STATE_DIR', str(tmp_path / 'runs'))
+    return tmp_path
+
+
+def test_sheet_records_the_write_for_the_next_run(state_files, monkeypatch):
+    from services.collector import holdings, sheets
+
+    portfolio = Portfolio([Holding('w', 'ETH', 'Ether', 2.0, 7000.0)])
+    monkeypatch.setattr(holdings, 'fetch_all_zerion_wallets', lambda: portfolio)
+    monkeypatch.setattr(sheets, 'setup_google_sheets', lambda: (None, object()))
+    monkeypatch.setattr(sheets, 'extract_and_write_crypto_data', lambda sheet, holdings: (['ETH'], 7))
+    unfinished = RunStateStore(collector_run.RUN_STATE_DIR, 3600).start()
+    unfinished.save(layout={'start_row': 3})
+
+    cli.run_sheet()
+
+    with open(collector_run.SHEET_WRITE_FILE, encoding='utf-8') as f:
+        assert json.load(f) == {'fingerprint': portfolio.fingerprint(), 'start_row': 7}
+    assert RunStateStore(collector_run.RUN_STATE_DIR, 3600).pending() == []
+
+
+def test_holdings_refuses_to_run_while_a_run_holds_the_lock(tmp_path, monkeypatch):
+    from services.collector import holdings
+
+    fetched = []
+    monkeypatch.setattr(holdings, 'fetch_all_zerion_wallets', lambda: fetched.append(1))
+    lock = InstanceLock(str(tmp_path / 'gary_wealth.lock'))
+    lock.acquire()
+    try:
+        with pytest.raises(SystemExit):
+            cli.run(['holdings', '--lock-file', lock.path])
+    finally:
+        lock.release()
+    assert fetched == []
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+from services.collector.compaction import RECORDS_TABLE, ROLLUPS_TABLE, compact_raw_day, compact_wealth_records
+from tests.fake_supabase import FakeSupabase
+
+NOW = datetime(2026, 3, 20, 12, tzinfo=timezone.utc)
+DAY = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def snapshot(snapshot_id, moment, btc):
+    return {'id': snapshot_id, 'date': moment.isoformat(),
+            'data': [{'accountId': 'a', 'balances': {'BTC': btc}}]}
+
+
+def hourly(start, values, first_id=1):
+    return [snapshot(first_id + i, start + timedelta(hours=i), value) for i, value in enumerate(values)]
+
+
+def test_old_days_become_daily_rollups():
+    old = hourly(DAY, [1, 3, 2])
+    recent = hourly(NOW - timedelta(days=1), [5], first_id=10)
+    client = FakeSupabase(**{RECORDS_TABLE: old + recent})
+
+    report = compact_wealth_records(client, raw_days=14, daily_days=180, batch_size=2, now=NOW)
+
+    assert report['raw_rows_deleted'] == 3
+    assert [row['id'] for row in client.tables[RECORDS_TABLE]] == [10]
+    [rollup] = client.tables[ROLLUPS_TABLE]
+    assert rollup['period'] == 'day' and rollup['bucket_start'] == DAY.isoformat()
+    assert rollup['samples'] == 3
+    assert rollup['symbols'] == {'BTC': {'last': 2, 'min': 1, 'max': 3}}
+
+
+def test_rerun_after_interruption_counts_nothing_twice():
+    client = FakeSupabase(**{RECORDS_TABLE: hourly(DAY, [1, 4])})
+    # First run wrote the rollup and stopped before deleting: simulate by restoring the rows
+    rows = [dict(row) for row in client.tables[RECORDS_TABLE]]
+    compact_raw_day(client, DAY, batch_size=10, dry_run=False)
+    client.tables[RECORDS_TABLE] = rows + hourly(DAY + timedelta(hours=5), [2], first_id=3)
+
+    compact_raw_day(client, DAY, batch_size=10, dry_run=False)
+
+    [rollup] = client.tables[ROLLUPS_TABLE]
+    assert rollup['samples'] == 3
+    assert rollup['symbols'] == {'BTC': {'last': 2, 'min': 1, 'max': 4}}
+    assert client.tables[RECORDS_TABLE] == []
+
+
+def test_old_daily_rollups_fold_into_a_week():
+    monday = datetime(2025, 6, 2, tzinfo=timezone.utc)
+    client = FakeSupabase(**{RECORDS_TABLE: hourly(monday, [1]) + hourly(monday + timedelta(days=1), [6], first_id=2)})
+
+    report = compact_wealth_records(client, raw_days=14, daily_days=180, now=NOW)
+
+    assert report['days_compacted'] == 2
+    assert report['weeks_compacted'] == 1
+    [weekly] = client.tables[ROLLUPS_TABLE]
+    assert (weekly['period'], weekly['bucket_start'], weekly['samples']) == ('week', monday.isoformat(), 2)
+    assert weekly['symbols'] == {'BTC': {'last': 6, 'min': 1, 'max': 6}}
+
+
+def test_dry_run_writes_nothing():
+    client = FakeSupabase(**{RECORDS_TABLE: hourly(DAY, [1, 2])})
+
+    report = compact_wealth_records(client, raw_days=14, dry_run=True, now=NOW)
+
+    assert report['raw_rows_deleted'] == 2
+    assert len(client.tables[RECORDS_TABLE]) == 2
+    assert not client.tables.get(ROLLUPS_TABLE)
+    assert not any(action in ('delete', 'upsert', 'insert') for action, _ in client.calls)
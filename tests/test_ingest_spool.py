@@ -0,0 +1,221 @@
+from concurrent.futures import Future
+
+import pytest
+
+from config.settings import config
+from services.database_service import DatabaseService, is_transient_error
+from services.ingest_spool import IngestSpool, SpoolReplayer, host_depth, record_hash
+
+
+class Rejected(Exception):
+    """Stand-in for postgrest's APIError carrying a SQLSTATE code"""
+
+    def __init__(self, code):
+        super().__init__(f"rejected ({code})")
+        self.code = code
+
+
+def test_append_replay_commit_and_reopen(tmp_path):
+    spool = IngestSpool(str(tmp_path), segment_bytes=200)
+    for i in range(5):
+        assert spool.append({'n': i}, f"2026-01-01T00:00:0{i}")
+    assert spool.depth == 5
+    assert spool.status()['segments'] > 1
+
+    records, position = spool.read_batch(3)
+    assert [record['data']['n'] for record in records] == [0, 1, 2]
+    spool.commit(records, position)
+
+    reopened = IngestSpool(str(tmp_path), segment_bytes=200)
+    records, _ = reopened.read_batch(10)
+    assert [record['data']['n'] for record in records] == [3, 4]
+    assert reopened.depth == 2
+
+
+def test_dedup_key_includes_the_timestamp(tmp_path):
+    spool = IngestSpool(str(tmp_path))
+    payload = {'balances': {'BTC': 1}}
+
+    assert spool.append(payload, '2026-01-01T00:00:00')
+    assert not spool.append(payload, '2026-01-01T00:00:00')
+    assert spool.append(payload, '2026-01-01T00:10:00')
+    assert spool.depth == 2
+    assert record_hash(payload, 'a') != record_hash(payload, 'b')
+
+
+def test_replayer_skips_records_stored_late(tmp_path):
+    spool = IngestSpool(str(tmp_path))
+    spool.append({'n': 1}, 'd1')
+    spool.append({'n': 2}, 'd2')
+    late = record_hash({'n': 1}, 'd1')
+    inserted = []
+
+    replayer = SpoolReplayer(spool, inserted.extend, skip=lambda data_hash: data_hash == late)
+    assert replayer.drain_once() == 2
+    assert inserted == [{'date': 'd2', 'data': {'n': 2}}]
+    assert (replayer.replayed, replayer.skipped, spool.depth) == (1, 1, 0)
+
+
+def test_replayer_defers_records_whose_insert_is_still_running(tmp_path):
+    spool = IngestSpool(str(tmp_path))
+    spool.append({'n': 1}, 'd1')
+    spool.append({'n': 2}, 'd2')
+    running = {record_hash({'n': 1}, 'd1')}
+    inserted = []
+
+    replayer = SpoolReplayer(spool, inserted.extend, defer=lambda data_hash: data_hash in running)
+    assert replayer.drain_once() == 1
+    assert inserted == [{'date': 'd2', 'data': {'n': 2}}]
+    assert (spool.depth, replayer.deferred) == (1, 1)
+
+    running.clear()
+    assert replayer.drain_once() == 1
+    assert inserted[-1] == {'date': 'd1', 'data': {'n': 1}}
+    assert spool.depth == 0
+
+
+def test_host_depth_counts_every_slot_from_the_files(tmp_path):
+    first = IngestSpool(str(tmp_path / 'slot-0'), segment_bytes=200)
+    second = IngestSpool(str(tmp_path / 'slot-1'))
+    for i in range(4):
+        first.append({'n': i}, f"d{i}")
+    second.append({'n': 9}, 'd9')
+    records, position = first.read_batch(3)
+    first.commit(records, position)
+
+    assert host_depth(str(tmp_path)) == 2
+    assert IngestSpool(str(tmp_path / 'slot-0'), segment_bytes=200).depth == 1
+
+
+def test_rejected_record_is_dead_lettered_and_unblocks_the_rest(tmp_path):
+    spool = IngestSpool(str(tmp_path))
+    for n in range(3):
+        spool.append({'n': n}, f"d{n}")
+    inserted = []
+
+    def insert_batch(records):
+        if any(record['data']['n'] == 1 for record in records):
+            raise Rejected('23502')
+        inserted.extend(record['data']['n'] for record in records)
+
+    replayer = SpoolReplayer(spool, insert_batch, is_transient=is_transient_error, max_attempts=2)
+    for _ in range(10):
+        try:
+            replayer.drain_once()
+        except Rejected:
+            assert not replayer.is_transient(Rejected('23502'))
+        if not spool.depth:
+            break
+
+    assert inserted == [0, 2]
+    assert replayer.dead_lettered == 1
+    with open(spool.dead_letter_file, encoding='utf-8') as f:
+        assert '"n":1' in f.read()
+
+
+def test_transient_failures_never_dead_letter(tmp_path):
+    spool = IngestSpool(str(tmp_path))
+    spool.append({'n': 1}, 'd1')
+
+    def insert_batch(records):
+        raise ConnectionError('database unreachable')
+
+    replayer = SpoolReplayer(spool, insert_batch, is_transient=is_transient_error, max_attempts=1)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            replayer.drain_once()
+    assert spool.depth == 1
+    assert replayer.dead_lettered == 0
+
+
+def test_wrapped_errors_are_classified_by_their_cause():
+    try:
+        try:
+            raise Rejected('22P02')
+        except Rejected as e:
+            raise Exception('Failed to store wealth data') from e
+    except Exception as wrapped:
+        assert not is_transient_error(wrapped)
+    assert is_transient_error(Rejected('57014'))
+    assert is_transient_error(TimeoutError())
+
+
+@pytest.fixture
+def spooling_service(tmp_path, monkeypatch):
+    monkeypatch.setitem(config.config_data, 'SPOOL_ENABLED', True)
+    monkeypatch.setitem(config.config_data, 'SPOOL_DIR', str(tmp_path))
+    service = DatabaseService()
+    # Keep the background replayer idle so the test decides when records are replayed
+    monkeypatch.setattr(SpoolReplayer, 'start', lambda self: None)
+    return service
+
+
+def test_inserts_go_direct_unless_the_database_is_failing(spooling_service, monkeypatch):
+    service = spooling_service
+    outcomes = [ConnectionError('down'), None, None]
+
+    def insert_record(db_record):
+        outcome = outcomes.pop(0)
+        if outcome:
+            raise outcome
+        return {'success': True, 'record': db_record}
+
+    monkeypatch.setattr(service, '_insert_record', insert_record)
+
+    assert service.insert_wealth_data({'n': 1})['spooled']
+    assert service._replayer.failing
+    # Still failing: queued without trying the database
+    assert service.insert_wealth_data({'n': 2})['spooled']
+    assert outcomes == [None, None]
+
+    # The replayer got through, so new records are inserted directly even with others waiting
+    service._replayer.failing = False
+    service._spool.append({'n': 0}, 'older')
+    assert not service.insert_wealth_data({'n': 3}).get('spooled')
+
+
+def test_rejected_insert_is_raised_not_spooled(spooling_service, monkeypatch):
+    service = spooling_service
+
+    def insert_record(db_record):
+        try:
+            raise Rejected('23514')
+        except Rejected as e:
+            raise Exception('Failed to store wealth data') from e
+
+    monkeypatch.setattr(service, '_insert_record', insert_record)
+
+    with pytest.raises(Exception, match='Failed to store wealth data'):
+        service.insert_wealth_data({'n': 1})
+    assert service._spool.depth == 0
+
+
+def test_spool_needs_a_directory(monkeypatch):
+    monkeypatch.setitem(config.config_data, 'SPOOL_ENABLED', True)
+    monkeypatch.setitem(config.config_data, 'SPOOL_DIR', None)
+
+    assert DatabaseService()._get_spool() is None
+    with pytest.raises(ValueError, match='SPOOL_DIR'):
+        config.validate_required_config()
+
+
+def test_late_insert_defers_its_spooled_copy_until_it_finishes(spooling_service):
+    service = spooling_service
+    future = Future()
+    service._late_inserts['h'] = future
+
+    assert service._insert_running('h')
+    future.set_result({'success': True})
+    assert not service._insert_running('h')
+    assert service._stored_late('h')
+    assert not service._stored_late('h')
+
+
+def test_spool_status_reports_the_host_depth(spooling_service, tmp_path):
+    service = spooling_service
+    service._get_spool().append({'n': 1}, 'd1')
+    IngestSpool(str(tmp_path / 'slot-7')).append({'n': 2}, 'd2')
+
+    status = service.spool_status()
+    assert status['depth'] == 2
+    assert status['worker']['depth'] == 1
@@ -0,0 +1,113 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from services.pipeline import FAILED, OK, SKIPPED, TIMEOUT, Pipeline, Stage, StageError
+from tests.conftest import REPO_DIR
+
+
+def test_stages_run_in_dependency_order_and_in_parallel():
+    order = []
+
+    def step(name, delay=0.0):
+        def func(**inputs):
+            time.sleep(delay)
+            order.append(name)
+            return {name: f"{name}({','.join(sorted(inputs.values()))})"}
+        return func
+
+    result = Pipeline([
+        Stage('write', step('write'), inputs=['a', 'b'], outputs=['write']),
+        Stage('b', step('b', 0.1), inputs=['root'], outputs=['b']),
+        Stage('a', step('a', 0.1), inputs=['root'], outputs=['a']),
+        Stage('root', step('root'), outputs=['root']),
+    ]).run()
+
+    assert result.ok
+    assert order[0] == 'root' and order[-1] == 'write'
+    assert result.values['write'] == 'write(a(root()),b(root()))'
+    # a and b ran side by side
+    assert result.duration < 0.19
+
+
+def test_failure_only_skips_dependents():
+    def broken():
+        raise StageError('sheet unavailable')
+
+    result = Pipeline([
+        Stage('sheet', broken, outputs=['sheet']),
+        Stage('prices', lambda: {'prices': 1}, outputs=['prices']),
+        Stage('write', lambda sheet, prices: None, inputs=['sheet', 'prices']),
+        Stage('save', lambda prices: None, inputs=['prices']),
+    ]).run()
+
+    assert {name: stage.status for name, stage in result.stages.items()} == {
+        'sheet': FAILED, 'prices': OK, 'write': SKIPPED, 'save': OK}
+    assert result.failed() == ['sheet']
+
+
+def test_missing_output_skips_dependents():
+    result = Pipeline([
+        Stage('maybe', lambda: {}, outputs=['value']),
+        Stage('use', lambda value: None, inputs=['value']),
+    ]).run()
+    assert result.stages['use'].status == SKIPPED
+    assert result.ok
+
+
+@pytest.mark.parametrize('stages, message', [
+    ([Stage('a', lambda b: {'a': 1}, inputs=['b'], outputs=['a']),
+      Stage('b', lambda a: {'b': 1}, inputs=['a'], outputs=['b'])], 'cycle'),
+    ([Stage('self', lambda x: {'x': 1}, inputs=['x'], outputs=['x'])], 'cycle'),
+    ([Stage('a', lambda nowhere: None, inputs=['nowhere'])], 'nothing produces'),
+    ([Stage('a', lambda: {'x': 1}, outputs=['x']), Stage('b', lambda: {'x': 1}, outputs=['x'])], 'produced by both'),
+    ([Stage('a', lambda: None), Stage('a', lambda: None)], 'named a'),
+])
+def test_bad_graphs_are_rejected_up_front(stages, message):
+    with pytest.raises(ValueError, match=message):
+        Pipeline(stages)
+
+
+def test_given_values_are_checked():
+    pipeline = Pipeline([Stage('use', lambda seed: {'out': seed}, inputs=['seed'], outputs=['out'])], given=['seed'])
+    assert pipeline.run({'seed': 3}).values['out'] == 3
+    with pytest.raises(ValueError, match='seed'):
+        pipeline.run()
+
+
+def test_timed_out_stage_is_abandoned_and_frees_its_worker():
+    release = threading.Event()
+
+    def hang():
+        release.wait(5)
+        return {'late': True}
+
+    started = time.monotonic()
+    result = Pipeline([
+        Stage('hang', hang, outputs=['late'], timeout=0.1),
+        Stage('after', lambda late: None, inputs=['late']),
+        Stage('other', lambda: {'other': 1}, outputs=['other']),
+    ], max_workers=1).run()
+    release.set()
+
+    assert result.stages['hang'].status == TIMEOUT
+    assert result.stages['after'].status == SKIPPED
+    assert result.stages['other'].status == OK
+    assert 'late' not in result.values
+    assert time.monotonic() - started < 1
+
+
+def test_hung_stage_does_not_block_interpreter_exit():
+    code = (
+        "import threading, time\n"
+        "from services.pipeline import Pipeline, Stage\n"
+        "result = Pipeline([Stage('hang', lambda: threading.Event().wait(), timeout=0.1)]).run()\n"
+        "print(result.stages['hang'].status)\n"
+    )
+    started = time.monotonic()
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=20, cwd=REPO_DIR)
+    assert output.stdout.strip().endswith('timeout'), output.stderr
+    assert time.monotonic() - started < 10
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.price_engine import PriceEngine
+
+
+class FakeExchange:
+    """ccxt stand-in with fixed prices, a ticker delay and a slow first load_markets()"""
+
+    def __init__(self, prices, delay: float = 0.0, load_delay: float = 0.0):
+        self.markets = {}
+        self.prices = prices
+        self.delay = delay
+        self.load_delay = load_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def load_markets(self):
+        time.sleep(self.load_delay)
+        self.markets = {symbol: {'symbol': symbol} for symbol in self.prices}
+        return self.markets
+
+    def fetch_ticker(self, symbol):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {'symbol': symbol, 'last': self.prices[symbol]}
+
+
+def make_engine(exchanges, **kwargs):
+    engine = PriceEngine(exchange_ids=list(exchanges), **kwargs)
+    engine._exchanges.update(exchanges)
+    return engine
+
+
+def test_fanout_queries_only_the_fastest_exchanges():
+    exchanges = {ex_id: FakeExchange({'BTC/USDT': price}) for ex_id, price in
+                 [('a', 100.0), ('b', 102.0), ('c', 500.0)]}
+    engine = make_engine(exchanges, max_fanout=2)
+    engine.stats['c'].record(2.0, True)  # slowest, ranked last
+
+    quote = engine.fetch_quote('BTC/USDT')
+
+    assert quote['price'] == 101.0
+    assert set(quote['quotes']) == {'a', 'b'}
+    assert exchanges['c'].calls == 0
+
+
+def test_exchange_without_the_market_is_replaced_by_the_next_ranked():
+    exchanges = {
+        'a': FakeExchange({'BTC/USDT': 100.0}),
+        'b': FakeExchange({'BTC/USDT': 100.0}),
+        'kraken': FakeExchange({'USDT/USD': 1.001}),
+    }
+    engine = make_engine(exchanges, max_fanout=1)
+    engine.stats['kraken'].record(1.0, True)
+
+    quote = engine.fetch_quote('USDT/USD')
+
+    assert quote['quotes'] == {'kraken': 1.001}
+
+
+def test_deadline_starts_when_the_request_runs():
+    exchanges = {'a': FakeExchange({f"S{i}/USDT": 1.0 for i in range(4)}, delay=0.15)}
+    engine = make_engine(exchanges, deadline=0.3)
+    engine._request_pool = ThreadPoolExecutor(max_workers=1)  # every race queues behind the others
+
+    quotes = engine.fetch_quotes([f"S{i}/USDT" for i in range(4)])
+
+    assert all(quote is not None for quote in quotes.values())
+
+
+def test_load_markets_is_not_counted_as_latency():
+    exchanges = {'a': FakeExchange({'BTC/USDT': 100.0}, load_delay=0.3)}
+    engine = make_engine(exchanges)
+
+    engine.fetch_quote('BTC/USDT')
+
+    assert engine.stats['a'].latency < 0.1
+    assert engine.stats['a'].requests == 1
+
+
+def test_first_mode_returns_the_first_quote_inside_the_budget():
+    exchanges = {'a': FakeExchange({'BTC/USDT': 100.0}), 'b': FakeExchange({'BTC/USDT': 200.0}, delay=0.5)}
+    engine = make_engine(exchanges, mode='first', latency_budget=0.3, deadline=2.0)
+
+    started = time.monotonic()
+    quote = engine.fetch_quote('BTC/USDT')
+
+    assert quote['method'] == 'first (a)'
+    assert quote['price'] == 100.0
+    assert time.monotonic() - started < 0.4
+
+
+def test_first_mode_falls_back_to_the_median_after_the_budget():
+    exchanges = {ex_id: FakeExchange({'BTC/USDT': price}, delay=delay) for ex_id, price, delay in
+                 [('a', 100.0, 0.2), ('b', 104.0, 0.25), ('c', 102.0, 0.3), ('d', 900.0, 2.0)]}
+    engine = make_engine(exchanges, mode='first', latency_budget=0.1, deadline=0.6)
+
+    quote = engine.fetch_quote('BTC/USDT')
+
+    assert quote['method'] == 'median of 3'
+    assert quote['price'] == 102.0
+    assert 'd' not in quote['quotes']
+
+
+def test_median_mode_stops_waiting_after_the_budget():
+    exchanges = {ex_id: FakeExchange({'BTC/USDT': price}, delay=delay) for ex_id, price, delay in
+                 [('a', 100.0, 0.0), ('b', 102.0, 0.0), ('c', 900.0, 1.0)]}
+    engine = make_engine(exchanges, mode='median', latency_budget=0.2, deadline=2.0)
+
+    started = time.monotonic()
+    quote = engine.fetch_quote('BTC/USDT')
+
+    assert quote['price'] == 101.0
+    assert set(quote['quotes']) == {'a', 'b'}
+    assert time.monotonic() - started < 0.6
+
+
+def test_save_stats_accepts_a_bare_filename(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    engine = make_engine({'a': FakeExchange({'BTC/USDT': 100.0})}, stats_file='exchange_stats.json')
+
+    engine.fetch_quote('BTC/USDT')
+    engine.save_stats()
+
+    assert (tmp_path / 'exchange_stats.json').exists()
@@ -0,0 +1,87 @@
+import pytest
+from flask import Flask
+
+from config.settings import config
+from services.rate_limiter import RateLimit, RateLimiter, TokenBucketStore, client_key, parse_limits
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TokenBucketStore(str(tmp_path / 'buckets.sqlite3'))
+
+
+def test_parse_limits():
+    limits = parse_limits('POST /a=60/minute:10; *=5/second')
+    assert (limits['POST /a'].count, limits['POST /a'].period, limits['POST /a'].burst) == (60, 60, 10)
+    assert limits['*'].burst == 5
+    with pytest.raises(ValueError):
+        RateLimit.parse('5/fortnight')
+
+
+def test_bucket_allows_a_burst_then_refills(store):
+    limit = RateLimit(60, 60, burst=3)
+
+    assert [store.take('k', limit, now=100.0)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after, _ = store.take('k', limit, now=100.0)
+    assert not allowed and retry_after == pytest.approx(1.0)
+
+    assert store.take('k', limit, now=101.0)[0]
+    assert not store.take('k', limit, now=101.0)[0]
+    # Buckets are per key
+    assert store.take('other', limit, now=101.0)[0]
+
+
+def test_bucket_never_refills_past_its_burst(store):
+    limit = RateLimit(1, 1, burst=2)
+    store.take('k', limit, now=0.0)
+    assert [store.take('k', limit, now=1000.0)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_buckets_are_shared_through_the_file(store, tmp_path):
+    limit = RateLimit(1, 60)
+    assert store.take('k', limit, now=10.0)[0]
+    assert not TokenBucketStore(store.path).take('k', limit, now=10.0)[0]
+
+
+@pytest.fixture
+def api_keys(monkeypatch):
+    monkeypatch.setitem(config.config_data, 'API_KEYS', 'good-key, second-key')
+
+
+def key_for(headers, remote_addr='10.0.0.9', proxy_hops=1):
+    app = Flask(__name__)
+    with app.test_request_context('/', headers=headers, environ_base={'REMOTE_ADDR': remote_addr}):
+        return client_key(proxy_hops)
+
+
+def test_only_configured_api_keys_are_trusted(api_keys):
+    assert key_for({'X-API-Key': 'good-key'}).startswith('key:')
+    assert key_for({'X-API-Key': 'good-key'}) != key_for({'X-API-Key': 'second-key'})
+    assert 'good-key' not in key_for({'X-API-Key': 'good-key'})
+    assert key_for({'X-API-Key': 'made-up', 'X-Forwarded-For': '1.2.3.4'}) == 'ip:1.2.3.4'
+
+
+def test_client_headers_are_ignored(api_keys):
+    assert key_for({'X-Client-Id': 'anything', 'X-Forwarded-For': '1.2.3.4'}) == 'ip:1.2.3.4'
+
+
+def test_forwarded_for_uses_the_proxy_appended_entry():
+    spoofed = {'X-Forwarded-For': '6.6.6.6, 1.2.3.4'}
+    assert key_for(spoofed) == 'ip:1.2.3.4'
+    assert key_for({'X-Forwarded-For': '6.6.6.6, 1.2.3.4, 35.0.0.1'}, proxy_hops=2) == 'ip:1.2.3.4'
+    assert key_for(spoofed, proxy_hops=0) == 'ip:10.0.0.9'
+    assert key_for({}) == 'ip:10.0.0.9'
+
+
+def test_limiter_answers_429_with_retry_after(store):
+    app = Flask(__name__)
+    app.add_url_rule('/ingest', 'ingest', lambda: 'ok', methods=['POST'])
+    RateLimiter(store, parse_limits('POST /ingest=1/minute')).install(app)
+    client = app.test_client()
+
+    assert client.post('/ingest').status_code == 200
+    limited = client.post('/ingest', headers={'X-Client-Id': 'fresh-identity'})
+    assert limited.status_code == 429
+    assert int(limited.headers['Retry-After']) >= 59
+    # Other routes aren't limited
+    assert client.get('/ingest').status_code == 405
@@ -0,0 +1,43 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.collector.sheets_client import SheetsClientFactory
+
+
+class Credentials:
+    service_account_email = 'collector@example.iam.gserviceaccount.com'
+    token = None
+    expiry = None
+
+
+def load(tmp_path, cached):
+    factory = SheetsClientFactory('unused.json', [], str(tmp_path))
+    with open(factory.token_file, 'w', encoding='utf-8') as f:
+        f.write(cached if isinstance(cached, str) else json.dumps(cached))
+    credentials = Credentials()
+    factory._load_cached_token(credentials)
+    return credentials
+
+
+def test_reuses_valid_cached_token(tmp_path):
+    expiry = datetime.utcnow() + timedelta(hours=1)
+    credentials = load(tmp_path, {'service_account': Credentials.service_account_email,
+                                  'token': 'cached-token', 'expiry': expiry.isoformat()})
+    assert credentials.token == 'cached-token'
+    assert credentials.expiry == expiry
+
+
+@pytest.mark.parametrize('cached', [
+    '{"service_account": ',
+    ['not', 'an', 'object'],
+    {'service_account': Credentials.service_account_email, 'expiry': '2099-01-01T00:00:00'},
+    {'service_account': Credentials.service_account_email, 'token': 't', 'expiry': 12},
+    {'service_account': Credentials.service_account_email, 'token': 't', 'expiry': 'tomorrow'},
+    {'service_account': Credentials.service_account_email, 'token': 't', 'expiry': '2099-01-01T00:00:00+00:00'},
+    {'service_account': Credentials.service_account_email, 'token': None, 'expiry': '2099-01-01T00:00:00'},
+])
+def test_damaged_cache_falls_back_to_fresh_token(tmp_path, cached):
+    credentials = load(tmp_path, cached)
+    assert credentials.token is None
@@ -0,0 +1,100 @@
+from services.collector import holdings as holdings_stage
+from services.collector.portfolio import Holding, Portfolio
+from services.wallet_pool import WalletFetchPool
+from services.wallet_registry import DEFAULT_PROVIDER_LIMITS, select_wallet_shard
+
+
+def wallets(api, count):
+    return [{'name': f"{api}-{i}", 'address': f"{api}-{i}", 'api': api} for i in range(count)]
+
+
+def limits(**overrides):
+    merged = dict(DEFAULT_PROVIDER_LIMITS)
+    merged.update(overrides)
+    return merged
+
+
+def test_shard_budget_counts_probe_calls():
+    registry_wallets = wallets('solana_rpc', 12)
+    providers = {'solana_rpc': limits(hourly_budget=30, calls_per_wallet=2, probe_calls=1)}
+
+    selected, deferred = select_wallet_shard(registry_wallets, providers, run_slot=0)
+
+    # 30 calls / (2 fetch + 1 probe) = 10 wallets per run -> two shards of 6
+    assert len(selected) == 6
+    assert len(deferred) == 6
+
+
+def test_shard_rotates_through_every_wallet():
+    registry_wallets = wallets('zerion', 5)
+    providers = {'zerion': limits(hourly_budget=2)}
+
+    seen = set()
+    for slot in range(3):
+        selected, _ = select_wallet_shard(registry_wallets, providers, run_slot=slot)
+        seen.update(wallet['address'] for wallet in selected)
+
+    assert seen == {wallet['address'] for wallet in registry_wallets}
+
+
+def test_pool_takes_probe_calls_from_the_bucket():
+    pool = WalletFetchPool({'solana_rpc': limits(rate_per_second=1000, burst=10, calls_per_wallet=2, probe_calls=1)})
+    bucket = pool.buckets['solana_rpc']
+
+    pool.run(wallets('solana_rpc', 1), lambda wallet: None, calls_key='probe_calls')
+    assert round(bucket.tokens) == 9
+
+    pool.run(wallets('solana_rpc', 1), lambda wallet: None)
+    assert round(bucket.tokens) == 7
+
+
+def test_zerion_wallets_are_not_probed():
+    assert holdings_stage.probe_wallet({'name': 'z', 'address': '0x1', 'api': 'zerion'}) is None
+
+
+def test_zerion_retry_after_429_takes_a_token(monkeypatch, tmp_path):
+    class Response:
+        def __init__(self, status_code, body=None):
+            self.status_code = status_code
+            self.body = body
+            self.text = ''
+
+        def json(self):
+            return self.body
+
+    position = {
+        'type': 'positions',
+        'attributes': {
+            'fungible_info': {'symbol': 'ETH', 'name': 'Ether'},
+            'quantity': {'float': 2.0},
+            'value': 7000.0,
+            'price': 3500.0,
+            'name': 'Ether',
+        },
+    }
+    responses = [Response(429), Response(200, {'data': [position]})]
+
+    class Session:
+        def get(self, *args, **kwargs):
+            return responses.pop(0)
+
+    throttled = []
+    monkeypatch.chdir(tmp_path)  # the positions fetch dumps raw.json into the working directory
+    monkeypatch.setattr(holdings_stage, 'get_http_session', lambda: Session())
+    monkeypatch.setattr(holdings_stage.time, 'sleep', lambda seconds: None)
+
+    holdings = holdings_stage.fetch_wallet_holdings(
+        {'name': 'z', 'address': '0x1', 'api': 'zerion'}, throttle=lambda: throttled.append(1)
+    )
+
+    assert [(holding.symbol, holding.quantity) for holding in holdings] == [('ETH', 2.0)]
+    assert throttled == [1]
+
+
+def test_fingerprint_ignores_usd_values():
+    before = Portfolio([Holding('w', 'ETH', 'Ether', 2.0, 7000.0), Holding('w', 'BTC', 'Bitcoin', 1.0, 117000.0)])
+    repriced = Portfolio([Holding('w', 'BTC', 'Bitcoin', 1.0, 90000.0), Holding('w', 'ETH', 'Ether', 2.0, 5000.0)])
+    moved = Portfolio([Holding('w', 'ETH', 'Ether', 2.5, 7000.0), Holding('w', 'BTC', 'Bitcoin', 1.0, 117000.0)])
+
+    assert before.fingerprint() == repriced.fingerprint()
+    assert before.fingerprint() != moved.fingerprint()
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+
+import pytest
+
+from app import app
+from config.settings import config
+from services.database_service import db_service
+from services.wealth_export import iter_pages, parquet_available
+from tests.fake_supabase import FakeSupabase
+
+KEY = 'export-test-key'
+EXPORT = '/utgl-gary-wealth-data/export'
+
+
+def record(record_id):
+    return {
+        'id': record_id,
+        'date': f"2026-01-{record_id:02d}T00:00:00+00:00",
+        'data': [{'userId': 'u', 'accountId': 'a', 'balances': {'BTC': record_id, 'DOGE': 0.5}},
+                 {'userId': 'u', 'accountId': 'b', 'balances': {'ETH': record_id * 10}}]
+    }
+
+
+@pytest.fixture
+def records(monkeypatch):
+    client = FakeSupabase(utgl_gary_wealth_records=[record(i) for i in range(1, 8)])
+    monkeypatch.setattr(db_service, 'client', client)
+    monkeypatch.setattr(db_service, '_initialized', True)
+    monkeypatch.setitem(config.config_data, 'API_KEYS', KEY)
+    return client
+
+
+def get(path, key=KEY):
+    return app.test_client().get(path, headers={'X-API-Key': key} if key else {})
+
+
+def ndjson_ids(response):
+    return [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_iter_pages_stops_at_the_limit_and_the_end():
+    rows = [{'id': i} for i in range(1, 8)]
+
+    def fetch(after_id, size):
+        return [row for row in rows if row['id'] > after_id][:size]
+
+    assert [[row['id'] for row in page] for page in iter_pages(fetch, page_size=3)] == [[1, 2, 3], [4, 5, 6], [7]]
+    assert [[row['id'] for row in page] for page in iter_pages(fetch, cursor=2, page_size=3, limit=4)] == [
+        [3, 4, 5], [6]]
+
+
+def test_export_needs_a_configured_api_key(records, monkeypatch):
+    assert get(EXPORT, key=None).status_code == 401
+    assert get(EXPORT, key='wrong').status_code == 401
+    assert get('/utgl-gary-wealth-data/totals', key='wrong').status_code == 401
+    assert get(EXPORT).status_code == 200
+
+    monkeypatch.setitem(config.config_data, 'API_KEYS', '')
+    assert get(EXPORT).status_code == 403
+
+
+def test_ndjson_pages_through_every_record(records):
+    response = get(f"{EXPORT}?page_size=3")
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert ndjson_ids(response) == [1, 2, 3, 4, 5, 6, 7]
+    # 3 + 3 + 1 rows: the short page ends the export without another request
+    assert records.calls.count(('select', 'utgl_gary_wealth_records')) == 3
+
+
+def test_export_resumes_after_the_cursor(records):
+    first = ndjson_ids(get(f"{EXPORT}?page_size=2&limit=3"))
+    rest = ndjson_ids(get(f"{EXPORT}?page_size=2&cursor={first[-1]}"))
+
+    assert first == [1, 2, 3]
+    assert rest == [4, 5, 6, 7]
+    assert ndjson_ids(get(f"{EXPORT}?since=2026-01-03&until=2026-01-05")) == [3, 4]
+
+
+def test_csv_has_a_column_per_requested_symbol(records):
+    response = get(f"{EXPORT}?format=csv&symbols=BTC,ETH&limit=2")
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+    assert rows[0] == ['snapshot_id', 'date', 'user_id', 'account_id', 'BTC', 'ETH', 'other_balances']
+    assert rows[1] == ['1', '2026-01-01T00:00:00+00:00', 'u', 'a', '1', '', '{"DOGE":0.5}']
+    assert rows[2] == ['1', '2026-01-01T00:00:00+00:00', 'u', 'b', '', '10', '']
+    assert len(rows) == 5
+
+
+@pytest.mark.skipif(not parquet_available(), reason='pyarrow not installed')
+def test_parquet_has_a_row_group_per_page(records):
+    import pyarrow.parquet as pq
+
+    response = get(f"{EXPORT}?format=parquet&symbols=BTC&page_size=3")
+    table = pq.ParquetFile(io.BytesIO(response.get_data()))
+
+    assert table.num_row_groups == 3
+    assert table.read().column('snapshot_id').to_pylist() == [1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6, 7, 7]
+
+
+def test_bad_arguments_are_rejected_before_streaming(records):
+    assert get(f"{EXPORT}?format=xml").status_code == 400
+    assert get(f"{EXPORT}?page_size=5000").status_code == 400
+    assert get(f"{EXPORT}?cursor=abc").status_code == 400
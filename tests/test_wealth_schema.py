@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from services.wealth_schema import MSGSPEC_AVAILABLE, MsgspecWealthValidator, PythonWealthValidator, SchemaError
+from tests.conftest import REPO_DIR
+
+BACKENDS = [PythonWealthValidator]
+if MSGSPEC_AVAILABLE:
+    BACKENDS.append(MsgspecWealthValidator)
+
+ACCOUNT = {'userId': 'u1', 'accountId': 'a1', 'balances': {'BTC': 0.5, 'USDT': 100}}
+
+REJECTED = [
+    (b'[]', '$', 'Expected at least one account'),
+    (b'{bad', '$', None),
+    (b'{"userId":"u","accountId":"a","balances":{"BTC":"x"}}', '$.balances.BTC', 'Expected `int | float`, got `str`'),
+    (b'{"userId":"u","accountId":"a","balances":{"BTC":NaN}}', '$', 'Expected a finite number, got `NaN`'),
+    (b'{"userId":"u","accountId":"a","balances":{"BTC":1e999}}', '$.balances.BTC', 'Expected a finite number'),
+    (b'[{"userId":"u","accountId":"a","balances":{}},{"userId":"u","accountId":"a","balances":{"odd.key":true}}]',
+     '$[1].balances["odd.key"]', 'Expected `int | float`, got `bool`'),
+    (b'{"userId":"u","accountId":"","balances":{}}', '$.accountId', 'Expected a non-empty `str`'),
+    (b'{"userId":"u","balances":{}}', '$', 'Object missing required field `accountId`'),
+    (b'{"userId":"u","accountId":"a"}', '$.balances', 'Object missing required field `balances`'),
+    (b'{"userId":"u","accountId":"a","balances":{},"x":1}', '$', 'Object contains unknown field `x`'),
+    (b'[1]', '$[0]', 'Expected `object`, got `int`'),
+]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_valid_payloads_round_trip(backend):
+    validator = backend()
+    assert validator.decode(json.dumps(ACCOUNT).encode()) == ACCOUNT
+    with_extras = [dict(ACCOUNT, positions=[{'symbol': 'BTC'}]), ACCOUNT]
+    assert validator.decode(json.dumps(with_extras).encode()) == with_extras
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('body, path, message', REJECTED)
+def test_rejections(backend, body, path, message):
+    with pytest.raises(SchemaError) as rejected:
+        backend().decode(body)
+    assert rejected.value.path == path
+    if message:
+        assert rejected.value.message == message
+    else:
+        assert rejected.value.message.startswith('JSON is malformed')
+
+
+@pytest.mark.skipif(not MSGSPEC_AVAILABLE, reason='msgspec not installed')
+@pytest.mark.parametrize('body', [body for body, _, _ in REJECTED])
+def test_backends_report_the_same_error(body):
+    errors = []
+    for backend in BACKENDS:
+        with pytest.raises(SchemaError) as rejected:
+            backend().decode(body)
+        errors.append(rejected.value.to_dict())
+    assert errors[0] == errors[1]
+
+
+def test_importing_the_route_does_not_import_msgspec():
+    code = "import sys, routes.gary_wealth; print('msgspec' in sys.modules)"
+    env = dict(os.environ, ENV_FILE=os.devnull)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=20,
+                            cwd=REPO_DIR, env=env)
+    assert output.stdout.strip().endswith('False'), output.stderr